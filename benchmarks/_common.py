@@ -0,0 +1,66 @@
+"""基准测试公共工具
+
+插件包的 ``__init__`` 依赖宿主框架（plugins、bridge 等），独立运行基准测试时无法导入。
+这里把插件目录注册为一个不执行 ``__init__`` 的命名空间包 ``bjcore``，
+从而可以直接加载 player、blackjack_game 等不依赖框架的模块。
+"""
+import csv
+import importlib
+import os
+import sys
+import time
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STANDARD_FIELDS = [
+    'user_id', 'session_id', 'nickname', 'chips', 'level', 'exp',
+    'total_wins', 'total_losses', 'total_draws', 'last_checkin',
+    'blackjack_count', 'ready_status', 'current_bet', 'cards'
+]
+
+
+def load(module_name):
+    """加载插件目录下的模块，例如 ``load('player')``"""
+    if 'bjcore' not in sys.modules:
+        pkg = types.ModuleType('bjcore')
+        pkg.__path__ = [PLUGIN_DIR]
+        sys.modules['bjcore'] = pkg
+    return importlib.import_module(f'bjcore.{module_name}')
+
+
+def make_row(i):
+    """生成第 i 个测试玩家的数据行"""
+    return {
+        'user_id': f'user{i}',
+        'session_id': f'session{i}',
+        'nickname': f'玩家{i}',
+        'chips': str(1000 + (i * 7919) % 5000),
+        'level': '1',
+        'exp': '0',
+        'total_wins': str(i % 97),
+        'total_losses': str(i % 89),
+        'total_draws': '0',
+        'last_checkin': '',
+        'blackjack_count': str(i % 13),
+        'ready_status': 'False',
+        'current_bet': '0',
+        'cards': '[]',
+    }
+
+
+def write_player_file(path, count):
+    """写出包含 count 名玩家的CSV文件"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=STANDARD_FIELDS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        for i in range(count):
+            writer.writerow(make_row(i))
+
+
+def timeit(func, repeat):
+    """运行 func repeat 次，返回单次平均耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
@@ -0,0 +1,73 @@
+"""指令路由基准测试：每条消息重建指令字典 vs 初始化时构建的路由表
+
+绝大多数群聊消息都不是本插件的指令，这里主要测量这类消息的单条开销，
+同时给出指令消息（含大小写不同和「下注100」连写）的匹配耗时。
+
+用法: python benchmarks/bench_command_router.py
+"""
+import random
+
+from _common import load, timeit
+
+command_router = load('command_router')
+
+COMMANDS = [
+    "BlackJack注册", "21点注册", "BlackJack签到", "21点签到", "BlackJack状态", "21点状态",
+    "BlackJack排行榜", "21点排行榜", "BlackJack菜单", "21点菜单", "BlackJack规则", "21点规则",
+    "BlackJack准备", "21点准备", "开始BlackJack", "开始21点", "21点开始", "下注", "要牌", "停牌",
+    "加倍", "分牌", "查看牌局", "提示", "21点提示", "清理BlackJack", "清理21点",
+    "重置BlackJack", "重置21点", "BJStatus",
+]
+
+CHAT = [
+    "今天中午吃什么", "哈哈哈哈", "@小明 明天几点开会？", "收到", "好的👌", "[图片]",
+    "有人一起打游戏吗", "this is fine", "OK", "周末去爬山吧，天气不错", "1", "？？？",
+    "转发一篇文章 https://example.com/article", "早上好", "晚安", "我到了",
+]
+
+
+def rebuild_match(content):
+    """旧实现：每条消息重建指令字典，两次 split，再线性地大小写不敏感匹配"""
+    cmd_handlers = {name: (lambda s, u, n, g, name=name: name) for name in COMMANDS}
+    cmd = content.split()[0] if content.split() else ""
+    if content.startswith("下注") and len(content) > 2 and not content.startswith("下注 "):
+        return cmd_handlers["下注"]
+    if cmd in cmd_handlers:
+        return cmd_handlers[cmd]
+    cmd_lower = cmd.lower()
+    for command in cmd_handlers:
+        if command.lower() == cmd_lower:
+            return cmd_handlers[command]
+    return None
+
+
+def build_router():
+    router = command_router.CommandRouter()
+    for name in COMMANDS:
+        router.add([name], lambda s, u, n, g, c, name=name: name)
+    router.add_prefix("下注", lambda s, u, n, g, c: "下注")
+    return router
+
+
+def main():
+    rng = random.Random(3)
+    router = build_router()
+    commands = COMMANDS + ["blackjack状态", "bjstatus", "下注100", "下注 50", "21点排行榜 胜场"]
+
+    # 两种实现的匹配结果必须一致
+    for content in CHAT + commands:
+        old, new = rebuild_match(content), router.match(content)
+        assert (old is None) == (new is None), content
+
+    print(f"{'traffic':>10} {'rebuild (us)':>14} {'router (us)':>13} {'speedup':>9}")
+    for label, messages in (("chat", CHAT), ("commands", commands)):
+        stream = [rng.choice(messages) for _ in range(200_000)]
+        it = iter(stream)
+        old = timeit(lambda: rebuild_match(next(it)), 20_000)
+        it = iter(stream)
+        new = timeit(lambda: router.match(next(it)), 200_000)
+        print(f"{label:>10} {old * 1e6:>14.3f} {new * 1e6:>13.3f} {old / new:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""庄家结果模拟基准测试：逐局标量实现 vs NumPy 向量化批量实现
+
+同时比较两者得到的概率分布，确认语义一致。需要安装 numpy。
+
+用法: python benchmarks/bench_dealer_batch.py [模拟次数]
+"""
+import sys
+import time
+
+from _common import load
+
+dealer_batch = load('dealer_batch')
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    scalar_trials = min(trials, 100_000)
+    composition = dealer_batch.full_shoe_composition(6)
+
+    for up_value in (6, 10, 11):
+        remaining = list(composition)
+        remaining[up_value - 2] -= 1
+
+        start = time.perf_counter()
+        scalar = dealer_batch.simulate_dealer_scalar(up_value, remaining, scalar_trials, seed=1)
+        scalar_rate = scalar_trials / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch = dealer_batch.simulate_dealer_batch(up_value, remaining, trials, seed=1)
+        batch_rate = trials / (time.perf_counter() - start)
+
+        print(f"up card {up_value}: scalar {scalar_rate:,.0f}/s, batch {batch_rate:,.0f}/s "
+              f"({batch_rate / scalar_rate:.0f}x)")
+        for outcome in batch:
+            print(f"  {str(outcome):>9}: scalar {scalar.get(outcome, 0):.4f}  batch {batch[outcome]:.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""牌局快照日志基准测试
+
+模拟数百个群聊同时进行牌局：测量单个牌局的快照/恢复耗时、追加日志记录的耗时，
+以及启动时重放整个日志并恢复全部牌局的耗时。目标是每个牌桌几毫秒以内。
+
+用法: python benchmarks/bench_game_journal.py
+"""
+import os
+import random
+import tempfile
+
+from _common import load, timeit
+
+blackjack_game = load('blackjack_game')
+game_journal = load('game_journal')
+
+
+def make_table(rng, num_players):
+    """创建一个已发牌、部分玩家已行动的牌局"""
+    game = blackjack_game.BJGame(blackjack_game.Deck(rng=rng))
+    player_ids = [f'wxid_{rng.randrange(10 ** 9):09d}' for _ in range(num_players)]
+    game.start_new_game(player_ids)
+    for player_id in player_ids:
+        game.place_bet(player_id, rng.randrange(10, 500))
+    game.deal_initial_cards()
+    for _ in range(rng.randrange(num_players)):
+        if game.game_status != "playing":
+            break
+        game.hit(game.get_current_player())
+        game.stand(game.get_current_player())
+        game._advance_to_next_player()
+    return game
+
+
+def main():
+    rng = random.Random(11)
+    print(f"{'tables':>8} {'snapshot (us)':>14} {'restore (us)':>13} {'record (us)':>12} "
+          f"{'replay (ms)':>12} {'per table (us)':>15}")
+    for count in (100, 500, 1000):
+        tables = {f'group{i}@chatroom': make_table(rng, rng.randrange(1, 7)) for i in range(count)}
+        sample = next(iter(tables.values()))
+        data = sample.snapshot()
+
+        snapshot = timeit(sample.snapshot, 10_000)
+        restore = timeit(lambda: blackjack_game.BJGame.restore(data), 10_000)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            journal_file = os.path.join(tmp, 'bjgames.journal')
+            journal = game_journal.GameJournal(journal_file)
+            journal.load()
+
+            # 每个牌局经历若干次状态变化，每次都追加一条快照
+            items = list(tables.items()) * 5
+            it = iter(items)
+
+            def record():
+                group_id, game = next(it)
+                game.current_player_idx ^= 1  # 让快照内容变化，避免被去重
+                journal.record(group_id, game.snapshot())
+            append = timeit(record, len(items))
+            journal.close()
+
+            def replay():
+                restored = game_journal.GameJournal(journal_file)
+                games = {group_id: blackjack_game.BJGame.restore(snapshot)
+                         for group_id, snapshot in restored.load().items()}
+                restored.close()
+                return games
+            replay_time = timeit(replay, 5)
+
+        print(f"{count:>8} {snapshot * 1e6:>14.2f} {restore * 1e6:>13.2f} {append * 1e6:>12.2f} "
+              f"{replay_time * 1e3:>12.3f} {replay_time / count * 1e6:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""插件启动导入耗时基准测试：加载时导入的模块 vs 首次处理指令时才导入的游戏引擎
+
+插件包本身依赖宿主框架，这里分别在独立的解释器中用 ``-X importtime`` 导入两组模块：
+- 启动时：插件类在模块顶层导入的 command_router、locks、metrics；
+- 延迟：_import_engine 导入的玩家、存储、结算、牌局和日志模块（旧实现在启动时全部导入）。
+每组重复多次取中位数，并列出延迟组中累计耗时最多的模块。
+
+用法: python benchmarks/bench_import_time.py [重复次数]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = ['command_router', 'locks', 'metrics']
+ENGINE = ['player', 'player_store', 'settlement', 'blackjack_game', 'game_journal']
+
+# 与 _common.load 相同的命名空间包，但不导入 _common 本身（它依赖 csv 等模块，会干扰测量）；
+# -X importtime 只记录 import 语句触发的导入，所以这里不能用 importlib.import_module
+SCRIPT = """
+import sys, time, types
+pkg = types.ModuleType('bjcore')
+pkg.__path__ = [{plugin_dir!r}]
+sys.modules['bjcore'] = pkg
+start = time.perf_counter()
+{imports}
+print(int((time.perf_counter() - start) * 1e6))
+"""
+
+
+def import_times(modules):
+    """在新的解释器中导入 modules，返回 (总耗时(us), {模块名: 累计耗时(us)})"""
+    code = SCRIPT.format(
+        plugin_dir=PLUGIN_DIR,
+        imports='\n'.join(f'import bjcore.{name}' for name in modules),
+    )
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return int(proc.stdout), times
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    startup = [import_times(STARTUP)[0] for _ in range(repeat)]
+    runs = [import_times(ENGINE) for _ in range(repeat)]
+    engine = [elapsed for elapsed, _ in runs]
+
+    print(f"{'modules':>10} {'median (ms)':>12} {'min (ms)':>10}")
+    for label, values in (("startup", startup), ("deferred", engine)):
+        print(f"{label:>10} {statistics.median(values) / 1000:>12.2f} {min(values) / 1000:>10.2f}")
+
+    print("\n延迟导入中累计耗时最多的模块:")
+    last = runs[-1][1]
+    for name, us in sorted(last.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {us / 1000:>8.2f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""排行榜基准测试：全量排序 vs 增量排行榜索引
+
+每次回复需要前10名和调用者自己的排名。目标是10万玩家下索引查询低于1毫秒。
+
+用法: python benchmarks/bench_leaderboard.py
+"""
+import random
+
+from _common import load, make_row, timeit
+
+leaderboard = load('leaderboard')
+
+
+def sort_reply(rows, field, user_id):
+    """旧实现：全量排序后取前10名并线性查找排名"""
+    ranked = sorted(rows, key=lambda x: int(x.get(field, 0)), reverse=True)
+    top = ranked[:10]
+    rank = next((i for i, p in enumerate(ranked, 1) if p['user_id'] == user_id), None)
+    return top, rank
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'players':>8} {'sort (ms)':>12} {'index (us)':>12} {'update (us)':>12}")
+    for count in (1_000, 10_000, 100_000):
+        rows = [make_row(i) for i in range(count)]
+        index = leaderboard.LeaderboardIndex.build(rows)
+        users = [f'user{rng.randrange(count)}' for _ in range(1000)]
+
+        it = iter(users * 10)
+        sort = timeit(lambda: sort_reply(rows, 'chips', next(it)), 5)
+
+        it = iter(users * 100)
+
+        def indexed_reply():
+            user_id = next(it)
+            return index.top('chips', 10), index.rank('chips', user_id)
+        query = timeit(indexed_reply, 50_000)
+
+        it = iter(users * 100)
+        update = timeit(lambda: index.update(next(it), {'chips': rng.randrange(10_000)}), 50_000)
+
+        print(f"{count:>8} {sort * 1e3:>12.3f} {query * 1e6:>12.3f} {update * 1e6:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""筹码流水账本基准测试：追加一条流水 vs 整个CSV玩家文件重写
+
+对不同规模的玩家文件，测量：
+- 追加一条账本记录（flush 到操作系统，fsync 按间隔批量进行）的耗时；
+- 一次 CSVPlayerStore 写回（重写整个文件并 fsync）的耗时；
+- 重放账本（期初余额 + 10万条流水）重建全部余额的耗时。
+
+用法: python benchmarks/bench_ledger.py
+"""
+import os
+import random
+import tempfile
+
+from _common import STANDARD_FIELDS, load, timeit, write_player_file
+
+ledger = load('ledger')
+player_store = load('player_store')
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'players':>8} {'ledger append (us)':>19} {'csv rewrite (ms)':>17} "
+          f"{'bytes/record':>13} {'bytes/rewrite':>14} {'rebuild (ms)':>13}")
+    for count in (1_000, 10_000, 50_000):
+        with tempfile.TemporaryDirectory() as tmp:
+            player_file = os.path.join(tmp, 'bjplayers.csv')
+            write_player_file(player_file, count)
+            store = player_store.CSVPlayerStore(player_file, STANDARD_FIELDS)
+
+            ledger_file = os.path.join(tmp, 'bjchips.ledger')
+            chip_ledger = ledger.ChipLedger(ledger_file)
+            chip_ledger.open_balances(store.rows())
+
+            def append():
+                user_id = f'user{rng.randrange(count)}'
+                chip_ledger.record(user_id, -100, 900, 'bet', 1792300210036963)
+
+            append_cost = timeit(append, 100_000)
+            rewrite_cost = timeit(store._write_all, 5)
+            chip_ledger.close()
+            record_bytes = len(ledger.ChipLedger._encode('bet', 'user12345', -100, 900, 1))
+
+            rebuild_cost = timeit(lambda: ledger.rebuild_balances(ledger_file), 3)
+            print(f"{count:>8} {append_cost * 1e6:>19.2f} {rewrite_cost * 1e3:>17.2f} "
+                  f"{record_bytes:>13} {os.path.getsize(player_file):>14} {rebuild_cost * 1e3:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
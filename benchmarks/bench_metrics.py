@@ -0,0 +1,44 @@
+"""运行指标的记录开销
+
+指标默认常开，这里测量单次计数器自增、耗时记录以及一次完整的「计时 + 记录」的开销（均含调用 lambda 的开销），
+都应在1微秒以内。
+
+用法: python benchmarks/bench_metrics.py
+"""
+import random
+import time
+
+from _common import load, timeit
+
+metrics_module = load('metrics')
+
+
+def main():
+    metrics = metrics_module.Metrics()
+    rng = random.Random(5)
+    samples = [rng.lognormvariate(-7, 1.5) for _ in range(4096)]
+    it = iter(samples * 100)
+
+    def timed():
+        start = time.perf_counter()
+        metrics.observe('要牌', time.perf_counter() - start)
+
+    rows = [
+        ("inc", timeit(lambda: metrics.inc('storage_reads'), 500_000)),
+        ("observe", timeit(lambda: metrics.observe('要牌', next(it)), 400_000)),
+        ("perf_counter + observe", timeit(timed, 400_000)),
+    ]
+    print(f"{'operation':>24} {'ns/op':>8}")
+    for label, seconds in rows:
+        print(f"{label:>24} {seconds * 1e9:>8.0f}")
+
+    # 导出不在热路径上，只给出量级
+    for i in range(30):
+        metrics.observe(f'cmd{i}', samples[i])
+    render = timeit(metrics.to_prometheus, 1000)
+    print(f"\nto_prometheus (30 条指令): {render * 1e6:.1f} us")
+    print("\n".join(metrics.summary_lines()[:6]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""定长记录存储基准测试：内存映射的 .bjp 文件 vs CSV写回存储
+
+- 更新：按用户ID修改一个数值字段。CSV存储只改内存中的行、写回时重写整个文件（这里把写回也计入）；
+  定长记录存储在记录的固定偏移处原地写入几个字节；
+- 查询：按会话ID读取一名玩家；
+- 排行榜：从全部玩家构建排行榜索引（CSV逐行解析字典，定长记录只取出数值列）；
+- 打开：启动时加载玩家文件（CSV解析全部行，定长记录只扫描ID列重建索引）。
+
+用法: python benchmarks/bench_mmap_store.py [玩家数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from _common import STANDARD_FIELDS, load, timeit, write_player_file
+
+player_store = load('player_store')
+mmap_store = load('mmap_store')
+
+
+def update_one(store, rng, count):
+    store.update(f'user{rng.randrange(count)}', {'chips': str(rng.randrange(10_000))})
+    store.flush()
+
+
+def build_leaderboard(store):
+    store._leaderboard = None
+    return store.leaderboard
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, 'bjplayers.csv')
+        mmap_file = os.path.join(tmp, 'bjplayers.bjp')
+        write_player_file(csv_file, count)
+
+        start = time.perf_counter()
+        csv_store = player_store.CSVPlayerStore(csv_file, STANDARD_FIELDS)
+        csv_open = time.perf_counter() - start
+        start = time.perf_counter()
+        mmap_store.MmapPlayerStore(mmap_file, STANDARD_FIELDS).import_csv(csv_file)
+        import_time = time.perf_counter() - start
+        start = time.perf_counter()
+        store = mmap_store.MmapPlayerStore(mmap_file, STANDARD_FIELDS)
+        mmap_open = time.perf_counter() - start
+        print(f"{count} 名玩家，导入 {import_time:.2f} 秒，定长记录文件 {os.path.getsize(mmap_file) / 1024 / 1024:.1f} MiB"
+              f"（每条 {mmap_store.RECORD_SIZE} 字节）\n")
+
+        print(f"{'':<8} {'更新并写回':>12} {'查询':>10} {'构建排行榜':>12} {'打开':>10}")
+        for name, target, opened in (('CSV', csv_store, csv_open), ('定长记录', store, mmap_open)):
+            update = timeit(lambda: update_one(target, rng, count), 10 if name == 'CSV' else 10_000)
+            get = timeit(lambda: target.get(f'session{rng.randrange(count)}'), 100_000)
+            leaderboard = timeit(lambda: build_leaderboard(target), 3)
+            print(f"{name:<8} {update * 1e6:>10.1f}us {get * 1e6:>8.2f}us {leaderboard * 1e3:>10.1f}ms "
+                  f"{opened * 1e3:>8.1f}ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
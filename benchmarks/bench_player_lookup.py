@@ -0,0 +1,44 @@
+"""玩家查询基准测试：逐行扫描CSV vs 内存索引仓库
+
+用法: python benchmarks/bench_player_lookup.py
+"""
+import csv
+import os
+import random
+import tempfile
+
+from _common import load, timeit, write_player_file
+
+player_store = load('player_store')
+
+
+def scan_lookup(player_file, user_id):
+    """旧实现：每次查询都重新读取并扫描整个文件"""
+    with open(player_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['user_id'] == user_id or row.get('session_id') == user_id:
+                return row
+    return None
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'rows':>8} {'scan (ms)':>12} {'index (us)':>12} {'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1_000, 10_000, 100_000):
+            path = os.path.join(tmp, f'players_{count}.csv')
+            write_player_file(path, count)
+            keys = [f'session{rng.randrange(count)}' for _ in range(50)]
+
+            it = iter(keys * 100)
+            scan = timeit(lambda: scan_lookup(path, next(it)), 10 if count >= 100_000 else 50)
+
+            store = player_store.CSVPlayerStore.for_file(path)
+            it = iter(keys * 2000)
+            index = timeit(lambda: store.get(next(it)), 100_000)
+
+            print(f"{count:>8} {scan * 1e3:>12.3f} {index * 1e6:>12.3f} {scan / index:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""玩家对象内存基准测试：带类型的 __slots__ BJPlayer vs 原先的「字符串字典」玩家
+
+从CSV读取 N 名玩家并全部保留在内存中，用 tracemalloc 统计每名玩家占用的字节数：
+- 字符串字典：玩家对象持有 csv.DictReader 读出的行字典，所有字段都是字符串；
+- BJPlayer：加载时解析为整数、布尔和元组，行字典随后释放。
+
+同时测量两种模型构造玩家对象和读取数值字段的耗时。
+
+用法: python benchmarks/bench_player_memory.py [玩家数]
+"""
+import csv
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from _common import load, timeit, write_player_file
+
+player = load('player')
+
+
+class DictPlayer:
+    """原先的玩家模型：数据是字符串字典，每次读取属性都重新解析"""
+
+    def __init__(self, data, player_file=None, standard_fields=None, store=None):
+        self.data = data
+        self.player_file = player_file
+        self.standard_fields = standard_fields
+        self.store = store
+
+    @property
+    def chips(self):
+        return int(self.data.get('chips', 0))
+
+    @property
+    def total_wins(self):
+        return int(self.data.get('total_wins', 0))
+
+
+def load_players(path, factory):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [factory(row) for row in csv.DictReader(f)]
+
+
+def measure(path, factory):
+    gc.collect()
+    tracemalloc.start()
+    players = load_players(path, factory)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return players, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bjplayers.csv')
+        write_player_file(path, count)
+
+        print(f"{count} 名玩家常驻内存:")
+        results = {}
+        for name, factory in (('字符串字典', DictPlayer), ('BJPlayer', player.BJPlayer)):
+            players, size = measure(path, factory)
+            results[name] = players
+            print(f"  {name:<10} {size / 1024 / 1024:7.1f} MiB，每名玩家 {size / count:6.0f} 字节")
+
+        row = results['字符串字典'][0].data
+        print("\n单个玩家:")
+        for name, players in results.items():
+            build = timeit(lambda: type(players[0])(dict(row)), 50_000)
+            sample = players[0]
+            read = timeit(lambda: sample.chips + sample.total_wins, 200_000)
+            print(f"  {name:<10} 构造 {build * 1e6:5.2f} us，读取两个数值字段 {read * 1e9:5.0f} ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""分片存储基准测试：单文件CSV vs 按 user_id 分片的CSV
+
+每局结算后修改几名玩家并写回。单文件存储每次重写整个文件；
+分片存储只重写这些玩家所在的分片，多个分片并行写回。另外测量并发结算（不同群聊的玩家）的吞吐。
+
+用法: python benchmarks/bench_sharded_store.py [玩家数]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from _common import STANDARD_FIELDS, load, timeit, write_player_file
+
+player_store = load('player_store')
+sharded_store = load('sharded_store')
+
+
+def settle(store, rng, count, players=3):
+    """模拟一局结算：几名玩家的筹码增减后写回"""
+    batch = {f'session{rng.randrange(count)}': {'chips': rng.choice((-10, 10))} for _ in range(players)}
+    store.adjust_many(batch, 'settle')
+    store.flush()
+
+
+def concurrent_rounds(store, count, threads=4, rounds=10):
+    """多个线程同时结算，返回每秒完成的局数"""
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(rounds):
+            settle(store, rng, count)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return threads * rounds / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single_file = os.path.join(tmp, 'bjplayers.csv')
+        write_player_file(single_file, count)
+        single = player_store.CSVPlayerStore(single_file, STANDARD_FIELDS)
+        per_round = timeit(lambda: settle(single, rng, count), 10)
+        throughput = concurrent_rounds(single, count)
+        print(f"{count} 名玩家，单文件: 每局结算写回 {per_round * 1e3:7.1f} ms，4线程 {throughput:6.1f} 局/秒")
+
+        rows = sharded_store.read_player_rows(single_file)
+        for shards in (4, 16, 64):
+            shard_dir = os.path.join(tmp, f'shards{shards}')
+            store = sharded_store.ShardedPlayerStore.create(shard_dir, STANDARD_FIELDS, shards, rows=rows)
+            per_round = timeit(lambda: settle(store, rng, count), 10)
+            throughput = concurrent_rounds(store, count)
+            print(f"{count} 名玩家，{shards:>2} 个分片: 每局结算写回 {per_round * 1e3:7.1f} ms，"
+                  f"4线程 {throughput:6.1f} 局/秒")
+
+        start = time.perf_counter()
+        store.reshard(32)
+        print(f"\n重新分片 64 -> 32: {time.perf_counter() - start:.2f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""牌靴计数基准测试：增量维护的牌靴构成和计数 vs 每次扫描剩余的牌
+
+- 发牌：每张牌同时更新点数剩余张数、Hi-Lo 和 KO 计数后的耗时；
+- 查询：Deck.stats() 与扫描剩余牌编码重新统计构成和计数的耗时，按发牌进度分别测量。
+
+用法: python benchmarks/bench_shoe_count.py [副数]
+"""
+import random
+import sys
+
+from _common import load, timeit
+
+blackjack_game = load('blackjack_game')
+
+
+def scan_stats(deck):
+    """不使用增量计数，扫描剩余的牌统计构成和 Hi-Lo 计数"""
+    ranks = [0] * 13
+    for code in deck.remaining_codes():
+        ranks[code % 13] += 1
+    running = -sum(blackjack_game.HI_LO_TAGS[rank] * count for rank, count in enumerate(ranks))
+    return ranks, running
+
+
+def main():
+    num_decks = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    deck = blackjack_game.Deck(num_decks=num_decks, rng=random.Random(5))
+    size = deck.size()
+
+    def deal_all():
+        deck.shuffle()
+        for _ in range(size):
+            deck.deal()
+
+    per_card = (timeit(deal_all, 200) - timeit(deck.shuffle, 200)) / size
+    print(f"{num_decks}副牌 {size} 张: 发牌（含计数更新，不含洗牌）每张 {per_card * 1e9:.0f} ns")
+
+    print(f"\n{'发牌进度':>8} {'stats()':>10} {'扫描统计':>10}")
+    for progress in (0.0, 0.25, 0.5, 0.75):
+        deck.shuffle()
+        for _ in range(int(size * progress)):
+            deck.deal()
+        ranks, running = scan_stats(deck)
+        assert ranks == deck.rank_counts() and running == deck.running_count()
+        incremental = timeit(deck.stats, 20_000)
+        scan = timeit(lambda: scan_stats(deck), 2_000)
+        print(f"{progress:>8.0%} {incremental * 1e6:>8.2f}us {scan * 1e6:>8.2f}us")
+
+
+if __name__ == '__main__':
+    main()
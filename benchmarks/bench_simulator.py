@@ -0,0 +1,31 @@
+"""蒙特卡洛模拟器：输出庄家优势、方差、各操作期望收益以及吞吐量
+
+用法: python benchmarks/bench_simulator.py [局数] [进程数]
+"""
+import sys
+import time
+
+from _common import load
+
+simulator = load('simulator')
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    for name, strategy in (("basic", simulator.basic_strategy),
+                           ("dealer-mimic", simulator.dealer_mimic_strategy)):
+        start = time.perf_counter()
+        stats = simulator.run_simulation(rounds, strategy, seed=1, workers=workers)
+        elapsed = time.perf_counter() - start
+        report = stats.to_dict()
+        print(f"[{name}] {rounds} rounds in {elapsed:.2f}s ({rounds / elapsed:,.0f} rounds/s)")
+        print(f"  house edge: {report['house_edge'] * 100:+.3f}% ± {report['house_edge_stderr'] * 100:.3f}%")
+        print(f"  variance:   {report['variance']:.3f}")
+        for action, ev in sorted(report['action_ev'].items()):
+            print(f"  EV[{action:>6}]: {ev:+.4f} ({report['action_share'][action] * 100:.1f}% of hands)")
+
+
+if __name__ == '__main__':
+    main()
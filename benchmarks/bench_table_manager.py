@@ -0,0 +1,75 @@
+"""牌桌管理基准测试：大量群聊同时有牌桌时的内存占用，以及闲置回收后的内存
+
+模拟 N 个群聊各开一局并下注，分别测量：
+- 全部牌桌常驻内存时的总内存和每桌内存；
+- 回收闲置牌桌后（进行中的牌局挂起为日志中的快照，结束的牌局释放牌靴）的总内存；
+- 新建牌靴与从牌靴池取用牌靴的耗时。
+
+用法: python benchmarks/bench_table_manager.py [群聊数]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from _common import load, timeit
+
+blackjack_game = load('blackjack_game')
+game_journal = load('game_journal')
+table_manager = load('table_manager')
+
+
+def open_tables(manager, count):
+    """为 count 个群聊各开一局，一半的牌局停在下注后，另一半已结束只留下牌靴"""
+    for i in range(count):
+        group_id = f'group{i}'
+        manager.activate(group_id)
+        game = blackjack_game.BJGame(manager.get_shoe(group_id))
+        players = [f'user{i}_{j}' for j in range(3)]
+        game.start_new_game(players)
+        for player_id in players:
+            game.place_bet(player_id, 100)
+        if i % 2:
+            manager.games[group_id] = game
+            manager.journal.record(group_id, game.snapshot())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = game_journal.GameJournal(os.path.join(tmp, 'bjgames.journal'))
+        manager = table_manager.TableManager({}, {}, {}, journal)
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        open_tables(manager, count)
+        resident = tracemalloc.get_traced_memory()[0] - base
+        print(f"{count} 个群聊（{len(manager.games)} 局进行中）: {resident / 1024 / 1024:.1f} MiB，"
+              f"每群 {resident / count:.0f} 字节")
+        print(f"抽样估算每张进行中牌桌: {manager.table_bytes()} 字节")
+
+        for group_id in manager.idle_groups(now=float('inf')):
+            manager.evict(group_id)
+        after = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        print(f"回收后: {after / 1024 / 1024:.1f} MiB，每群 {after / count:.0f} 字节，"
+              f"{manager.stats()}")
+        journal.close()
+
+        pooled = manager.stats()['pooled_shoes']
+        new = timeit(lambda: blackjack_game.Deck(), 2000)
+        manager.shoes.clear()
+        it = iter(range(10 ** 9))
+
+        def reuse():
+            group_id = f'g{next(it)}'
+            manager.get_shoe(group_id)
+            manager.evict(group_id)
+
+        pool = timeit(reuse, 2000)
+        print(f"\n新建牌靴 {new * 1e6:.1f} us，从牌靴池取用并洗牌 {pool * 1e6:.1f} us（池中 {pooled} 个）")
+
+
+if __name__ == '__main__':
+    main()
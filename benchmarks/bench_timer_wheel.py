@@ -0,0 +1,73 @@
+"""行动超时计时基准测试：共用时间轮 vs 每桌一个 threading.Timer
+
+模拟 N 张牌桌各自有一个行动截止时间，并且每次有人行动都要重新计时（取消旧的、设置新的）。
+时间轮只有一个后台线程；threading.Timer 每设置一次就新建一个线程。
+
+用法: python benchmarks/bench_timer_wheel.py [牌桌数]
+"""
+import random
+import sys
+import threading
+import time
+
+from _common import load
+
+timer_wheel = load('timer_wheel')
+
+
+def noop():
+    pass
+
+
+def bench_wheel(tables, rounds, rng):
+    wheel = timer_wheel.TimerWheel(tick=1.0)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for table in tables:
+            wheel.schedule(table, rng.uniform(30, 90), noop)
+    elapsed = time.perf_counter() - start
+    threads = threading.active_count()
+
+    # 一格中到期的定时器数约为 牌桌数 * tick / 超时区间
+    start = time.perf_counter()
+    ticks = 60
+    for _ in range(ticks):
+        wheel._advance()
+    tick_cost = (time.perf_counter() - start) / ticks
+    wheel.stop()
+    return elapsed / (rounds * len(tables)), threads, tick_cost
+
+
+def bench_threading_timer(tables, rounds, rng):
+    timers = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for table in tables:
+            old = timers.get(table)
+            if old is not None:
+                old.cancel()
+            timer = threading.Timer(rng.uniform(30, 90), noop)
+            timer.daemon = True
+            timer.start()
+            timers[table] = timer
+    elapsed = time.perf_counter() - start
+    threads = threading.active_count()
+    for timer in timers.values():
+        timer.cancel()
+    return elapsed / (rounds * len(tables)), threads
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tables = [f'group{i}' for i in range(count)]
+    rng = random.Random(11)
+
+    per_op, threads, tick_cost = bench_wheel(tables, 5, rng)
+    print(f"时间轮:          每次重新计时 {per_op * 1e6:6.2f} us，线程数 {threads}，"
+          f"每格处理 {tick_cost * 1e6:.0f} us")
+    per_op, threads = bench_threading_timer(tables, 1, rng)
+    print(f"threading.Timer: 每次重新计时 {per_op * 1e6:6.2f} us，线程数 {threads}")
+
+
+if __name__ == '__main__':
+    main()
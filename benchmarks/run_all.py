@@ -0,0 +1,179 @@
+"""基准测试套件：核心路径的耗时，结果输出为JSON并与保存的基线比较
+
+覆盖的负载（均为单次操作耗时，越小越好）：
+- round_us:            一局完整的无头牌局（开局 → 下注 → 发牌 → 分牌/加倍/要牌/停牌 → 庄家回合），3名玩家
+- hand_value_ns:       calculate_hand_value 计算一手牌的点数
+- deck_new_us:         新建一个6副牌的牌靴（含洗牌）
+- deck_shuffle_us:     原地洗牌
+- player_get_us_N:     N 名玩家的CSV存储中按会话ID查找并构造 BJPlayer
+- player_update_us_N:  BJPlayer.update_data 更新一个字段（写回前）
+- player_flush_ms_N:   把脏数据写回 N 名玩家的CSV文件
+
+每项取多次重复中最快的一次，减少机器抖动的影响。基线与机器相关，换机器后先用 --save-baseline 重新生成。
+
+用法:
+    python benchmarks/run_all.py                     # 运行并与 benchmarks/baseline.json 比较，变慢超过阈值时退出码为1
+    python benchmarks/run_all.py --json out.json     # 同时把结果写入文件
+    python benchmarks/run_all.py --save-baseline     # 把本次结果保存为基线
+    python benchmarks/run_all.py --quick             # 跳过10万玩家规模，用于快速检查
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+
+from _common import STANDARD_FIELDS, load, timeit, write_player_file
+
+blackjack_game = load('blackjack_game')
+player = load('player')
+player_store = load('player_store')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_TOLERANCE = 0.3
+
+
+def best_of(func, number, repeat=7):
+    """重复 repeat 轮、每轮调用 number 次，返回最快一轮的单次平均耗时（秒）"""
+    return min(timeit(func, number) for _ in range(repeat))
+
+
+def play_round(game, player_ids):
+    """按简化的策略无头地打完一局：对8和A分牌，10/11点加倍，不足17点要牌，否则停牌"""
+    game.start_new_game(player_ids)
+    for player_id in player_ids:
+        game.place_bet(player_id, 10)
+    game.deal_initial_cards()
+    while game.game_status == "playing":
+        player_id = game.players_order[game.current_player_idx]
+        hand_idx = game.current_hand_idx[player_id]
+        hand = game.player_hands[player_id][hand_idx]
+        if game.player_statuses[player_id][hand_idx] == "waiting":
+            value = hand.value
+            if len(hand) == 2 and hand[0].value in (8, 11) and game.can_split(player_id) \
+                    and len(game.player_hands[player_id]) < 4:
+                game.split(player_id)
+                continue
+            if len(hand) == 2 and value in (10, 11):
+                game.double_down(player_id)
+            elif value < 17:
+                game.hit(player_id)
+                continue
+            else:
+                game.stand(player_id)
+        game._advance_to_next_player()
+
+
+def bench_engine(results):
+    rng = random.Random(2024)
+    game = blackjack_game.BJGame(blackjack_game.Deck(rng=rng))
+    player_ids = ['wxid_a', 'wxid_b', 'wxid_c']
+    results['round_us'] = best_of(lambda: play_round(game, player_ids), 2000) * 1e6
+
+    deck = blackjack_game.Deck(rng=rng)
+    hands = []
+    for _ in range(1000):
+        if deck.remaining() < 10:
+            deck.shuffle()
+        hands.append([deck.deal() for _ in range(rng.randrange(2, 6))])
+    it = itertools.cycle(hands)
+    results['hand_value_ns'] = best_of(lambda: game.calculate_hand_value(next(it)), 30_000) * 1e9
+
+    results['deck_new_us'] = best_of(lambda: blackjack_game.Deck(rng=rng), 500) * 1e6
+    results['deck_shuffle_us'] = best_of(deck.shuffle, 500) * 1e6
+
+
+def bench_players(results, sizes):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in sizes:
+            path = os.path.join(tmp, f'players_{count}.csv')
+            write_player_file(path, count)
+            store = player_store.CSVPlayerStore(path, STANDARD_FIELDS)
+            keys = [f'session{rng.randrange(count)}' for _ in range(1000)]
+
+            it = itertools.cycle(keys)
+            results[f'player_get_us_{count}'] = best_of(
+                lambda: player.BJPlayer.get_player(next(it), store=store), 20_000, repeat=3) * 1e6
+
+            players = [player.BJPlayer.get_player(key, store=store) for key in keys]
+            it = itertools.cycle(players)
+            results[f'player_update_us_{count}'] = best_of(
+                lambda: next(it).update_data({'exp': '5'}), 20_000, repeat=3) * 1e6
+
+            def flush():
+                store._mark_dirty(store.get(keys[0])['user_id'])
+                store.flush()
+
+            results[f'player_flush_ms_{count}'] = best_of(flush, 3, repeat=3) * 1e3
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较，返回变慢超过阈值的指标列表"""
+    regressions = []
+    print(f"\n{'metric':>24} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:>24} {'-':>12} {value:>12.3f}")
+            continue
+        ratio = value / base
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  <-- 变慢'
+        print(f"{name:>24} {base:>12.3f} {value:>12.3f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行基准测试套件并与基线比较")
+    parser.add_argument('--json', metavar='FILE', help="把结果写入JSON文件")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="允许的变慢比例，默认0.3（慢30%%以内不算退化）")
+    parser.add_argument('--quick', action='store_true', help="跳过10万玩家规模")
+    args = parser.parse_args(argv)
+
+    results = {}
+    bench_engine(results)
+    bench_players(results, (1_000, 10_000) if args.quick else (1_000, 10_000, 100_000))
+    print(f"一局无头牌局: {1e6 / results['round_us']:.0f} 局/秒")
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {name: round(value, 4) for name, value in results.items()},
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"已保存基线: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"基线文件 {args.baseline} 不存在，使用 --save-baseline 生成")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} 项指标变慢超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n没有超过阈值的性能退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
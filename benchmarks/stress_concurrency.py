@@ -0,0 +1,122 @@
+"""并发压力测试：筹码守恒
+
+在线程池中并发执行数千条牌局指令：多个群聊同时进行牌局，同一玩家同时参与多个群聊。
+每局按插件的方式操作：群聊锁内下注（原子扣筹码）、加倍/分牌（原子补扣）、结算（批量原子派彩）。
+全部完成后检查：所有玩家的筹码总额 == 初始总额 + 各局输赢之和，且每条指令都完成了一局。
+
+用法: python benchmarks/stress_concurrency.py [csv|sqlite] [指令数]
+"""
+import random
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import STANDARD_FIELDS, load, make_row
+
+blackjack_game = load('blackjack_game')
+locks = load('locks')
+player = load('player')
+player_store = load('player_store')
+settlement = load('settlement')
+simulator = load('simulator')
+
+NUM_PLAYERS = 40
+NUM_GROUPS = 12
+PLAYERS_PER_GROUP = 6
+
+
+class Table:
+    """一个群聊的牌局状态，只在持有群聊锁时访问"""
+
+    def __init__(self, group_id, player_ids, rng):
+        self.group_id = group_id
+        self.player_ids = player_ids
+        self.game = blackjack_game.BJGame(blackjack_game.Deck(rng=rng))
+        self.rng = rng
+        self.net = 0  # 本群所有玩家的累计输赢
+        self.rounds = 0
+
+
+def play_command(store, group_locks, table):
+    """执行一条「指令」：在群聊锁内推进一局到结束"""
+    with group_locks.get(table.group_id):
+        game = table.game
+        rng = table.rng
+        players = {pid: player.BJPlayer.get_player(pid, store=store) for pid in table.player_ids}
+        game.start_new_game(table.player_ids)
+
+        for pid, p in players.items():
+            bet = rng.randrange(1, 200)
+            if p.adjust_data({'chips': -bet}):
+                game.place_bet(pid, bet)
+        game.deal_initial_cards()
+
+        while game.game_status == "playing":
+            pid = game.get_current_player()
+            hand_idx = game.current_hand_idx[pid]
+            if game.player_statuses[pid][hand_idx] == "waiting":
+                hand = game.player_hands[pid][hand_idx]
+                bet = game.player_bets[pid][hand_idx]
+                can_split = game.can_split(pid)
+                action = simulator.basic_strategy(hand, game.dealer_hand[0], len(hand) == 2, can_split)
+                if action == "split" and can_split and bet and players[pid].adjust_data({'chips': -bet}):
+                    game.split(pid)
+                    continue
+                if action == "double" and len(hand) == 2 and bet and players[pid].adjust_data({'chips': -bet}):
+                    game.double_down(pid)
+                elif action == "hit":
+                    game.hit(pid)
+                else:
+                    game.stand(pid)
+            if game.player_statuses[pid][hand_idx] != "waiting":
+                game._advance_to_next_player()
+
+        # 与插件相同：结算引擎汇总增量，一次批量写入
+        deltas = settlement.settle_round(game)
+        store.adjust_many(deltas)
+        for hand_results in game.results.values():
+            table.net += sum(result['win_amount'] for result in hand_results)
+        table.rounds += 1
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'csv'
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = player_store.open_player_store({'backend': backend}, tmp, STANDARD_FIELDS)
+        for i in range(NUM_PLAYERS):
+            row = make_row(i)
+            row['chips'] = '100000'
+            store.add(row)
+        initial_total = sum(int(row['chips']) for row in store.rows())
+
+        group_locks = locks.KeyedLocks()
+        player_ids = [f'user{i}' for i in range(NUM_PLAYERS)]
+        tables = [
+            Table(f'group{g}', rng.sample(player_ids, PLAYERS_PER_GROUP), random.Random(g))
+            for g in range(NUM_GROUPS)
+        ]
+        schedule = [rng.choice(tables) for _ in range(commands)]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for future in [executor.submit(play_command, store, group_locks, t) for t in schedule]:
+                future.result()
+        store.flush()
+
+        final_total = sum(int(row['chips']) for row in store.rows())
+        expected = initial_total + sum(t.net for t in tables)
+        rounds = sum(t.rounds for t in tables)
+        print(f"backend={backend} commands={commands} rounds={rounds} threads=16")
+        print(f"initial={initial_total} final={final_total} expected={expected}")
+        if final_total != expected or rounds != commands:
+            print("FAILED: 筹码不守恒")
+            sys.exit(1)
+        print("OK: 筹码守恒")
+        if backend in ('sqlite', 'mmap'):
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
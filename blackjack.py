@@ -1,9 +1,6 @@
 import os
-import csv
-import random
-import json
+import threading
 import time
-import datetime
 from typing import Dict, List, Optional, Any
 from plugins import *
 from common.log import logger
@@ -12,8 +9,99 @@ from bridge.reply import Reply, ReplyType
 from channel.chat_message import ChatMessage
 import plugins
 
-from .player import BJPlayer
-from .blackjack_game import BJGame, Card
+from .command_router import CommandRouter
+from .locks import AsyncKeyedLocks, KeyedLocks
+from .metrics import metrics
+
+
+def _import_engine():
+    """导入游戏引擎和存储模块
+    
+    插件加载时只导入指令路由，这些模块在首次处理本插件的指令时才导入，
+    不拖慢宿主启动，也不影响与21点无关的消息。
+    """
+    global BJPlayer, open_player_store, settle_round, BJGame, GameJournal, TableManager, TimerWheel, ChipLedger, reconcile_chips
+    from .player import BJPlayer
+    from .player_store import open_player_store
+    from .settlement import settle_round
+    from .blackjack_game import BJGame
+    from .game_journal import GameJournal
+    from .ledger import ChipLedger, reconcile_chips
+    from .table_manager import TableManager
+    from .timer_wheel import TimerWheel
+
+
+HELP_TEXT = """
+🃏 21点游戏指令大全 🃏
+
+基础指令
+————————————
+📝 21点注册 - 注册21点游戏
+📊 21点状态 - 查看玩家状态
+📅 21点签到 - 每日签到领取筹码
+📜 21点规则 - 查看游戏规则
+📋 21点菜单 - 显示指令菜单
+
+游戏指令
+————————————
+🎮 21点准备 - 准备参与游戏
+🎲 21点开始 - 开始游戏(需至少1人准备)
+💰 下注[数量] - 下注筹码
+🎯 要牌 - 要一张牌
+🛑 停牌 - 不再要牌
+💪 加倍 - 加倍下注并只要一张牌
+✂️ 分牌 - 将两张相同点数的牌分成两副(需额外下注)
+👀 查看牌局 - 查看当前牌局状态
+💡 提示 - 根据基本策略给出当前手牌的建议操作
+🂠 21点牌靴 - 查看牌靴发牌进度和算牌计数
+🧹 清理21点 - 重置游戏状态(出错时使用)
+
+管理指令
+————————————
+🔄 重置21点 - 清空所有玩家数据和排行榜(管理员专用)
+
+其他功能
+————————————
+🏆 21点排行榜 [类型] - 查看排行榜
+    类型: 筹码(默认)、胜场、blackjack
+"""
+
+RULES_TEXT = """
+🃏 21点游戏规则 🃏
+
+游戏目标
+————————————
+尽可能使手牌点数接近21点但不超过21点，同时打败庄家。
+
+牌面点数
+————————————
+• 2-10的牌: 按牌面值计算
+• J、Q、K: 均为10点
+• A: 可算作1点或11点，自动选择有利的点数
+
+基本规则
+————————————
+1. 游戏开始前，玩家需先准备，然后下注
+2. 开局每人获得2张牌，庄家1张明牌1张暗牌
+3. 轮流行动，可以选择要牌、停牌、加倍或分牌
+4. 超过21点为爆牌，直接输掉本局
+5. 玩家行动完毕后，庄家亮出底牌并按规则要牌
+6. 庄家规则: 手牌小于17点必须要牌，17点及以上必须停牌
+
+特殊规则
+————————————
+• BlackJack: 首两张牌为A+10点牌(10/J/Q/K)，赔率为3:2
+• 加倍(Double Down): 仅限首两张牌时，加倍下注并只能再要一张牌
+• 分牌(Split): 当首两张牌点数相同时，可以分成两副牌，每副牌单独下注和操作
+
+胜负判定
+————————————
+• 玩家BlackJack且庄家非BlackJack: 玩家胜(赔率3:2)
+• 玩家爆牌: 庄家胜
+• 庄家爆牌: 玩家胜
+• 点数比较: 谁更接近21点谁胜
+• 点数相同: 平局，退还下注
+"""
 
 @plugins.register(
     name="BlackJack",
@@ -33,45 +121,367 @@ class BlackJack(Plugin):
     # 游戏状态相关变量
     game_instances = {}  # 群聊ID -> 游戏实例
     ready_players = {}   # 群聊ID -> 准备好的玩家ID列表
+    shoes = {}           # 群聊ID -> 牌靴，跨局重复使用
+    strategy_table = None  # 基本策略表，首次使用提示时加载
+    group_locks = KeyedLocks()   # 群聊ID -> 牌局锁，同一群聊的指令串行执行
+    player_locks = KeyedLocks()  # 玩家ID -> 玩家锁，用于签到、注册等读后写的操作
+    async_locks = AsyncKeyedLocks()  # 群聊ID/会话ID -> 协程锁，异步入口使用
+    executor = None  # 异步入口执行指令和超时处理的线程池，首次使用时创建
+    executor_lock = threading.Lock()
+    timer_wheel = None  # 所有牌桌共用的行动超时时间轮，初始化时创建
+    timeout_notices = {}  # 群聊ID -> 超时自动操作的提示，随该群下一条指令的回复发出
     
     def __init__(self):
         super().__init__()
         self.handlers[Event.ON_HANDLE_CONTEXT] = self.on_handle_context
         
+        # 加载时只构建指令路由表；数据目录、配置和存储在首次处理指令时才初始化
+        self.router = self._build_router()
+        self._ready = False
+        self._init_lock = threading.Lock()
+        logger.info("[BlackJack] 插件已加载")
+        
+    def _ensure_ready(self):
+        """首次处理指令时导入游戏引擎，初始化数据目录、配置和存储，并恢复牌局"""
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            try:
+                _import_engine()
+                
+                # 初始化数据目录
+                self.data_dir = os.path.join(os.path.dirname(__file__), "data")
+                os.makedirs(self.data_dir, exist_ok=True)
+                
+                # 初始化玩家数据文件
+                self.player_file = os.path.join(self.data_dir, "bjplayers.csv")
+                
+                # 加载配置
+                self.config = self._load_config()
+                
+                # 打开玩家数据存储（默认CSV，可在配置中切换为SQLite）
+                self.store = open_player_store(self.config.get("storage", {}), self.data_dir, self.STANDARD_FIELDS)
+                
+                # 筹码流水账本，记录每一次筹码变动
+                self._open_ledger()
+                
+                # 牌局快照日志，用于重启后恢复进行中的牌局；恢复时按账本修正已扣除的下注，
+                # 未启用账本时无法核对，只能在写入快照前先把写回缓存落盘
+                before_record = self.store.flush if self.store.ledger is None else None
+                self.journal = GameJournal(os.path.join(self.data_dir, "bjgames.journal"),
+                                           before_record=before_record)
+                
+                # 牌桌管理：牌靴池和闲置牌桌回收
+                self._init_tables()
+                
+                # 恢复游戏会话（如果有）
+                self._restore_game_sessions()
+                
+                # 行动超时：自动停牌、自动退出未下注的玩家
+                self._init_turn_timers()
+                
+                # 运行指标，可选地定期导出为 Prometheus 文本文件
+                self._init_metrics()
+                
+                self._ready = True
+                logger.info("[BlackJack] 插件初始化完成")
+            except Exception as e:
+                logger.error(f"[BlackJack] 初始化出错: {e}")
+                raise
+            
+    def _load_config(self):
+        """加载插件目录下的config.json，不存在时使用默认配置"""
+        import json
+        
+        config_file = os.path.join(os.path.dirname(__file__), "config.json")
+        if not os.path.exists(config_file):
+            return {}
         try:
-            # 初始化数据目录
-            self.data_dir = os.path.join(os.path.dirname(__file__), "data")
-            os.makedirs(self.data_dir, exist_ok=True)
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"[BlackJack] 读取配置文件出错: {e}")
+            return {}
             
-            # 初始化玩家数据文件
-            self.player_file = os.path.join(self.data_dir, "bjplayers.csv")
+    def _open_ledger(self):
+        """打开筹码流水账本并挂到存储上，首次启用时记录已有玩家的期初余额"""
+        ledger_config = self.config.get("ledger", {})
+        if not ledger_config.get("enabled", True) or self.store.ledger is not None:
+            return
+        ledger = ChipLedger(
+            os.path.join(self.data_dir, "bjchips.ledger"),
+            ledger_config.get("sync_interval", ChipLedger.DEFAULT_SYNC_INTERVAL)
+        )
+        if ledger.is_new:
+            ledger.open_balances(self.store.rows())
+        self.store.ledger = ledger
+        
+    def _init_tables(self):
+        """创建牌桌管理器，读取牌桌回收配置"""
+        game_config = self.config.get("game", {})
+        tables_config = self.config.get("tables", {})
+        # 牌靴参数未配置时使用 Deck 的默认值
+        deck_options = {key: game_config[key] for key in ("num_decks", "penetration") if key in game_config}
+        self.tables = TableManager(
+            self.game_instances, self.shoes, self.ready_players, self.journal, **deck_options,
+            idle_ttl=tables_config.get("idle_ttl", TableManager.DEFAULT_IDLE_TTL),
+            max_pooled_shoes=tables_config.get("max_pooled_shoes", TableManager.DEFAULT_MAX_POOLED_SHOES),
+        )
+        self.sweep_interval = tables_config.get("sweep_interval", 60)
+        self.tables_swept = time.monotonic()
+        
+    def _sweep_idle_tables(self):
+        """每隔 sweep_interval 秒回收一次闲置牌桌，正在处理指令的群聊留到下次"""
+        now = time.monotonic()
+        if now - self.tables_swept < self.sweep_interval:
+            return
+        self.tables_swept = now
+        evicted = 0
+        for group_id in self.tables.idle_groups(now):
+            lock = self.group_locks.get(group_id)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                # 拿到锁后再确认一次，期间可能有新指令
+                if not self.tables.is_idle(group_id, now):
+                    continue
+                for player_id in self.tables.evict(group_id):
+                    self._update_player_data(player_id, {'ready_status': 'False'})
+                self.turn_states.pop(group_id, None)
+                self.timer_wheel.cancel(group_id)
+                self.timeout_notices.pop(group_id, None)
+                evicted += 1
+            finally:
+                lock.release()
+        if evicted:
+            metrics.inc('tables_evicted', evicted)
+            logger.info(f"[BlackJack] 已回收 {evicted} 张闲置牌桌")
+            
+    def _init_turn_timers(self):
+        """读取超时配置，为恢复的牌局开始计时"""
+        turns_config = self.config.get("turns", {})
+        # 阶段 -> 超时秒数，0 表示不限时
+        self.turn_timeouts = {
+            "ready": turns_config.get("ready_timeout", 600),
+            "betting": turns_config.get("bet_timeout", 60),
+            "playing": turns_config.get("action_timeout", 60),
+        }
+        self.turn_states = {}  # 群聊ID -> 正在计时的牌局状态
+        if BlackJack.timer_wheel is None:
+            BlackJack.timer_wheel = TimerWheel()
+        for group_id in list(self.game_instances):
+            self._arm_turn_timer(group_id)
             
-            # 创建玩家数据文件（如果不存在）
-            if not os.path.exists(self.player_file):
-                with open(self.player_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=self.STANDARD_FIELDS)
-                    writer.writeheader()
+    def _turn_state(self, group_id):
+        """群聊当前需要计时的状态，不需要计时时返回 None
+        
+        状态元组的第一项为阶段，其余各项变化（有人下注、要牌、轮到下一手牌等）时重新计时。
+        """
+        game = self.game_instances.get(group_id)
+        if game is not None and game.game_status == "betting":
+            placed = sum(1 for bets in game.player_bets.values() if bets and bets[0] > 0)
+            return ("betting", len(game.player_bets), placed)
+        if game is not None and game.game_status == "playing":
+            player_id = game.get_current_player()
+            if player_id is None:
+                return None
+            hands = game.player_hands[player_id]
+            hand_idx = game.current_hand_idx.get(player_id, 0)
+            return ("playing", game.current_player_idx, hand_idx, len(hands), len(hands[hand_idx]))
+        if (game is None or game.game_status in ("waiting", "finished")) and self.ready_players.get(group_id):
+            return ("ready", len(self.ready_players[group_id]))
+        return None
+        
+    def _arm_turn_timer(self, group_id):
+        """牌局状态变化时重新计时，状态未变时保留原有的截止时间（调用方持有群聊锁）"""
+        state = self._turn_state(group_id)
+        if state == self.turn_states.get(group_id):
+            return
+        timeout = self.turn_timeouts[state[0]] if state else 0
+        if not timeout:
+            self.turn_states.pop(group_id, None)
+            self.timer_wheel.cancel(group_id)
+            return
+        self.turn_states[group_id] = state
+        self.timer_wheel.schedule(group_id, timeout, lambda: self._dispatch_turn_timeout(group_id, state))
+        
+    def _dispatch_turn_timeout(self, group_id, state):
+        """时间轮回调：只把超时的牌桌交给线程池
+
+        超时处理可能一路执行到庄家回合、结算和落盘，放在时间轮线程中会拖慢所有牌桌的计时。
+        """
+        def log_error(future):
+            if future.exception() is not None:
+                logger.error(f"[BlackJack] 群聊 {group_id} 超时处理出错: {future.exception()}")
+        self._get_executor().submit(self._on_turn_timeout, group_id, state).add_done_callback(log_error)
+        
+    def _on_turn_timeout(self, group_id, state):
+        """超时处理，在指令线程池中执行"""
+        with self.group_locks.get(group_id):
+            # 计时期间状态已经变化（例如刚好有人行动）时放弃
+            if self.turn_states.get(group_id) != state or self._turn_state(group_id) != state:
+                return
+            del self.turn_states[group_id]
+            
+            phase = state[0]
+            if phase == "playing":
+                notice = self._auto_stand(group_id)
+            elif phase == "betting":
+                notice = self._auto_fold(group_id)
+            else:
+                notice = self._expire_ready(group_id)
+            metrics.inc(f'turn_timeouts_{phase}')
+            self.timeout_notices.setdefault(group_id, []).append(notice)
             
-            # 恢复游戏会话（如果有）
-            self._restore_game_sessions()
+            self._save_game_session(group_id)
+            self._arm_turn_timer(group_id)
             
-            logger.info("[BlackJack] 插件初始化完成")
-        except Exception as e:
-            logger.error(f"[BlackJack] 初始化出错: {e}")
-            raise
+    def _auto_stand(self, group_id):
+        """当前玩家行动超时，自动停牌并轮到下一手牌、下一名玩家或庄家"""
+        game = self.game_instances[group_id]
+        player_id = game.get_current_player()
+        hand_idx = game.current_hand_idx.get(player_id, 0)
+        game.stand(player_id)
+        
+        player = self.get_player(player_id)
+        nickname = player.nickname if player else player_id
+        hand_marker = f"手牌{hand_idx+1} " if len(game.player_hands[player_id]) > 1 else ""
+        result = [f"⏰ {nickname} {hand_marker}超时未行动，已自动停牌"]
+        next_action = self._move_to_next_player(group_id)
+        if next_action:
+            result.append(next_action)
+        return "\n".join(result)
+        
+    def _auto_fold(self, group_id):
+        """下注超时，未下注的玩家退出本局，其余玩家直接发牌"""
+        game = self.game_instances[group_id]
+        folded = [player_id for player_id, bets in game.player_bets.items() if not bets[0]]
+        nicknames = []
+        for player_id in folded:
+            game.remove_player(player_id)
+            player = self.get_player(player_id)
+            nicknames.append(player.nickname if player else player_id)
             
+        result = [f"⏰ {', '.join(nicknames)} 超时未下注，已退出本局"]
+        if not game.player_hands:
+            self.game_instances.pop(group_id, None)
+            result.append("本局没有玩家下注，游戏已取消")
+        else:
+            result.append(self._deal_initial_cards(group_id))
+        return "\n".join(result)
+        
+    def _expire_ready(self, group_id):
+        """准备后长时间没有开始游戏，取消准备"""
+        ready_players = self.ready_players.pop(group_id, [])
+        for player_id in ready_players:
+            self._update_player_data(player_id, {'ready_status': 'False'})
+        return f"⏰ 长时间没有开始游戏，已取消 {len(ready_players)} 名玩家的准备"
+        
+    def _init_metrics(self):
+        """注册仪表并读取指标导出配置"""
+        metrics.gauge('game_instances', lambda: len(self.game_instances))
+        metrics.gauge('players', lambda: len(self.store))
+        metrics.gauge('dirty_players', lambda: getattr(self.store, 'dirty_count', 0))
+        for name in ('parked_tables', 'shoes', 'pooled_shoes', 'tracked_groups'):
+            metrics.gauge(name, lambda name=name: self.tables.stats()[name])
+        metrics.gauge('table_bytes', self.tables.table_bytes)
+        metrics.gauge('turn_timers', lambda: len(self.timer_wheel))
+        
+        metrics_config = self.config.get("metrics", {})
+        self.metrics_file = metrics_config.get("prometheus_file")
+        if self.metrics_file and not os.path.isabs(self.metrics_file):
+            self.metrics_file = os.path.join(self.data_dir, self.metrics_file)
+        self.metrics_interval = metrics_config.get("dump_interval", 15)
+        self.metrics_dumped = 0.0
+        
+    def _dump_metrics(self):
+        """距上次导出超过 dump_interval 秒时把指标写入 Prometheus 文本文件"""
+        now = time.time()
+        if now - self.metrics_dumped < self.metrics_interval:
+            return
+        self.metrics_dumped = now
+        try:
+            metrics.dump(self.metrics_file)
+        except Exception as e:
+            logger.error(f"[BlackJack] 导出运行指标出错: {e}")
+            
+    def _build_router(self):
+        """构建指令路由表，处理函数参数为 (session_id, user_id, nickname, group_id, content)"""
+        router = CommandRouter()
+        router.add(["BlackJack注册", "21点注册"], lambda s, u, n, g, c: self.register_player(s, u, n))
+        router.add(["BlackJack签到", "21点签到"], lambda s, u, n, g, c: self.daily_checkin(s))
+        router.add(["BlackJack状态", "21点状态"], lambda s, u, n, g, c: self.get_player_status(s))
+        router.add(["BlackJack排行榜", "21点排行榜"], lambda s, u, n, g, c: self.show_leaderboard(s, c))
+        router.add(["BlackJack菜单", "21点菜单"], lambda s, u, n, g, c: self.game_help())
+        router.add(["BlackJack规则", "21点规则"], lambda s, u, n, g, c: self.game_rules())
+        router.add(["BlackJack准备", "21点准备"], lambda s, u, n, g, c: self.player_ready(s, n, g))
+        router.add(["开始BlackJack", "开始21点", "21点开始"], lambda s, u, n, g, c: self.start_game(s, g))
+        router.add(["下注"], lambda s, u, n, g, c: self.place_bet(s, c, g))
+        # 特殊处理下注无空格情况，例如「下注100」
+        router.add_prefix("下注", lambda s, u, n, g, c: self.place_bet(s, c, g))
+        router.add(["要牌"], lambda s, u, n, g, c: self.hit(s, g))
+        router.add(["停牌"], lambda s, u, n, g, c: self.stand(s, g))
+        router.add(["加倍"], lambda s, u, n, g, c: self.double_down(s, g))
+        router.add(["分牌"], lambda s, u, n, g, c: self.split(s, g))
+        router.add(["查看牌局"], lambda s, u, n, g, c: self.show_game_state(s, g))
+        router.add(["提示", "21点提示"], lambda s, u, n, g, c: self.strategy_hint(s, g))
+        router.add(["BlackJack牌靴", "21点牌靴"], lambda s, u, n, g, c: self.show_shoe_stats(g))
+        router.add(["清理BlackJack", "清理21点"], lambda s, u, n, g, c: self.reset_blackjack_game(s, g))
+        router.add(["重置BlackJack", "重置21点"], lambda s, u, n, g, c: self.reset_all_data(s, u))
+        router.add(["BJStatus"], lambda s, u, n, g, c: self.show_debug_status(s, g))
+        return router
+        
     def _restore_game_sessions(self):
-        """恢复游戏会话"""
-        # 这个方法将从文件中加载任何之前保存的游戏会话
-        # 简单起见，当前版本不实现持久化游戏状态
-        pass
+        """从牌局日志恢复重启前仍在进行的牌局（包括已扣除筹码的下注）"""
+        restored = 0
+        for group_id, snapshot in self.journal.load().items():
+            try:
+                game = BJGame.restore(snapshot)
+            except ValueError as e:
+                logger.error(f"[BlackJack] 恢复群聊 {group_id} 的牌局出错: {e}")
+                self.journal.end(group_id)
+                continue
+            self.game_instances[group_id] = game
+            self.shoes[group_id] = game.deck
+            self.tables.activate(group_id)
+            restored += 1
+        if restored:
+            logger.info(f"[BlackJack] 已恢复 {restored} 个进行中的牌局")
+        if restored and self.store.ledger is not None:
+            # 下注扣款可能还没写回就崩溃了，按账本修正恢复的牌局中玩家的余额
+            player_ids = {player_id for game in self.game_instances.values() for player_id in game.players_order}
+            reconcile_chips(self.store, self.store.ledger.ledger_file, player_ids)
+            
+    def _save_game_session(self, group_id):
+        """把群聊牌局的当前状态追加到牌局日志，牌局已结束时记录结束"""
+        try:
+            game = self.game_instances.get(group_id)
+            if game is None:
+                self.journal.end(group_id)
+            else:
+                self.journal.record(group_id, game.snapshot())
+        except Exception as e:
+            logger.error(f"[BlackJack] 保存群聊 {group_id} 的牌局出错: {e}")
         
-    def on_handle_context(self, e_context: EventContext):
-        """处理上下文事件"""
+    def _parse_command(self, e_context: EventContext):
+        """解析消息对应的指令和用户信息
+        
+        Returns:
+            tuple: (处理函数, session_id, user_id, nickname, group_id, content)，不是本插件的指令时返回 None
+        """
         if e_context['context'].type != ContextType.TEXT:
-            return
+            return None
             
         content = e_context['context'].content.strip()
+        
+        # 查找命令，不是本插件指令的消息直接放行
+        handler = self.router.match(content)
+        if handler is None:
+            e_context.action = EventAction.CONTINUE
+            return None
+            
         msg: ChatMessage = e_context['context']['msg']
         
         # 获取会话ID和用户信息
@@ -97,67 +507,79 @@ class BlackJack(Plugin):
             group_id = None
         
         if not session_id:
-            return "无法获取您的会话ID，请确保ID已设置"
+            logger.warning("[BlackJack] 无法获取会话ID，忽略该指令")
+            return None
             
         logger.debug(f"[BlackJack] 当前用户信息 - session_id: {session_id}, user_id: {user_id}, nickname: {nickname}, group_id: {group_id}")
+        return handler, session_id, user_id, nickname, group_id, content
+        
+    def _run_command(self, handler, session_id, user_id, nickname, group_id, content):
+        """执行指令并记录牌局状态，返回回复文本"""
+        self._ensure_ready()
+        
+        start = time.perf_counter()
+        # 同一群聊的指令串行执行，不同群聊之间互不阻塞
+        with self.group_locks.get(group_id):
+            if group_id:
+                # 刷新牌桌活跃时间，恢复闲置时被挂起的牌局
+                self.tables.activate(group_id)
+            reply = handler(session_id, user_id, nickname, group_id, content)
+            # 处理过指令后记录牌局状态，未变化时不会重复写入
+            if group_id:
+                self._save_game_session(group_id)
+                self._arm_turn_timer(group_id)
+                # 先发出期间发生的超时自动操作
+                notices = self.timeout_notices.pop(group_id, None)
+                if notices:
+                    reply = "\n\n".join(notices + [reply])
+        # 耗时包括等待群聊锁的时间，即用户实际感受到的延迟
+        metrics.observe(self.router.name(handler), time.perf_counter() - start)
+        if self.metrics_file:
+            self._dump_metrics()
+        self._sweep_idle_tables()
+        return reply
         
-        # 命令处理
-        cmd_handlers = {
-            "BlackJack注册": lambda s, u, n, g: self.register_player(s, u, n),
-            "21点注册": lambda s, u, n, g: self.register_player(s, u, n),
-            "BlackJack签到": lambda s, u, n, g: self.daily_checkin(s),
-            "21点签到": lambda s, u, n, g: self.daily_checkin(s),
-            "BlackJack状态": lambda s, u, n, g: self.get_player_status(s),
-            "21点状态": lambda s, u, n, g: self.get_player_status(s),
-            "BlackJack排行榜": lambda s, u, n, g: self.show_leaderboard(s, content),
-            "21点排行榜": lambda s, u, n, g: self.show_leaderboard(s, content),
-            "BlackJack菜单": lambda s, u, n, g: self.game_help(),
-            "21点菜单": lambda s, u, n, g: self.game_help(),
-            "BlackJack规则": lambda s, u, n, g: self.game_rules(),
-            "21点规则": lambda s, u, n, g: self.game_rules(),
-            "BlackJack准备": lambda s, u, n, g: self.player_ready(s, n, g),
-            "21点准备": lambda s, u, n, g: self.player_ready(s, n, g),
-            "开始BlackJack": lambda s, u, n, g: self.start_game(s, g),
-            "开始21点": lambda s, u, n, g: self.start_game(s, g),
-            "21点开始": lambda s, u, n, g: self.start_game(s, g),
-            "下注": lambda s, u, n, g: self.place_bet(s, content, g),
-            "要牌": lambda s, u, n, g: self.hit(s, g),
-            "停牌": lambda s, u, n, g: self.stand(s, g),
-            "加倍": lambda s, u, n, g: self.double_down(s, g),
-            "分牌": lambda s, u, n, g: self.split(s, g),
-            "查看牌局": lambda s, u, n, g: self.show_game_state(s, g),
-            "清理BlackJack": lambda s, u, n, g: self.reset_blackjack_game(s, g),
-            "清理21点": lambda s, u, n, g: self.reset_blackjack_game(s, g),
-            "重置BlackJack": lambda s, u, n, g: self.reset_all_data(s, u),
-            "重置21点": lambda s, u, n, g: self.reset_all_data(s, u),
-            "BJStatus": lambda s, u, n, g: self.show_debug_status(s, g)
-        }
+    def on_handle_context(self, e_context: EventContext):
+        """处理上下文事件"""
+        command = self._parse_command(e_context)
+        if command is None:
+            return
+            
+        reply = self._run_command(*command)
+        e_context['reply'] = Reply(ReplyType.TEXT, reply)
+        e_context.action = EventAction.BREAK_PASS
+        
+    def _get_executor(self):
+        """获取异步入口和超时处理共用的线程池"""
+        with BlackJack.executor_lock:
+            if BlackJack.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                max_workers = self.config.get("async", {}).get("max_workers", 8)
+                BlackJack.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="BlackJack")
+            return BlackJack.executor
+        
+    async def on_handle_context_async(self, e_context: EventContext):
+        """处理上下文事件（asyncio 版本）
+        
+        供基于 asyncio 的宿主直接 await。指令（包括其中的文件读写和结算）在线程池中执行，
+        不会阻塞事件循环；同一群聊（私聊按会话）的指令在协程层面排队依次执行，
+        排队中的指令不占用线程，因此一个群聊的慢速结算不会拖慢其他群聊的消息处理。
+        """
+        command = self._parse_command(e_context)
+        if command is None:
+            return
+            
+        import asyncio
         
-        # 查找命令
-        cmd = content.split()[0] if content.split() else ""
-        
-        # 特殊处理下注无空格情况
-        if content.startswith("下注") and len(content) > 2 and not content.startswith("下注 "):
-            reply = self.place_bet(session_id, content, group_id)
-            e_context['reply'] = Reply(ReplyType.TEXT, reply)
-            e_context.action = EventAction.BREAK_PASS
-        elif cmd in cmd_handlers:
-            reply = cmd_handlers[cmd](session_id, user_id, nickname, group_id)
-            e_context['reply'] = Reply(ReplyType.TEXT, reply)
-            e_context.action = EventAction.BREAK_PASS
-        else:
-            # 尝试进行大小写不敏感匹配
-            cmd_lower = cmd.lower()
-            found = False
-            for command in cmd_handlers:
-                if command.lower() == cmd_lower:
-                    reply = cmd_handlers[command](session_id, user_id, nickname, group_id)
-                    e_context['reply'] = Reply(ReplyType.TEXT, reply)
-                    e_context.action = EventAction.BREAK_PASS
-                    found = True
-                    break
-            if not found:
-                e_context.action = EventAction.CONTINUE
+        session_id, group_id = command[1], command[4]
+        loop = asyncio.get_running_loop()
+        if not self._ready:
+            # 首次初始化涉及文件读写，同样放到线程中执行
+            await loop.run_in_executor(None, self._ensure_ready)
+        async with self.async_locks.get(group_id or session_id):
+            reply = await loop.run_in_executor(self._get_executor(), self._run_command, *command)
+        e_context['reply'] = Reply(ReplyType.TEXT, reply)
+        e_context.action = EventAction.BREAK_PASS
             
     def register_player(self, session_id, user_id=None, nickname=None):
         """注册新玩家
@@ -170,34 +592,36 @@ class BlackJack(Plugin):
         if not session_id:
             return "无法获取您的会话ID，请确保ID已设置"
         
-        # 检查是否已注册
-        if self.get_player(session_id):
-            return "您已经注册过21点游戏了"
-        
-        try:
-            # 如果没有提供昵称，使用session_id作为默认昵称
-            if not nickname:
-                nickname = str(session_id)
+        # 同一会话的注册串行执行，避免重复注册
+        with self.player_locks.get(session_id):
+            # 检查是否已注册
+            if self.get_player(session_id):
+                return "您已经注册过21点游戏了"
             
-            # 创建新玩家
-            player = BJPlayer.create_new(user_id or session_id, nickname, session_id)
-            player.player_file = self.player_file
-            player.standard_fields = self.STANDARD_FIELDS
-            
-            # 保存玩家数据
-            with open(self.player_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.STANDARD_FIELDS)
-                writer.writerow(player.to_dict())
-            
-            return f"🃏 恭喜！{nickname} 成功注册21点游戏\n💰 初始筹码: 1000\n输入「21点菜单」查看游戏指令"
-        except Exception as e:
-            logger.error(f"注册21点玩家出错: {e}")
-            return "注册失败，请稍后再试"
+            try:
+                # 如果没有提供昵称，使用session_id作为默认昵称
+                if not nickname:
+                    nickname = str(session_id)
+                
+                # 创建新玩家
+                player = BJPlayer.create_new(user_id or session_id, nickname, session_id)
+                player.player_file = self.player_file
+                player.standard_fields = self.STANDARD_FIELDS
+                player.store = self.store
+                
+                # 保存玩家数据；玩家ID已被其他会话注册时不覆盖原有数据
+                if not self.store.add(player.to_dict()):
+                    return "您已经注册过21点游戏了"
+                
+                return f"🃏 恭喜！{nickname} 成功注册21点游戏\n💰 初始筹码: 1000\n输入「21点菜单」查看游戏指令"
+            except Exception as e:
+                logger.error(f"注册21点玩家出错: {e}")
+                return "注册失败，请稍后再试"
             
-    def get_player(self, user_id) -> Optional[BJPlayer]:
+    def get_player(self, user_id) -> Optional['BJPlayer']:
         """获取玩家数据"""
         try:
-            player = BJPlayer.get_player(user_id, self.player_file)
+            player = BJPlayer.get_player(user_id, store=self.store)
             if player:
                 # 设置必要的文件信息
                 player.player_file = self.player_file
@@ -209,52 +633,56 @@ class BlackJack(Plugin):
             
     def daily_checkin(self, user_id):
         """每日签到"""
+        from datetime import datetime
+        
         player = self.get_player(user_id)
         if not player:
             return "您还没有注册21点游戏，请先发送「21点注册」进行注册"
             
-        # 检查是否已经签到
-        current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-        if player.last_checkin == current_date:
-            return f"您今天已经签到过了，明天再来吧"
-            
-        # 计算奖励
-        base_reward = 200
-        level_bonus = player.level * 50
-        total_reward = base_reward + level_bonus
-        
-        # 增加经验值
-        current_exp = player.exp
-        new_exp = current_exp + 10
-        
-        # 检查是否升级
-        current_level = player.level
-        exp_needed = int(current_level * 100 * (1 + (current_level - 1) * 0.5))
-        if new_exp >= exp_needed:
-            new_level = current_level + 1
-            new_chips = player.chips + total_reward + 300  # 升级额外奖励300筹码
+        # 同一玩家的签到串行执行，避免在多个群同时签到时重复领取奖励
+        with self.player_locks.get(player.user_id):
+            player = self.get_player(user_id)
+            
+            # 检查是否已经签到
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            if player.last_checkin == current_date:
+                return f"您今天已经签到过了，明天再来吧"
+                
+            # 计算奖励
+            base_reward = 200
+            level_bonus = player.level * 50
+            total_reward = base_reward + level_bonus
+            
+            # 增加经验值
+            current_exp = player.exp
+            new_exp = current_exp + 10
+            
+            # 检查是否升级
+            current_level = player.level
+            exp_needed = int(current_level * 100 * (1 + (current_level - 1) * 0.5))
+            level_up = new_exp >= exp_needed
+            new_level = current_level + 1 if level_up else current_level
+            chips_reward = total_reward + 300 if level_up else total_reward  # 升级额外奖励300筹码
+            
+            # 更新玩家数据，筹码和经验以增量原子写入
+            player.adjust_data({'chips': chips_reward, 'exp': 10}, 'checkin')
+            player.update_data({
+                'level': str(new_level),
+                'last_checkin': current_date
+            })
+            
+        if level_up:
             result = [
                 f"🎉 签到成功！获得 {total_reward} 筹码",
                 f"🎊 恭喜升级到 {new_level} 级！额外奖励 300 筹码",
-                f"当前筹码: {new_chips}"
+                f"当前筹码: {player.chips}"
             ]
         else:
-            new_level = current_level
-            new_chips = player.chips + total_reward
             result = [
                 f"🎉 签到成功！获得 {total_reward} 筹码",
-                f"当前筹码: {new_chips}",
+                f"当前筹码: {player.chips}",
                 f"距离下一级还需要: {exp_needed - new_exp} 经验"
             ]
-            
-        # 更新玩家数据
-        self._update_player_data(user_id, {
-            'chips': str(new_chips),
-            'level': str(new_level),
-            'exp': str(new_exp),
-            'last_checkin': current_date
-        })
-        
         return "\n".join(result)
         
     def get_player_status(self, user_id):
@@ -279,45 +707,39 @@ class BlackJack(Plugin):
         if leaderboard_type not in valid_types:
             leaderboard_type = "chips"
             
-        # 读取所有玩家数据
-        all_players = []
-        try:
-            with open(self.player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                all_players = list(reader)
-        except Exception as e:
-            logger.error(f"读取玩家数据出错: {e}")
-            return "读取排行榜数据失败，请稍后再试"
-            
-        # 根据类型排序
+        # 根据类型选择排行字段
         if leaderboard_type in ["chips", "筹码"]:
-            sorted_players = sorted(all_players, key=lambda x: int(x.get('chips', 0)), reverse=True)
             title = "💰 21点筹码排行榜"
             field = "chips"
             prefix = ""
         elif leaderboard_type == "胜场":
-            sorted_players = sorted(all_players, key=lambda x: int(x.get('total_wins', 0)), reverse=True)
             title = "🏆 21点胜场排行榜"
             field = "total_wins"
             prefix = ""
         elif leaderboard_type == "blackjack":
-            sorted_players = sorted(all_players, key=lambda x: int(x.get('blackjack_count', 0)), reverse=True)
             title = "🎯 21点BlackJack次数排行榜"
             field = "blackjack_count"
             prefix = ""
             
+        # 从增量维护的排行榜索引中读取
+        try:
+            leaderboard = self.store.leaderboard
+            top_players = leaderboard.top(field, 10)
+            user_rank = leaderboard.rank(field, player.user_id)
+        except Exception as e:
+            logger.error(f"读取玩家数据出错: {e}")
+            return "读取排行榜数据失败，请稍后再试"
+            
         # 构建排行榜显示
         result = [title, "————————————"]
         
         # 只显示前10名
-        for i, p in enumerate(sorted_players[:10], 1):
-            player_nickname = p.get('nickname', '未知玩家')
-            value = int(p.get(field, 0))
+        for i, (player_id, value) in enumerate(top_players, 1):
+            p = self.store.get(player_id)
+            player_nickname = p.get('nickname', '未知玩家') if p else '未知玩家'
             result.append(f"{i}. {player_nickname}: {prefix}{value}")
             
         # 添加用户自己的排名
-        user_rank = next((i for i, p in enumerate(sorted_players, 1) 
-                         if p.get('user_id') == player.user_id), None)
         if user_rank:
             if user_rank > 10:
                 result.append("...")
@@ -333,78 +755,16 @@ class BlackJack(Plugin):
             
     def game_help(self):
         """显示游戏菜单"""
-        return """
-🃏 21点游戏指令大全 🃏
-
-基础指令
-————————————
-📝 21点注册 - 注册21点游戏
-📊 21点状态 - 查看玩家状态
-📅 21点签到 - 每日签到领取筹码
-📜 21点规则 - 查看游戏规则
-📋 21点菜单 - 显示指令菜单
-
-游戏指令
-————————————
-🎮 21点准备 - 准备参与游戏
-🎲 21点开始 - 开始游戏(需至少1人准备)
-💰 下注[数量] - 下注筹码
-🎯 要牌 - 要一张牌
-🛑 停牌 - 不再要牌
-💪 加倍 - 加倍下注并只要一张牌
-✂️ 分牌 - 将两张相同点数的牌分成两副(需额外下注)
-👀 查看牌局 - 查看当前牌局状态
-🧹 清理21点 - 重置游戏状态(出错时使用)
-
-管理指令
-————————————
-🔄 重置21点 - 清空所有玩家数据和排行榜(管理员专用)
-
-其他功能
-————————————
-🏆 21点排行榜 [类型] - 查看排行榜
-    类型: 筹码(默认)、胜场、blackjack
-"""
+        return HELP_TEXT
 
     def game_rules(self):
         """显示游戏规则"""
-        return """
-🃏 21点游戏规则 🃏
-
-游戏目标
-————————————
-尽可能使手牌点数接近21点但不超过21点，同时打败庄家。
-
-牌面点数
-————————————
-• 2-10的牌: 按牌面值计算
-• J、Q、K: 均为10点
-• A: 可算作1点或11点，自动选择有利的点数
-
-基本规则
-————————————
-1. 游戏开始前，玩家需先准备，然后下注
-2. 开局每人获得2张牌，庄家1张明牌1张暗牌
-3. 轮流行动，可以选择要牌、停牌、加倍或分牌
-4. 超过21点为爆牌，直接输掉本局
-5. 玩家行动完毕后，庄家亮出底牌并按规则要牌
-6. 庄家规则: 手牌小于17点必须要牌，17点及以上必须停牌
-
-特殊规则
-————————————
-• BlackJack: 首两张牌为A+10点牌(10/J/Q/K)，赔率为3:2
-• 加倍(Double Down): 仅限首两张牌时，加倍下注并只能再要一张牌
-• 分牌(Split): 当首两张牌点数相同时，可以分成两副牌，每副牌单独下注和操作
-
-胜负判定
-————————————
-• 玩家BlackJack且庄家非BlackJack: 玩家胜(赔率3:2)
-• 玩家爆牌: 庄家胜
-• 庄家爆牌: 玩家胜
-• 点数比较: 谁更接近21点谁胜
-• 点数相同: 平局，退还下注
-"""
+        return RULES_TEXT
 
+    def _get_shoe(self, group_id):
+        """获取群聊的牌靴，不存在时从牌靴池取用或按配置创建"""
+        return self.tables.get_shoe(group_id)
+        
     def player_ready(self, user_id, nickname, group_id):
         """玩家准备"""
         if not group_id:
@@ -449,8 +809,8 @@ class BlackJack(Plugin):
         if group_id not in self.ready_players or len(self.ready_players[group_id]) < 1:
             return "至少需要1名玩家准备才能开始游戏，请使用「21点准备」准备参与"
             
-        # 创建新游戏实例
-        game = BJGame()
+        # 创建新游戏实例，沿用本群的牌靴
+        game = BJGame(self._get_shoe(group_id))
         game.start_new_game(self.ready_players[group_id])
         self.game_instances[group_id] = game
         
@@ -527,18 +887,18 @@ class BlackJack(Plugin):
         if bet_amount <= 0:
             return "下注金额必须大于0"
             
-        if bet_amount > player.chips:
+        # 立即原子地扣除下注筹码，重复下注时只补扣（或退还）与上次下注的差额
+        previous_bet = game.player_bets[user_id][0]
+        if not player.adjust_data({'chips': previous_bet - bet_amount}, 'bet', game.round_id):
             return f"下注失败，您的筹码不足\n当前筹码: {player.chips}"
             
         # 更新下注金额
         success = game.place_bet(user_id, bet_amount)
         if not success:
+            player.adjust_data({'chips': bet_amount - previous_bet}, 'refund', game.round_id)
             return "下注失败，请稍后再试"
             
-        # 立即扣除下注筹码并更新玩家数据
-        new_chips = player.chips - bet_amount
-        player.chips = new_chips
-        self._update_player_data(user_id, {'chips': str(new_chips), 'current_bet': str(bet_amount)})
+        player.update_data({'current_bet': str(bet_amount)})
         
         result = [f"💰 {player.nickname} 下注 {bet_amount} 筹码"]
         
@@ -600,9 +960,6 @@ class BlackJack(Plugin):
             # 检查是否是BlackJack
             if len(player_hand) == 2 and hand_value == 21:
                 result.append(f"🎉 BlackJack! 恭喜 {player.nickname}!")
-                # 更新blackjack计数
-                current_count = int(player.blackjack_count)
-                self._update_player_data(player_id, {'blackjack_count': str(current_count + 1)})
         
         # 更新游戏状态
         game.game_status = "playing"
@@ -778,23 +1135,18 @@ class BlackJack(Plugin):
         if len(game.player_hands[user_id][hand_idx]) != 2:
             return "只有在拥有两张牌时才能加倍"
             
-        # 检查玩家筹码是否足够
+        # 原子地再扣一次下注金额，筹码不足时不做修改
         bet_amount = game.player_bets[user_id][hand_idx]
-        if player.chips < bet_amount:
+        if not player.adjust_data({'chips': -bet_amount}, 'double', game.round_id):
             return f"加倍失败，您的筹码不足\n当前筹码: {player.chips}\n所需筹码: {bet_amount}"
             
         # 执行加倍操作
         success, new_card, hand_value, is_bust = game.double_down(user_id)
         if not success or not new_card:
+            player.adjust_data({'chips': bet_amount}, 'refund', game.round_id)
             return "加倍失败，请稍后再试"
             
-        # 更新玩家数据
         new_bet = bet_amount * 2
-        new_chips = player.chips - bet_amount  # 再扣一次下注金额
-        player.chips = new_chips
-        self._update_player_data(user_id, {
-            'chips': str(new_chips)
-        })
         
         # 显示所有手牌状态
         result = [f"💪 {player.nickname} 手牌{hand_idx+1} 选择加倍!"]
@@ -819,12 +1171,9 @@ class BlackJack(Plugin):
         result.append(f"每手牌下注: {', '.join(str(bet) for bet in hand_bets)} 筹码")
         result.append(f"总下注: {sum(game.player_bets[user_id])} 筹码")
         
-        # 如果爆牌，添加提示信息并更新战绩
+        # 如果爆牌，添加提示信息（战绩在结算时统一更新）
         if is_bust:
             result.append(f"💥 爆牌了! {player.nickname} 手牌{hand_idx+1} 输掉了该手牌")
-            # 更新玩家战绩（只在此处更新一次）
-            current_losses = int(player.total_losses)
-            self._update_player_data(user_id, {'total_losses': str(current_losses + 1)})
         
         # 进入下一个玩家的回合或庄家行动
         next_action = self._move_to_next_player(group_id)
@@ -897,7 +1246,6 @@ class BlackJack(Plugin):
     def _dealer_turn(self, group_id):
         """庄家回合"""
         game = self.game_instances[group_id]
-        game.game_status = "dealer_turn"
         
         result = ["🎲 所有玩家已行动完毕", "————————————", "庄家回合开始"]
         
@@ -905,10 +1253,10 @@ class BlackJack(Plugin):
         result.append(f"庄家手牌: {', '.join(str(card) for card in game.dealer_hand)}")
         result.append(f"点数: {game.calculate_hand_value(game.dealer_hand)}")
         
-        # 庄家按规则要牌
-        while game.calculate_hand_value(game.dealer_hand) < 17:
-            new_card = game.deck.deal()
-            game.dealer_hand.append(new_card)
+        # 庄家按规则要牌并判定胜负
+        initial_cards = len(game.dealer_hand)
+        game._dealer_turn()
+        for new_card in game.dealer_hand[initial_cards:]:
             result.append(f"庄家要牌: {new_card}")
             
         # 显示庄家最终手牌
@@ -916,119 +1264,7 @@ class BlackJack(Plugin):
         result.append(f"\n庄家最终手牌: {', '.join(str(card) for card in game.dealer_hand)}")
         result.append(f"点数: {dealer_value}")
         
-        # 判断胜负并结算
-        result.append("\n🏆 结算结果:")
-        
-        # 找出庄家是否爆牌
-        dealer_busted = dealer_value > 21
-        dealer_blackjack = len(game.dealer_hand) == 2 and dealer_value == 21
-        
-        for player_id in game.player_hands:
-            player = self.get_player(player_id)
-            if not player:
-                continue
-                
-            # 结算前记录玩家初始筹码
-            initial_chips = player.chips
-            
-            # 处理该玩家的每一副手牌
-            for hand_idx, hand in enumerate(game.player_hands[player_id]):
-                player_value = game.calculate_hand_value(hand)
-                bet_amount = game.player_bets[player_id][hand_idx]
-                
-                # 显示手牌标识（如果玩家有多副手牌）
-                hand_marker = f"手牌{hand_idx+1} " if len(game.player_hands[player_id]) > 1 else ""
-                
-                # 玩家已经爆牌，之前已经处理，跳过战绩更新，只显示结果
-                if game.player_statuses[player_id][hand_idx] == "bust":
-                    result.append(f"{player.nickname} {hand_marker}: 已爆牌，输掉 {bet_amount} 筹码")
-                    continue
-                    
-                # 判断胜负
-                is_blackjack = len(hand) == 2 and player_value == 21
-                
-                if is_blackjack and not dealer_blackjack:
-                    # 玩家BlackJack，赔率3:2
-                    blackjack_bonus = int(bet_amount * 1.5)  # 确保是整数
-                    total_win = bet_amount + blackjack_bonus  # 返还原下注 + 奖金
-                    player.chips += total_win
-                    
-                    current_wins = int(player.total_wins)
-                    blackjack_count = int(player.blackjack_count)
-                    self._update_player_data(player_id, {
-                        'total_wins': str(current_wins + 1),
-                        'blackjack_count': str(blackjack_count + 1)
-                    })
-                    
-                    result.append(f"{player.nickname} {hand_marker}: BlackJack! 赢得 {blackjack_bonus} 筹码")
-                    
-                elif dealer_blackjack and not is_blackjack:
-                    # 庄家BlackJack，玩家输
-                    # 注意：玩家的筹码在下注时已经扣除，这里不需要再扣
-                    
-                    current_losses = int(player.total_losses)
-                    self._update_player_data(player_id, {'total_losses': str(current_losses + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: 庄家BlackJack，输掉 {bet_amount} 筹码")
-                    
-                elif is_blackjack and dealer_blackjack:
-                    # 双方都是BlackJack，平局
-                    # 退还下注筹码
-                    player.chips += bet_amount
-                    
-                    current_draws = int(player.total_draws)
-                    self._update_player_data(player_id, {'total_draws': str(current_draws + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: 双方都是BlackJack，平局，退还下注 {bet_amount} 筹码")
-                    
-                elif dealer_busted:
-                    # 庄家爆牌，玩家赢
-                    player.chips += (bet_amount * 2)  # 返还原下注和赢得的等额筹码
-                    
-                    current_wins = int(player.total_wins)
-                    self._update_player_data(player_id, {'total_wins': str(current_wins + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: 庄家爆牌，赢得 {bet_amount} 筹码")
-                    
-                elif player_value > dealer_value:
-                    # 玩家点数大于庄家，玩家赢
-                    player.chips += (bet_amount * 2)  # 返还原下注和赢得的等额筹码
-                    
-                    current_wins = int(player.total_wins)
-                    self._update_player_data(player_id, {'total_wins': str(current_wins + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: {player_value}点 > 庄家{dealer_value}点，赢得 {bet_amount} 筹码")
-                    
-                elif player_value < dealer_value:
-                    # 玩家点数小于庄家，玩家输
-                    # 注意：玩家的筹码在下注时已经扣除，这里不需要再扣
-                    
-                    current_losses = int(player.total_losses)
-                    self._update_player_data(player_id, {'total_losses': str(current_losses + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: {player_value}点 < 庄家{dealer_value}点，输掉 {bet_amount} 筹码")
-                    
-                else:
-                    # 点数相同，平局
-                    # 退还下注筹码
-                    player.chips += bet_amount
-                    
-                    current_draws = int(player.total_draws)
-                    self._update_player_data(player_id, {'total_draws': str(current_draws + 1)})
-                    
-                    result.append(f"{player.nickname} {hand_marker}: {player_value}点 = 庄家{dealer_value}点，平局，退还下注 {bet_amount} 筹码")
-            
-            # 如果玩家筹码有变化，保存到数据文件
-            if player.chips != initial_chips:
-                self._update_player_data(player_id, {'chips': str(player.chips)})
-                
-            # 显示玩家当前总筹码
-            result.append(f"{player.nickname} 当前总筹码: {player.chips}")
-        
-        # 游戏结束，重置游戏状态
-        self.game_instances.pop(group_id, None)
-        
-        result.append("\n游戏结束，可以使用「21点准备」准备下一局游戏")
+        result.append(self._settle_game(group_id))
         return "\n".join(result)
         
     def show_game_state(self, user_id, group_id):
@@ -1137,7 +1373,9 @@ class BlackJack(Plugin):
     def reset_blackjack_game(self, user_id, group_id):
         """清理游戏数据"""
         if group_id and group_id in self.game_instances:
-            self.game_instances[group_id] = BJGame()
+            shoe = self._get_shoe(group_id)
+            shoe.shuffle()
+            self.game_instances[group_id] = BJGame(shoe)
             if group_id in self.ready_players:
                 self.ready_players[group_id] = []
             return "🧹 21点游戏数据已清理完成，可以重新开始游戏"
@@ -1166,21 +1404,14 @@ class BlackJack(Plugin):
                 logger.info(f"[BlackJack] 设置新管理员: {user_id}")
                 
             # 备份当前数据
-            if os.path.exists(self.player_file):
-                backup_file = os.path.join(self.data_dir, f"bjplayers_backup_{int(time.time())}.csv")
-                with open(self.player_file, 'r', encoding='utf-8') as src:
-                    with open(backup_file, 'w', encoding='utf-8') as dst:
-                        dst.write(src.read())
-                logger.info(f"[BlackJack] 已备份玩家数据到: {backup_file}")
+            backup_file = self.store.backup(self.data_dir)
+            logger.info(f"[BlackJack] 已备份玩家数据到: {backup_file}")
             
             # 重置玩家数据文件
-            with open(self.player_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.STANDARD_FIELDS)
-                writer.writeheader()
+            self.store.clear()
             
-            # 重置游戏状态
-            self.game_instances = {}
-            self.ready_players = {}
+            # 重置游戏状态（包括挂起的牌局）
+            self.tables.clear()
             
             return "🔄 BlackJack(21点)游戏数据已完全重置！\n所有玩家数据和排行榜已清空，玩家需要重新注册才能继续游戏。"
         except Exception as e:
@@ -1188,13 +1419,40 @@ class BlackJack(Plugin):
             return f"重置数据时出错: {e}"
         
     def show_debug_status(self, user_id, group_id):
-        """显示调试用的游戏状态信息"""
-        if not group_id:
-            return "此命令只能在群聊中使用"
+        """显示调试用的游戏状态信息和插件运行指标"""
+        if not group_id or group_id not in self.game_instances:
+            return self.show_metrics()
             
-        if group_id not in self.game_instances:
-            return "当前没有正在进行的游戏"
+        return self.show_game_debug(group_id) + "\n\n" + self.show_metrics()
+        
+    def show_metrics(self):
+        """显示插件运行指标：各指令耗时、存储读写和进行中的牌局数"""
+        return "\n".join(["📈 BlackJack运行指标", "————————————"] + metrics.summary_lines())
+        
+    def show_shoe_stats(self, group_id):
+        """显示群聊牌靴的发牌进度和算牌计数（玩家回合中不计庄家暗牌）"""
+        if not group_id:
+            return "21点游戏只能在群聊中进行，请在群聊中使用此指令"
             
+        game = self.game_instances.get(group_id)
+        if game is not None:
+            stats = game.shoe_stats()
+        elif group_id in self.shoes:
+            stats = self.shoes[group_id].stats()
+        else:
+            return "当前群聊还没有牌靴，开始游戏后再查看"
+            
+        result = ["🂠 牌靴统计", "————————————"]
+        result.append(f"{stats['num_decks']}副牌，共 {stats['size']} 张，已发 {stats['dealt']} 张，剩余 {stats['remaining']} 张")
+        result.append(f"发牌进度: {stats['penetration']:.0%}，切牌位置: 第 {stats['cut_card']} 张"
+                      + ("（下一局开始前洗牌）" if stats['needs_shuffle'] else ""))
+        result.append(f"Hi-Lo 运行计数: {stats['running_count']:+d}，真数: {stats['true_count']:+.1f}")
+        result.append(f"KO 运行计数: {stats['ko_count']:+d}")
+        result.append("剩余构成: " + " ".join(f"{rank}×{count}" for rank, count in stats['rank_counts'].items()))
+        return "\n".join(result)
+        
+    def show_game_debug(self, group_id):
+        """显示群聊牌局的调试信息"""
         game = self.game_instances[group_id]
         
         debug_info = ["🔍 BlackJack游戏调试信息", "————————————"]
@@ -1203,6 +1461,7 @@ class BlackJack(Plugin):
         debug_info.append(f"游戏状态: {game.game_status}")
         debug_info.append(f"当前玩家索引: {game.current_player_idx}")
         debug_info.append(f"牌组剩余: {game.deck.remaining()}张")
+        debug_info.append(f"运行计数: Hi-Lo {game.deck.running_count()}，KO {game.deck.ko_count()}（含庄家暗牌）")
         
         # 玩家顺序
         if hasattr(game, 'players_order'):
@@ -1293,19 +1552,15 @@ class BlackJack(Plugin):
         # 获取当前下注金额
         current_bet = game.player_bets[user_id][hand_idx]
         
-        # 检查玩家筹码是否足够进行分牌
-        if player.chips < current_bet:
+        # 原子地扣除额外的下注金额，筹码不足时不做修改
+        if not player.adjust_data({'chips': -current_bet}, 'split', game.round_id):
             return f"分牌失败，您的筹码不足\n当前筹码: {player.chips}\n所需筹码: {current_bet}"
             
         # 执行分牌
         success = game.split(user_id)
         if not success:
+            player.adjust_data({'chips': current_bet}, 'refund', game.round_id)
             return "分牌失败，请稍后再试"
-            
-        # 更新玩家数据（扣除额外的下注金额）
-        new_chips = player.chips - current_bet
-        player.chips = new_chips
-        self._update_player_data(user_id, {'chips': str(new_chips)})
         
         # 显示所有分牌后的手牌
         result = [f"🃏 {player.nickname} 选择分牌!"]
@@ -1331,136 +1586,96 @@ class BlackJack(Plugin):
         
         return "\n".join(result)
         
+    def _get_strategy_table(self):
+        """获取基本策略表，首次使用时从缓存加载或计算"""
+        if self.strategy_table is None:
+            from .strategy_table import StrategyTable
+            game_config = self.config.get("game", {})
+            BlackJack.strategy_table = StrategyTable.load_or_build(
+                self.data_dir, {"num_decks": game_config.get("num_decks", 6)}
+            )
+        return self.strategy_table
+        
+    def strategy_hint(self, user_id, group_id):
+        """根据基本策略提示当前手牌的建议操作"""
+        if not group_id:
+            return "21点游戏只能在群聊中进行，请在群聊中使用此指令"
+            
+        player = self.get_player(user_id)
+        if not player:
+            return "您还没有注册21点游戏，请先发送「21点注册」进行注册"
+            
+        # 检查游戏是否存在
+        if group_id not in self.game_instances:
+            return "当前没有正在进行的游戏"
+            
+        game = self.game_instances[group_id]
+        
+        # 检查游戏状态
+        if game.game_status != "playing":
+            return "当前不是玩家行动阶段"
+            
+        # 检查是否轮到该玩家
+        current_player_id = game.get_current_player()
+        if current_player_id is None:
+            return "当前不是玩家行动阶段"
+        if current_player_id != user_id:
+            current_player = self.get_player(current_player_id)
+            return f"当前轮到 {current_player.nickname} 行动，请等待您的回合"
+            
+        hand_idx = game.current_hand_idx.get(user_id, 0)
+        hand = game.player_hands[user_id][hand_idx]
+        bet_amount = game.player_bets[user_id][hand_idx]
+        dealer_card = game.dealer_hand[0]
+        
+        # 筹码不足时不建议加倍或分牌
+        can_double = len(hand) == 2 and player.chips >= bet_amount
+        can_split = game.can_split(user_id) and player.chips >= bet_amount
+        
+        try:
+            table = self._get_strategy_table()
+        except Exception as e:
+            logger.error(f"[BlackJack] 加载策略表出错: {e}")
+            return "策略表暂时不可用，请稍后再试"
+            
+        action = table.lookup(hand, dealer_card.value, can_double, can_split)
+        action_names = {"hit": "要牌", "stand": "停牌", "double": "加倍", "split": "分牌"}
+        bust_rate = table.dealer_probabilities(dealer_card.value).get("bust", 0.0)
+        
+        hand_value = game.calculate_hand_value(hand)
+        result = [f"💡 {player.nickname} 手牌{hand_idx+1} ({hand_value}点): {', '.join(str(card) for card in hand)}"]
+        result.append(f"庄家明牌: {dealer_card}，庄家爆牌概率约 {bust_rate:.0%}")
+        result.append(f"基本策略建议: {action_names[action]}")
+        return "\n".join(result)
+        
     def _settle_game(self, group_id):
-        """结算游戏"""
-        game = self.get_game(group_id)
+        """结算游戏
+        
+        由结算引擎一次算出所有玩家的筹码和战绩增量，再以一次批量操作写入存储。
+        """
+        game = self.game_instances.get(group_id)
         if not game:
             return "当前没有进行中的游戏。"
+            
+        deltas = settle_round(game)
+        rows = self.store.adjust_many(deltas, 'settle', game.round_id) or {}
         
-        result = ["游戏结束，结算结果:"]
-        dealer_hand = game.dealer_hand
-        dealer_value = game.calculate_hand_value(dealer_hand)
-        dealer_status = "爆牌" if dealer_value > 21 else f"{dealer_value}点"
-        
-        result.append(f"\n庄家手牌 ({dealer_status}): {', '.join(str(card) for card in dealer_hand)}")
-        
-        # 存储已处理过战绩统计的玩家ID，确保每个玩家只统计一次
-        processed_players = set()
+        # 本局结算完成，一次性写回所有玩家数据
+        self.store.flush()
         
-        # 处理每个玩家的结果
-        for user_id in game.players_order:
-            player_data = self.get_player(user_id)
-            if not player_data:
+        result = ["\n🏆 结算结果:"]
+        for player_id, hand_results in game.results.items():
+            row = rows.get(player_id)
+            if row is None:
                 continue
-            
-            nickname = player_data.nickname
-            player_hands = game.player_hands.get(user_id, [])
-            player_bets = game.player_bets.get(user_id, [])
-            player_statuses = game.player_statuses.get(user_id, [])
-            
-            player_results = []
-            total_win_amount = 0
-            has_blackjack = False
-            has_win = False
-            has_tie = False
-            has_loss = False
-            
-            # 处理每手牌的结果
-            for hand_idx, (hand, bet, status) in enumerate(zip(player_hands, player_bets, player_statuses)):
-                hand_value = game.calculate_hand_value(hand)
-                hand_info = f"第{hand_idx+1}手牌" if len(player_hands) > 1 else "手牌"
-                
-                # 计算胜负和赢得的筹码
-                if status == "bust":
-                    # 爆牌，输掉赌注
-                    hand_result = f"{hand_info} - 爆牌，输掉 {bet} 筹码"
-                    total_win_amount -= bet
-                    has_loss = True
-                elif dealer_value > 21:
-                    # 庄家爆牌，玩家赢
-                    if game.is_blackjack(hand):
-                        # 21点，赢1.5倍筹码
-                        win_amount = int(bet * 1.5)
-                        hand_result = f"{hand_info} - BlackJack！赢得 {win_amount} 筹码"
-                        has_blackjack = True
-                    else:
-                        # 普通获胜，赢1倍筹码
-                        win_amount = bet
-                        hand_result = f"{hand_info} - 庄家爆牌，赢得 {win_amount} 筹码"
-                    total_win_amount += win_amount
-                    has_win = True
-                elif hand_value > dealer_value:
-                    # 玩家点数大于庄家
-                    if game.is_blackjack(hand):
-                        # 21点，赢1.5倍筹码
-                        win_amount = int(bet * 1.5)
-                        hand_result = f"{hand_info} - BlackJack！赢得 {win_amount} 筹码"
-                        has_blackjack = True
-                    else:
-                        # 普通获胜，赢1倍筹码
-                        win_amount = bet
-                        hand_result = f"{hand_info} - 点数高于庄家，赢得 {win_amount} 筹码"
-                    total_win_amount += win_amount
-                    has_win = True
-                elif hand_value == dealer_value:
-                    # 平局，返还赌注
-                    if game.is_blackjack(hand) and not game.is_blackjack(dealer_hand):
-                        # 玩家21点，庄家非21点
-                        win_amount = int(bet * 1.5)
-                        hand_result = f"{hand_info} - BlackJack！赢得 {win_amount} 筹码"
-                        total_win_amount += win_amount
-                        has_blackjack = True
-                        has_win = True
-                    elif not game.is_blackjack(hand) and game.is_blackjack(dealer_hand):
-                        # 庄家21点，玩家非21点
-                        hand_result = f"{hand_info} - 庄家BlackJack，输掉 {bet} 筹码"
-                        total_win_amount -= bet
-                        has_loss = True
-                    else:
-                        # 真正的平局
-                        hand_result = f"{hand_info} - 平局，收回 {bet} 筹码"
-                        has_tie = True
-                else:
-                    # 玩家点数小于庄家，输掉赌注
-                    hand_result = f"{hand_info} - 点数低于庄家，输掉 {bet} 筹码"
-                    total_win_amount -= bet
-                    has_loss = True
-                
-                player_results.append(hand_result)
-                
-            # 更新玩家战绩统计（确保每种类型的结果只记录一次）
-            if user_id not in processed_players:
-                processed_players.add(user_id)
-                
-                # 更新玩家筹码
-                current_chips = int(player_data.chips)
-                new_chips = max(0, current_chips + total_win_amount)  # 确保筹码不会为负
-                
-                # 更新统计数据
-                stats_update = {'chips': str(new_chips)}
-                
-                if has_blackjack:
-                    stats_update['total_blackjacks'] = str(int(player_data.total_blackjacks) + 1)
-                    
-                if has_win:
-                    stats_update['total_wins'] = str(int(player_data.total_wins) + 1)
-                elif has_tie:
-                    stats_update['total_ties'] = str(int(player_data.total_ties) + 1)
-                elif has_loss:
-                    stats_update['total_losses'] = str(int(player_data.total_losses) + 1)
-                    
-                self._update_player_data(user_id, stats_update)
-                
-            # 添加玩家结果到消息
-            result_line = f"{nickname}: {' | '.join(player_results)}"
-            if total_win_amount > 0:
-                result_line += f", 总计: +{total_win_amount} 筹码"
-            elif total_win_amount < 0:
-                result_line += f", 总计: {total_win_amount} 筹码"
-            else:
-                result_line += ", 总计: 0 筹码"
-            
-            result.append(result_line)
+            nickname = row.get('nickname', '未知玩家')
+            multiple_hands = len(hand_results) > 1
+            for hand_result in hand_results:
+                # 显示手牌标识（如果玩家有多副手牌）
+                hand_marker = f"手牌{hand_result['hand_idx']+1} " if multiple_hands else ""
+                result.append(f"{nickname} {hand_marker}: {hand_result['message']}")
+            # 显示玩家当前总筹码
+            result.append(f"{nickname} 当前总筹码: {row.get('chips', 0)}")
         
         # 游戏结束，重置游戏状态
         self.game_instances.pop(group_id, None)
@@ -1,65 +1,367 @@
+import itertools
 import random
+import struct
+import time
+from array import array
 from typing import List, Dict, Tuple, Any, Optional
 
 class Card:
-    """扑克牌类"""
+    """扑克牌类
+
+    牌是不可变的小对象，全部52张牌在模块加载时创建为单例，
+    Card(suit, rank) 返回共享的实例。每张牌用 0-51 的整数编码（花色*13+点数），
+    牌值和显示文本都预先计算好，求点数时不再做字符串比较。
+    """
     SUITS = ['♠', '♥', '♦', '♣']
     RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+    # 与 RANKS 对应的牌值，Ace默认值为11，计算总点数时如果超过21会当作1
+    RANK_VALUES = [11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10]
+    
+    __slots__ = ('suit', 'rank', 'code', 'value', 'is_ace', '_text')
+    
+    _instances: Dict[Tuple[str, str], 'Card'] = {}
     
-    def __init__(self, suit: str, rank: str):
-        self.suit = suit
-        self.rank = rank
+    def __new__(cls, suit: str, rank: str):
+        card = cls._instances.get((suit, rank))
+        if card is not None:
+            return card
+            
+        rank_idx = cls.RANKS.index(rank)
+        card = super().__new__(cls)
+        object.__setattr__(card, 'suit', suit)
+        object.__setattr__(card, 'rank', rank)
+        object.__setattr__(card, 'code', cls.SUITS.index(suit) * 13 + rank_idx)
+        object.__setattr__(card, 'value', cls.RANK_VALUES[rank_idx])
+        object.__setattr__(card, 'is_ace', rank_idx == 0)
+        object.__setattr__(card, '_text', f"{suit}{rank}")
+        cls._instances[(suit, rank)] = card
+        return card
+        
+    def __setattr__(self, name, value):
+        raise AttributeError("Card对象不可修改")
+        
+    def __reduce__(self):
+        return (card_from_code, (self.code,))
         
     def __str__(self) -> str:
-        return f"{self.suit}{self.rank}"
+        return self._text
+    
+    def __repr__(self) -> str:
+        return f"Card({self._text})"
     
     def get_value(self) -> int:
         """获取牌的点数"""
-        if self.rank in ['J', 'Q', 'K']:
-            return 10
-        elif self.rank == 'A':
-            return 11  # Ace默认值为11，计算总点数时如果超过21会当作1
+        return self.value
+
+
+# 按编码排列的52张单例牌，以及对应的牌值表
+CARDS: Tuple[Card, ...] = tuple(Card(suit, rank) for suit in Card.SUITS for rank in Card.RANKS)
+CARD_VALUES: Tuple[int, ...] = tuple(card.value for card in CARDS)
+
+
+def card_from_code(code: int) -> Card:
+    """根据整数编码获取牌"""
+    return CARDS[code]
+
+# 算牌标签（按 RANKS 顺序）：Hi-Lo 为平衡计数，KO 为不平衡计数（7也记+1）
+HI_LO_TAGS = (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1)
+KO_TAGS = (-1, 1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1)
+# 按编码展开的点数下标和计数标签，发牌时直接查表
+_RANK_INDEX: Tuple[int, ...] = tuple(code % 13 for code in range(len(CARDS)))
+_HI_LO: Tuple[int, ...] = tuple(HI_LO_TAGS[rank] for rank in _RANK_INDEX)
+_KO: Tuple[int, ...] = tuple(KO_TAGS[rank] for rank in _RANK_INDEX)
+
+class Hand(list):
+    """一手牌
+
+    继承自 list，遍历、索引、len 等用法与普通手牌列表完全一致。
+    额外维护硬点数（A按1点计）和A的数量，每加一张牌 O(1) 更新，
+    求点数、判断软手/爆牌/BlackJack时不再遍历整手牌。
+    """
+    __slots__ = ('hard_total', 'aces')
+    
+    def __init__(self, cards=()):
+        super().__init__(cards)
+        self._recount()
+        
+    def _recount(self):
+        """重新统计点数（用于非追加类的修改）"""
+        hard_total = 0
+        aces = 0
+        for card in self:
+            if card.is_ace:
+                aces += 1
+                hard_total += 1
+            else:
+                hard_total += card.value
+        self.hard_total = hard_total
+        self.aces = aces
+        
+    def append(self, card: Card):
+        super().append(card)
+        if card.is_ace:
+            self.aces += 1
+            self.hard_total += 1
         else:
-            return int(self.rank)
+            self.hard_total += card.value
+            
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+            
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+        
+    def insert(self, index, card):
+        super().insert(index, card)
+        self._recount()
+        
+    def pop(self, index=-1):
+        card = super().pop(index)
+        self._recount()
+        return card
+        
+    def remove(self, card):
+        super().remove(card)
+        self._recount()
+        
+    def clear(self):
+        super().clear()
+        self.hard_total = 0
+        self.aces = 0
+        
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._recount()
+        
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._recount()
+        
+    @property
+    def is_soft(self) -> bool:
+        """是否为软手（有一张A按11点计算）"""
+        return self.aces > 0 and self.hard_total + 10 <= 21
+        
+    @property
+    def value(self) -> int:
+        """手牌点数，A在不爆牌时按11点计算"""
+        if self.aces and self.hard_total + 10 <= 21:
+            return self.hard_total + 10
+        return self.hard_total
+        
+    @property
+    def is_bust(self) -> bool:
+        """是否爆牌"""
+        return self.hard_total > 21
+        
+    @property
+    def is_blackjack(self) -> bool:
+        """是否为BlackJack（两张牌21点）"""
+        return len(self) == 2 and self.aces > 0 and self.hard_total == 11
+
 
 class Deck:
-    """牌组类"""
-    def __init__(self, num_decks: int = 6):
-        """初始化牌组，默认使用6副牌"""
-        self.cards: List[Card] = []
-        for _ in range(num_decks):
-            for suit in Card.SUITS:
-                for rank in Card.RANKS:
-                    self.cards.append(Card(suit, rank))
+    """牌靴类
+
+    牌靴用预先分配的 array 存放牌的整数编码，发牌只是移动游标，不分配任何对象。
+    洗牌是对该数组的原地 Fisher–Yates 洗牌，同一个牌靴可以跨局、跨牌桌重复使用。
+    cut_card 为切牌位置：已发牌数超过它时，下一局开始前需要重新洗牌。
+
+    发牌时同时 O(1) 更新各点数的剩余张数、Hi-Lo 和 KO 的运行计数，
+    查询牌靴构成和真数时不需要扫描剩余的牌。KO 从标准初始值 4 - 4 * 副数 开始计。
+    """
+    DEFAULT_PENETRATION = 0.5  # 默认发出一半的牌后重新洗牌
+    MAX_PENETRATION = 0.9  # 切牌位置最深不超过牌靴的90%
+    MIN_CARDS_BEHIND_CUT = 20  # 切牌位置之后至少留下的牌数，保证最后一局有牌可发
+    
+    def __init__(self, num_decks: int = 6, penetration: float = DEFAULT_PENETRATION,
+                 rng: Optional[random.Random] = None):
+        """初始化牌靴，默认使用6副牌
+        
+        Args:
+            num_decks: 牌的副数
+            penetration: 切牌位置占整个牌靴的比例，取值范围 (0, MAX_PENETRATION]
+            rng: 洗牌使用的随机数生成器，默认使用全局 random
+
+        Raises:
+            ValueError: 切牌比例超出范围
+        """
+        if not 0 < penetration <= self.MAX_PENETRATION:
+            raise ValueError(f"切牌比例必须在 0 到 {self.MAX_PENETRATION} 之间: {penetration}")
+        self.num_decks = num_decks
+        self.penetration = penetration
+        self._rng = rng if rng is not None else random
+        self._codes = array('B', range(len(CARDS))) * num_decks
+        self._cursor = 0
+        self.cut_card = self._cut_card(len(self._codes), penetration)
+        self._init_counts()
         self.shuffle()
         
-    def shuffle(self):
-        """洗牌"""
-        random.shuffle(self.cards)
+    @classmethod
+    def _cut_card(cls, size: int, penetration: float) -> int:
+        """切牌位置：按比例计算，但切牌之后至少留下 MIN_CARDS_BEHIND_CUT 张牌"""
+        return max(0, min(int(size * penetration), size - cls.MIN_CARDS_BEHIND_CUT))
+
+    def _init_counts(self):
+        """统计整个牌靴各点数的张数，作为每次洗牌后的初始值"""
+        full = [0] * len(Card.RANKS)
+        for code in self._codes:
+            full[_RANK_INDEX[code]] += 1
+        self._full_ranks = tuple(full)
+        self._ko_start = 4 - 4 * self.num_decks
+        self._reset_counts()
+        
+    def _reset_counts(self):
+        self._rank_left = list(self._full_ranks)
+        self._hi_lo = 0
+        self._ko = self._ko_start
         
-    def deal(self) -> Optional[Card]:
-        """发牌"""
-        if len(self.cards) > 0:
-            return self.cards.pop()
-        return None
+    def shuffle(self):
+        """原地洗牌（Fisher–Yates）并把游标归零"""
+        self._rng.shuffle(self._codes)
+        self._cursor = 0
+        self._reset_counts()
+        
+    def deal(self) -> Card:
+        """发牌，牌靴已发完时（单局用牌过多）先原地重新洗牌"""
+        if self._cursor >= len(self._codes):
+            self.shuffle()
+        code = self._codes[self._cursor]
+        self._cursor += 1
+        self._rank_left[_RANK_INDEX[code]] -= 1
+        self._hi_lo += _HI_LO[code]
+        self._ko += _KO[code]
+        return CARDS[code]
     
     def remaining(self) -> int:
         """获取剩余牌的数量"""
-        return len(self.cards)
+        return len(self._codes) - self._cursor
+        
+    def remaining_codes(self) -> array:
+        """获取剩余未发的牌编码（副本）"""
+        return self._codes[self._cursor:]
+        
+    def size(self) -> int:
+        """牌靴总牌数"""
+        return len(self._codes)
+        
+    def needs_shuffle(self) -> bool:
+        """是否已发过切牌位置，需要重新洗牌"""
+        return self._cursor > self.cut_card
+
+    def dealt(self) -> int:
+        """本次洗牌后已发出的牌数"""
+        return self._cursor
+        
+    def rank_counts(self) -> List[int]:
+        """剩余各点数的张数（副本），按 Card.RANKS 顺序"""
+        return list(self._rank_left)
+        
+    def running_count(self) -> int:
+        """Hi-Lo 运行计数"""
+        return self._hi_lo
+        
+    def ko_count(self) -> int:
+        """KO 运行计数"""
+        return self._ko
+        
+    def true_count(self) -> float:
+        """Hi-Lo 真数：运行计数除以剩余副数，牌已发完时为 0"""
+        remaining = len(self._codes) - self._cursor
+        if not remaining:
+            return 0.0
+        return self._hi_lo * len(CARDS) / remaining
+        
+    def stats(self) -> Dict[str, Any]:
+        """牌靴的发牌进度和计数统计"""
+        size = len(self._codes)
+        return {
+            "num_decks": self.num_decks,
+            "size": size,
+            "dealt": self._cursor,
+            "remaining": size - self._cursor,
+            "penetration": self._cursor / size if size else 0.0,
+            "cut_card": self.cut_card,
+            "needs_shuffle": self.needs_shuffle(),
+            "running_count": self._hi_lo,
+            "true_count": self.true_count(),
+            "ko_count": self._ko,
+            "rank_counts": dict(zip(Card.RANKS, self._rank_left)),
+        }
+
+    @classmethod
+    def from_codes(cls, codes: bytes, cursor: int, num_decks: int, penetration: float,
+                   rng: Optional[random.Random] = None) -> 'Deck':
+        """按保存的牌序和游标恢复牌靴（不重新洗牌），计数按已发出的牌重新统计"""
+        deck = cls.__new__(cls)
+        deck.num_decks = num_decks
+        deck.penetration = penetration
+        deck._rng = rng if rng is not None else random
+        deck._codes = array('B', codes)
+        deck._cursor = cursor
+        deck.cut_card = cls._cut_card(len(deck._codes), penetration)
+        deck._init_counts()
+        for code in deck._codes[:cursor]:
+            deck._rank_left[_RANK_INDEX[code]] -= 1
+            deck._hi_lo += _HI_LO[code]
+            deck._ko += _KO[code]
+        return deck
+
+# 牌局快照格式：
+#   头部    版本、牌局状态、副数、切牌比例、牌靴游标、牌靴张数、当前玩家索引、玩家数
+#   牌局ID  （版本2起）
+#   牌靴    每张牌一个字节的编码
+#   庄家    张数 + 牌编码
+#   每名玩家 ID长度 + ID(UTF-8)、当前手牌索引、手牌数，
+#           每手牌: 下注、状态、张数 + 牌编码
+SNAPSHOT_VERSION = 2
+GAME_STATUSES = ("waiting", "betting", "playing", "dealer_turn", "finished")
+HAND_STATUSES = ("waiting", "stand", "bust")
+_SNAPSHOT_HEADER = struct.Struct('<BBBdHHHH')
+_ROUND_ID = struct.Struct('<Q')
+_PLAYER_ID = struct.Struct('<H')
+_PLAYER_HANDS = struct.Struct('<BB')
+_HAND_HEADER = struct.Struct('<qBB')
+
+# 牌局ID：从启动时的微秒时间戳开始递增，重启后也不会与之前的牌局重复
+_round_ids = itertools.count(time.time_ns() // 1000)
+
+
+def _pack_cards(cards: List[Card]) -> bytes:
+    return bytes((len(cards),)) + bytes(card.code for card in cards)
+
+
+def _unpack_cards(data: bytes, offset: int, count: int) -> Tuple[Hand, int]:
+    end = offset + count
+    if end > len(data):
+        raise ValueError("牌局快照数据不完整")
+    return Hand([CARDS[code] for code in data[offset:end]]), end
+
 
 class BJGame:
     """21点游戏类"""
-    def __init__(self):
-        """初始化游戏"""
-        self.deck = Deck()
-        self.player_hands: Dict[str, List[List[Card]]] = {}  # 玩家ID -> [手牌列表1, 手牌列表2, ...]
-        self.dealer_hand: List[Card] = []  # 庄家手牌
+    BLACKJACK_PAYOUT = 1.5  # BlackJack赔率
+    DEALER_STAND_VALUE = 17  # 庄家达到该点数后停牌
+    
+    def __init__(self, deck: Optional[Deck] = None):
+        """初始化游戏
+        
+        Args:
+            deck: 使用的牌靴，不提供时新建一个默认牌靴
+        """
+        self.deck = deck if deck is not None else Deck()
+        self.player_hands: Dict[str, List[Hand]] = {}  # 玩家ID -> [手牌1, 手牌2, ...]
+        self.dealer_hand: Hand = Hand()  # 庄家手牌
         self.player_bets: Dict[str, List[int]] = {}  # 玩家ID -> [下注金额1, 下注金额2, ...]
         self.player_statuses: Dict[str, List[str]] = {}  # 玩家ID -> [状态1, 状态2, ...] （等待、要牌、停牌、爆牌）
         self.game_status = "waiting"  # 游戏状态：waiting, betting, playing, dealer_turn, finished
         self.current_player_idx = 0  # 当前玩家索引
         self.current_hand_idx: Dict[str, int] = {}  # 玩家ID -> 当前手牌索引
         self.players_order: List[str] = []  # 玩家顺序列表
+        self.results: Dict[str, List[Dict[str, Any]]] = {}  # 本局结算结果
+        self.round_id = 0  # 牌局ID，开局时分配，用于关联筹码流水
         
     def start_new_game(self, player_ids: List[str]):
         """开始新游戏
@@ -68,18 +370,20 @@ class BJGame:
             player_ids: 参与游戏的玩家ID列表
         """
         # 重置游戏状态
-        self.player_hands = {pid: [[]] for pid in player_ids}
-        self.dealer_hand = []
+        self.player_hands = {pid: [Hand()] for pid in player_ids}
+        self.dealer_hand = Hand()
         self.player_bets = {pid: [0] for pid in player_ids}
         self.player_statuses = {pid: ["waiting"] for pid in player_ids}
         self.current_hand_idx = {pid: 0 for pid in player_ids}
         self.game_status = "betting"
         self.current_player_idx = 0
         self.players_order = player_ids.copy()
+        self.results = {}
+        self.round_id = next(_round_ids)
         
-        # 如果牌组剩余不足一半，重新洗牌
-        if self.deck.remaining() < (52 * 6 // 2):
-            self.deck = Deck()
+        # 发过切牌位置后，原地重新洗牌
+        if self.deck.needs_shuffle():
+            self.deck.shuffle()
             
     def place_bet(self, player_id: str, amount: int) -> bool:
         """玩家下注
@@ -97,20 +401,42 @@ class BJGame:
         self.player_bets[player_id][0] = amount
         return True
         
+    def remove_player(self, player_id: str) -> bool:
+        """下注阶段把玩家移出本局（例如超时未下注）
+        
+        Args:
+            player_id: 玩家ID
+            
+        Returns:
+            bool: 是否移除成功
+        """
+        if self.game_status != "betting" or player_id not in self.player_hands:
+            return False
+            
+        self.players_order.remove(player_id)
+        del self.player_hands[player_id]
+        del self.player_bets[player_id]
+        del self.player_statuses[player_id]
+        self.current_hand_idx.pop(player_id, None)
+        return True
+        
     def deal_initial_cards(self):
         """发初始牌"""
+        # 保留下注阶段的下注金额
+        placed_bets = {pid: bets[0] for pid, bets in self.player_bets.items() if bets}
+        
         # 清空所有手牌
         self.player_hands = {}
         self.player_bets = {}
         self.player_statuses = {}
         self.current_hand_idx = {}
-        self.dealer_hand = []
+        self.dealer_hand = Hand()
         
         # 为每个玩家发两张牌
         for player_id in self.players_order:
             # 确保每个玩家都有初始手牌列表
-            self.player_hands[player_id] = [[]]
-            self.player_bets[player_id] = [0]
+            self.player_hands[player_id] = [Hand()]
+            self.player_bets[player_id] = [placed_bets.get(player_id, 0)]
             self.player_statuses[player_id] = ["waiting"]
             self.current_hand_idx[player_id] = 0
             
@@ -251,15 +577,15 @@ class BJGame:
         
         # 检查两张牌的点数是否相同
         hand = self.player_hands[player_id][hand_idx]
-        if hand[0].get_value() != hand[1].get_value():
+        if hand[0].value != hand[1].value:
             return False
             
         # 获取当前下注金额
         current_bet = self.player_bets[player_id][hand_idx]
         
         # 创建新手牌
-        new_hand = [hand[1]]  # 将第二张牌移到新手牌
-        self.player_hands[player_id][hand_idx] = [hand[0]]  # 保留第一张牌在原手牌
+        new_hand = Hand([hand[1]])  # 将第二张牌移到新手牌
+        self.player_hands[player_id][hand_idx] = Hand([hand[0]])  # 保留第一张牌在原手牌
         
         # 为每手牌各发一张新牌
         self.player_hands[player_id][hand_idx].append(self.deck.deal())
@@ -310,14 +636,20 @@ class BJGame:
             self._dealer_turn()
         
     def _dealer_turn(self):
-        """庄家回合"""
+        """庄家回合
+        
+        Returns:
+            Dict[str, List[Dict]]: 各玩家每手牌的结算结果
+        """
         self.game_status = "dealer_turn"
         
         # 庄家按规则要牌：少于17点必须要牌，17点或以上必须停牌
-        while self.calculate_hand_value(self.dealer_hand) < 17:
+        while self.calculate_hand_value(self.dealer_hand) < self.DEALER_STAND_VALUE:
             self.dealer_hand.append(self.deck.deal())
             
-        self._determine_winners()
+        self.results = self._determine_winners()
+        self.game_status = "finished"
+        return self.results
         
     def _determine_winners(self):
         """确定赢家"""
@@ -348,7 +680,7 @@ class BJGame:
                 # 判断输赢
                 if player_blackjack and not dealer_blackjack:
                     # 玩家BlackJack且庄家非BlackJack: 玩家胜(赔率3:2)
-                    win_amount = int(bet * 1.5)
+                    win_amount = int(bet * self.BLACKJACK_PAYOUT)
                     results[player_id].append({
                         'hand_idx': hand_idx,
                         'result': 'blackjack',
@@ -372,11 +704,11 @@ class BJGame:
                         'win_amount': 0
                     })
                 elif dealer_value > 21:
-                    # 庄家爆牌: 玩家胜
+                    # 庄家爆牌: 玩家胜（文案与插件原先的结算回复一致，用逗号而不是感叹号）
                     results[player_id].append({
                         'hand_idx': hand_idx,
                         'result': 'win',
-                        'message': f'庄家爆牌! 赢得 {bet} 筹码',
+                        'message': f'庄家爆牌，赢得 {bet} 筹码',
                         'win_amount': bet
                     })
                 elif player_value > dealer_value:
@@ -406,6 +738,92 @@ class BJGame:
                     
         return results
         
+    def snapshot(self) -> bytes:
+        """把牌局序列化为紧凑的二进制快照
+
+        包含牌靴牌序和游标、庄家和玩家手牌、下注、手牌状态以及行动位置，
+        不包含已结算的 results（结算后的牌局不再需要恢复）。
+        """
+        deck = self.deck
+        parts = [
+            _SNAPSHOT_HEADER.pack(
+                SNAPSHOT_VERSION, GAME_STATUSES.index(self.game_status),
+                deck.num_decks, deck.penetration, deck._cursor, len(deck._codes),
+                self.current_player_idx, len(self.players_order)
+            ),
+            _ROUND_ID.pack(self.round_id),
+            deck._codes.tobytes(),
+            _pack_cards(self.dealer_hand),
+        ]
+        for player_id in self.players_order:
+            raw_id = player_id.encode('utf-8')
+            hands = self.player_hands.get(player_id, [])
+            parts.append(_PLAYER_ID.pack(len(raw_id)))
+            parts.append(raw_id)
+            parts.append(_PLAYER_HANDS.pack(self.current_hand_idx.get(player_id, 0), len(hands)))
+            for hand, bet, status in zip(hands, self.player_bets[player_id], self.player_statuses[player_id]):
+                parts.append(_HAND_HEADER.pack(bet, HAND_STATUSES.index(status), len(hand)))
+                parts.append(bytes(card.code for card in hand))
+        return b''.join(parts)
+        
+    @classmethod
+    def restore(cls, data: bytes, rng: Optional[random.Random] = None) -> 'BJGame':
+        """从 snapshot() 生成的快照恢复牌局
+
+        Raises:
+            ValueError: 快照版本不支持或数据不完整
+        """
+        try:
+            (version, status, num_decks, penetration, cursor, shoe_size,
+             current_player_idx, num_players) = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        except struct.error as e:
+            raise ValueError(f"牌局快照数据不完整: {e}")
+        if version not in (1, SNAPSHOT_VERSION):
+            raise ValueError(f"不支持的牌局快照版本: {version}")
+            
+        offset = _SNAPSHOT_HEADER.size
+        round_id = 0
+        if version >= 2:
+            if len(data) < offset + _ROUND_ID.size:
+                raise ValueError("牌局快照数据不完整")
+            (round_id,) = _ROUND_ID.unpack_from(data, offset)
+            offset += _ROUND_ID.size
+        if len(data) < offset + shoe_size:
+            raise ValueError("牌局快照数据不完整")
+        deck = Deck.from_codes(data[offset:offset + shoe_size], cursor, num_decks, penetration, rng)
+        offset += shoe_size
+        game = cls(deck)
+        game.current_player_idx = current_player_idx
+        game.round_id = round_id
+        
+        try:
+            game.game_status = GAME_STATUSES[status]
+            game.dealer_hand, offset = _unpack_cards(data, offset + 1, data[offset])
+            for _ in range(num_players):
+                (id_len,) = _PLAYER_ID.unpack_from(data, offset)
+                offset += _PLAYER_ID.size
+                player_id = data[offset:offset + id_len].decode('utf-8')
+                offset += id_len
+                hand_idx, num_hands = _PLAYER_HANDS.unpack_from(data, offset)
+                offset += _PLAYER_HANDS.size
+                
+                hands, bets, statuses = [], [], []
+                for _ in range(num_hands):
+                    bet, hand_status, num_cards = _HAND_HEADER.unpack_from(data, offset)
+                    hand, offset = _unpack_cards(data, offset + _HAND_HEADER.size, num_cards)
+                    hands.append(hand)
+                    bets.append(bet)
+                    statuses.append(HAND_STATUSES[hand_status])
+                    
+                game.players_order.append(player_id)
+                game.player_hands[player_id] = hands
+                game.player_bets[player_id] = bets
+                game.player_statuses[player_id] = statuses
+                game.current_hand_idx[player_id] = hand_idx
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"牌局快照数据不完整: {e}")
+        return game
+        
     def calculate_hand_value(self, hand: List[Card]) -> int:
         """计算手牌点数
         
@@ -415,15 +833,17 @@ class BJGame:
         Returns:
             int: 手牌点数
         """
+        # 手牌对象自带增量维护的点数
+        if isinstance(hand, Hand):
+            return hand.value
+            
         value = 0
         aces = 0
         
         for card in hand:
-            if card.rank == 'A':
+            value += card.value
+            if card.is_ace:
                 aces += 1
-                value += 11
-            else:
-                value += card.get_value()
         
         # 如果点数超过21且有A，则将A当作1点计算
         while value > 21 and aces > 0:
@@ -432,13 +852,19 @@ class BJGame:
             
         return value
         
+    def is_blackjack(self, hand: List[Card]) -> bool:
+        """判断手牌是否为BlackJack（两张牌21点）"""
+        if isinstance(hand, Hand):
+            return hand.is_blackjack
+        return len(hand) == 2 and self.calculate_hand_value(hand) == 21
+        
     def get_dealer_first_card(self) -> Optional[Card]:
         """获取庄家的第一张牌（明牌）"""
         if len(self.dealer_hand) > 0:
             return self.dealer_hand[0]
         return None
         
-    def get_player_hand(self, player_id: str, hand_idx: int = 0) -> List[Card]:
+    def get_player_hand(self, player_id: str, hand_idx: int = 0) -> Hand:
         """获取玩家手牌
         
         Args:
@@ -446,11 +872,11 @@ class BJGame:
             hand_idx: 手牌索引，默认为0
             
         Returns:
-            List[Card]: 手牌列表
+            Hand: 手牌
         """
         if player_id in self.player_hands and hand_idx < len(self.player_hands[player_id]):
             return self.player_hands[player_id][hand_idx]
-        return []
+        return Hand()
         
     def get_player_hand_value(self, player_id: str, hand_idx: int = 0) -> int:
         """获取玩家手牌点数
@@ -466,7 +892,7 @@ class BJGame:
             return self.calculate_hand_value(self.player_hands[player_id][hand_idx])
         return 0
         
-    def get_dealer_hand(self) -> List[Card]:
+    def get_dealer_hand(self) -> Hand:
         """获取庄家手牌"""
         return self.dealer_hand
         
@@ -506,11 +932,29 @@ class BJGame:
         
         # 检查是否只有两张牌且点数相同
         return (len(hand) == 2 and 
-                hand[0].get_value() == hand[1].get_value())
-                
+                hand[0].value == hand[1].value)
+
+    def shoe_stats(self, visible_only: bool = True) -> Dict[str, Any]:
+        """牌靴的发牌进度和计数统计
+
+        Args:
+            visible_only: 玩家回合中庄家的暗牌还没有亮出，为 True 时按玩家能看到的牌计数，
+                          即把暗牌当作仍在牌靴中
+        """
+        stats = self.deck.stats()
+        if visible_only and self.game_status == "playing" and len(self.dealer_hand) > 1:
+            code = self.dealer_hand[1].code
+            rank = _RANK_INDEX[code]
+            stats["running_count"] -= _HI_LO[code]
+            stats["ko_count"] -= _KO[code]
+            stats["rank_counts"][Card.RANKS[rank]] += 1
+            unseen = stats["remaining"] + 1
+            stats["true_count"] = stats["running_count"] * len(CARDS) / unseen
+        return stats
+
     def format_card(self, card: Card) -> str:
         """格式化扑克牌显示"""
-        return f"{card.suit}{card.rank}"
+        return str(card)
         
     def format_hand(self, hand: List[Card]) -> str:
         """格式化手牌显示"""
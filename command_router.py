@@ -0,0 +1,61 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 指令处理函数：(session_id, user_id, nickname, group_id, content) -> 回复文本
+Handler = Callable[[str, str, str, Optional[str], str], str]
+
+
+class CommandRouter:
+    """指令路由表
+
+    在插件初始化时构建一次。指令名统一 casefold 后存入字典，匹配时：
+    1. 先检查消息首字符是否可能是某个指令的开头，绝大多数普通聊天消息在这里直接放行；
+    2. 再按第一个词精确查找，找不到时按 casefold 后的词查找（大小写不敏感）；
+    3. 最后检查「下注100」这类指令与参数连写的前缀指令。
+    """
+
+    def __init__(self):
+        self._commands: Dict[str, Handler] = {}
+        self._prefixes: List[Tuple[str, Handler]] = []
+        self._first_chars = set()
+        self._names: Dict[Handler, str] = {}  # 处理函数 -> 指令名（第一个别名），用于统计
+
+    def _add_first_char(self, name: str):
+        first = name[0]
+        self._first_chars.update((first, first.lower(), first.upper(), first.casefold()[0]))
+
+    def add(self, names: List[str], handler: Handler):
+        """注册指令，names 为该指令的所有别名"""
+        self._names.setdefault(handler, names[0])
+        for name in names:
+            self._commands[name] = handler
+            self._commands[name.casefold()] = handler
+            self._add_first_char(name)
+
+    def add_prefix(self, prefix: str, handler: Handler):
+        """注册可以与参数连写的前缀指令，例如「下注100」"""
+        self._prefixes.append((prefix.casefold(), handler))
+        self._names.setdefault(handler, prefix)
+        self._add_first_char(prefix)
+
+    def match(self, content: str) -> Optional[Handler]:
+        """查找消息对应的指令处理函数，不是本插件的指令时返回 None"""
+        if not content or content[0] not in self._first_chars:
+            return None
+
+        cmd = content.split(None, 1)[0]
+        handler = self._commands.get(cmd)
+        if handler is not None:
+            return handler
+        folded = cmd.casefold()
+        handler = self._commands.get(folded)
+        if handler is not None:
+            return handler
+
+        for prefix, handler in self._prefixes:
+            if folded.startswith(prefix) and len(folded) > len(prefix):
+                return handler
+        return None
+
+    def name(self, handler: Handler) -> str:
+        """获取处理函数对应的指令名"""
+        return self._names.get(handler, getattr(handler, '__name__', 'unknown'))
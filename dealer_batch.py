@@ -0,0 +1,170 @@
+"""庄家结果批量模拟
+
+给定庄家明牌和牌靴剩余构成，一次性模拟大量庄家回合，得到庄家最终点数的概率分布。
+向量化版本依赖 NumPy（可选依赖，未安装时只能使用逐局模拟的标量版本）；
+两者都按 BJGame 的规则：庄家不到停牌点就要牌，A在不爆牌时按11点计算。
+"""
+import random
+from typing import Dict, Iterable, List, Optional, Union
+
+from .blackjack_game import BJGame, Card, Deck, Hand
+
+
+# 牌值构成的下标：0-8 对应 2-10 点，9 对应 A
+VALUE_SLOTS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+ACE_SLOT = 9
+
+# 每个牌值对应的代表牌，用于标量模拟时构造手牌
+_SLOT_CARDS = tuple(Card('♠', rank) for rank in ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'A'))
+
+Outcome = Union[int, str]  # 最终点数，或 "bust" / "blackjack"
+
+
+def composition_from_cards(cards: Iterable[Card]) -> List[int]:
+    """统计一组牌中各牌值的张数"""
+    counts = [0] * len(VALUE_SLOTS)
+    for card in cards:
+        counts[card.value - 2] += 1
+    return counts
+
+
+def composition_from_deck(deck: Deck) -> List[int]:
+    """统计牌靴中剩余各牌值的张数"""
+    counts = [0] * len(VALUE_SLOTS)
+    for rank_value, count in zip(Card.RANK_VALUES, deck.rank_counts()):
+        counts[rank_value - 2] += count
+    return counts
+
+
+def full_shoe_composition(num_decks: int = 6) -> List[int]:
+    """完整牌靴的牌值构成（10点牌包含10/J/Q/K）"""
+    counts = [4 * num_decks] * len(VALUE_SLOTS)
+    counts[8] = 16 * num_decks
+    return counts
+
+
+def _normalize(counter: Dict[Outcome, int], trials: int) -> Dict[Outcome, float]:
+    return {outcome: count / trials for outcome, count in sorted(counter.items(), key=lambda x: str(x[0]))}
+
+
+def simulate_dealer_scalar(up_value: int, composition: List[int], trials: int,
+                           seed: Optional[int] = None,
+                           stand_value: int = BJGame.DEALER_STAND_VALUE) -> Dict[Outcome, float]:
+    """逐局模拟庄家回合（参考实现，直接使用 Hand 和 calculate_hand_value）
+
+    Args:
+        up_value: 庄家明牌的牌值，2-10，A为11
+        composition: 剩余牌靴的牌值构成（不含明牌），见 VALUE_SLOTS
+        trials: 模拟次数
+        seed: 随机种子
+        stand_value: 庄家停牌点
+
+    Returns:
+        Dict: 最终点数 / "bust" / "blackjack" -> 概率
+    """
+    rng = random.Random(seed)
+    game = BJGame()
+    counter: Dict[Outcome, int] = {}
+    up_card = _SLOT_CARDS[up_value - 2]
+
+    for _ in range(trials):
+        counts = list(composition)
+        remaining = sum(counts)
+        hand = Hand([up_card])
+        while game.calculate_hand_value(hand) < stand_value:
+            pick = rng.randrange(remaining)
+            slot = 0
+            while pick >= counts[slot]:
+                pick -= counts[slot]
+                slot += 1
+            counts[slot] -= 1
+            remaining -= 1
+            hand.append(_SLOT_CARDS[slot])
+
+        value = game.calculate_hand_value(hand)
+        if value > 21:
+            outcome = "bust"
+        elif len(hand) == 2 and value == 21:
+            outcome = "blackjack"
+        else:
+            outcome = value
+        counter[outcome] = counter.get(outcome, 0) + 1
+
+    return _normalize(counter, trials)
+
+
+def simulate_dealer_batch(up_value: int, composition: List[int], trials: int,
+                          seed: Optional[int] = None,
+                          stand_value: int = BJGame.DEALER_STAND_VALUE,
+                          batch_size: int = 1 << 18) -> Dict[Outcome, float]:
+    """用 NumPy 向量化地批量模拟庄家回合
+
+    每个批次同时推进所有尚未停牌的模拟：按剩余构成不放回抽牌，
+    用「硬点数 + 是否有A」表示手牌，A在不爆牌时按11点计算，与标量实现的语义一致。
+
+    参数和返回值同 simulate_dealer_scalar。
+    """
+    # numpy 导入较慢，只在真正需要向量化模拟时导入
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("simulate_dealer_batch 需要安装 numpy")
+
+    rng = np.random.default_rng(seed)
+    slot_hard = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 1], dtype=np.int16)
+    base_counts = np.asarray(composition, dtype=np.int32)
+    up_hard = 1 if up_value == 11 else up_value
+    counter: Dict[Outcome, int] = {}
+
+    done = 0
+    while done < trials:
+        n = min(batch_size, trials - done)
+        done += n
+
+        counts = np.tile(base_counts, (n, 1))
+        hard = np.full(n, up_hard, dtype=np.int16)
+        has_ace = np.full(n, up_value == 11)
+        num_cards = np.ones(n, dtype=np.int8)
+        active = np.arange(n)
+
+        while active.size:
+            # 按剩余张数加权、不放回地为每个未停牌的模拟抽一张牌
+            cum = np.cumsum(counts[active], axis=1)
+            pick = (rng.random(active.size) * cum[:, -1]).astype(np.int32)
+            slot = (cum <= pick[:, None]).sum(axis=1)
+            counts[active, slot] -= 1
+            hard[active] += slot_hard[slot]
+            has_ace[active] |= slot == ACE_SLOT
+            num_cards[active] += 1
+
+            h = hard[active]
+            total = np.where(has_ace[active] & (h + 10 <= 21), h + 10, h)
+            active = active[total < stand_value]
+
+        total = np.where(has_ace & (hard + 10 <= 21), hard + 10, hard)
+        bust = total > 21
+        blackjack = (num_cards == 2) & (total == 21)
+        counter["bust"] = counter.get("bust", 0) + int(bust.sum())
+        counter["blackjack"] = counter.get("blackjack", 0) + int(blackjack.sum())
+        values, freq = np.unique(total[~bust & ~blackjack], return_counts=True)
+        for value, count in zip(values.tolist(), freq.tolist()):
+            counter[value] = counter.get(value, 0) + count
+
+    return _normalize({k: v for k, v in counter.items() if v}, trials)
+
+
+def dealer_probability_table(composition: List[int], trials: int, seed: Optional[int] = None,
+                             stand_value: int = BJGame.DEALER_STAND_VALUE) -> Dict[int, Dict[Outcome, float]]:
+    """为每种明牌（2-10, A）计算庄家最终点数分布
+
+    明牌会从给定构成中扣除一张后再模拟。
+    """
+    table = {}
+    for slot, up_value in enumerate(VALUE_SLOTS):
+        if composition[slot] == 0:
+            continue
+        remaining = list(composition)
+        remaining[slot] -= 1
+        seed_i = None if seed is None else seed + slot
+        table[up_value] = simulate_dealer_batch(up_value, remaining, trials, seed_i, stand_value)
+    return table
@@ -0,0 +1,156 @@
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 记录类型
+RECORD_SNAPSHOT = 1  # 群聊牌局的最新快照
+RECORD_END = 2       # 群聊牌局已结束，之前的快照作废
+
+# 记录格式：类型、群聊ID长度、数据长度、群聊ID、数据、CRC32（覆盖前面所有字节）
+_RECORD_HEADER = struct.Struct('<BHI')
+_RECORD_CRC = struct.Struct('<I')
+
+
+class GameJournal:
+    """牌局快照的追加式日志
+
+    每次牌局状态变化后追加一条该群聊的快照记录，牌局结束时追加结束记录；
+    启动时顺序重放日志，每个群聊只保留最后一条快照，然后压缩日志只保留仍在进行的牌局。
+    日志末尾因进程中断而写了一半的记录会在重放时被丢弃。
+
+    每条记录写入后只 flush 到操作系统，不逐条 fsync：进程崩溃不会丢失记录，
+    但掉电时可能丢失最后几条。
+
+    快照中的下注在记录前已经从筹码中扣除，但扣款可能还在玩家数据的写回缓存中。
+    插件恢复牌局时按筹码账本修正余额；未启用账本时用 before_record 在写入有变化的快照之前
+    先把写回缓存落盘，否则崩溃后恢复的牌局带着下注、余额却没有扣除，结算时会多返还本金。
+    """
+
+    COMPACT_BYTES = 4 * 1024 * 1024  # 日志超过该大小时压缩
+
+    def __init__(self, journal_file: str, compact_bytes: Optional[int] = None,
+                 before_record: Optional[Callable[[], None]] = None):
+        self.journal_file = journal_file
+        self.compact_bytes = compact_bytes if compact_bytes is not None else self.COMPACT_BYTES
+        self.before_record = before_record
+        self._lock = threading.Lock()
+        self._latest: Dict[str, bytes] = {}  # 群聊ID -> 最新快照
+        self._file = None
+        self._size = 0
+
+    def load(self) -> Dict[str, bytes]:
+        """重放日志，返回每个仍在进行的群聊牌局的最新快照，并压缩日志"""
+        with self._lock:
+            self._latest = {}
+            try:
+                with open(self.journal_file, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+
+            offset = 0
+            while offset < len(data):
+                record = self._parse_record(data, offset)
+                if record is None:
+                    logger.warning(f"21点牌局日志在第 {offset} 字节处不完整，已丢弃之后的内容")
+                    break
+                record_type, group_id, payload, offset = record
+                if record_type == RECORD_SNAPSHOT:
+                    self._latest[group_id] = payload
+                elif record_type == RECORD_END:
+                    self._latest.pop(group_id, None)
+
+            self._compact()
+            return dict(self._latest)
+
+    @staticmethod
+    def _parse_record(data: bytes, offset: int):
+        """解析 offset 处的一条记录，记录不完整或校验失败时返回 None"""
+        body_start = offset + _RECORD_HEADER.size
+        if body_start > len(data):
+            return None
+        record_type, group_len, payload_len = _RECORD_HEADER.unpack_from(data, offset)
+        payload_start = body_start + group_len
+        crc_start = payload_start + payload_len
+        end = crc_start + _RECORD_CRC.size
+        if end > len(data):
+            return None
+        (crc,) = _RECORD_CRC.unpack_from(data, crc_start)
+        if zlib.crc32(data[offset:crc_start]) != crc:
+            return None
+        try:
+            group_id = data[body_start:payload_start].decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        return record_type, group_id, data[payload_start:crc_start], end
+
+    @staticmethod
+    def _encode_record(record_type: int, group_id: str, payload: bytes) -> bytes:
+        raw_id = group_id.encode('utf-8')
+        body = _RECORD_HEADER.pack(record_type, len(raw_id), len(payload)) + raw_id + payload
+        return body + _RECORD_CRC.pack(zlib.crc32(body))
+
+    def record(self, group_id: str, snapshot: bytes):
+        """追加群聊牌局的快照，与上一条快照相同时不写入"""
+        if self._latest.get(group_id) == snapshot:
+            return
+        if self.before_record is not None:
+            self.before_record()
+        with self._lock:
+            self._latest[group_id] = snapshot
+            self._append(self._encode_record(RECORD_SNAPSHOT, group_id, snapshot))
+
+    def end(self, group_id: str):
+        """记录群聊牌局已结束"""
+        with self._lock:
+            if self._latest.pop(group_id, None) is None:
+                return
+            self._append(self._encode_record(RECORD_END, group_id, b''))
+
+    def latest(self, group_id: str) -> Optional[bytes]:
+        """获取群聊牌局最后一次记录的快照，牌局已结束或从未记录时返回 None"""
+        return self._latest.get(group_id)
+
+    def groups(self):
+        """仍有进行中牌局的群聊ID列表"""
+        with self._lock:
+            return list(self._latest)
+
+    def _append(self, record: bytes):
+        if self._file is None:
+            self._file = open(self.journal_file, 'ab')
+            self._size = self._file.tell()
+        self._file.write(record)
+        self._file.flush()
+        self._size += len(record)
+        if self._size > self.compact_bytes:
+            self._compact()
+
+    def _compact(self):
+        """把仍在进行的牌局的最新快照原子地写成新日志"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp_file = self.journal_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            for group_id, snapshot in self._latest.items():
+                f.write(self._encode_record(RECORD_SNAPSHOT, group_id, snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.journal_file)
+
+        self._file = open(self.journal_file, 'ab')
+        self._size = self._file.tell()
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
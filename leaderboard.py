@@ -0,0 +1,116 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 支持排行的字段
+METRICS = ('chips', 'total_wins', 'blackjack_count')
+
+
+def _to_int(value: Any) -> int:
+    """把字段值转换为整数，兼容浮点字符串"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
+
+
+class LeaderboardIndex:
+    """增量维护的排行榜索引
+
+    每个指标维护一个按 (-数值, 注册顺序) 升序排列的有序列表和一个 user_id -> 排序键 的映射。
+    取前K名是列表切片 O(K)，查询单个玩家排名是一次二分查找 O(log N)。
+    数值相同时按注册先后排序，与原先按文件顺序稳定排序的结果一致。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[str, List[Tuple[int, int, str]]] = {metric: [] for metric in METRICS}
+        self._entries: Dict[str, Dict[str, Tuple[int, int, str]]] = {metric: {} for metric in METRICS}
+        self._order: Dict[str, int] = {}  # user_id -> 注册顺序
+        self._next_order = 0
+
+    @classmethod
+    def build(cls, rows: Iterable[Dict[str, str]]) -> 'LeaderboardIndex':
+        """从全部玩家数据构建索引"""
+        index = cls()
+        for row in rows:
+            user_id = row.get('user_id')
+            if not user_id:
+                continue
+            order = index._assign_order(user_id)
+            for metric in METRICS:
+                key = (-_to_int(row.get(metric, 0)), order, user_id)
+                index._entries[metric][user_id] = key
+                index._keys[metric].append(key)
+        for keys in index._keys.values():
+            keys.sort()
+        return index
+
+    @classmethod
+    def from_columns(cls, user_ids: List[str], columns: Dict[str, List[int]]) -> 'LeaderboardIndex':
+        """从按注册顺序排列的 user_id 列（不重复）和已是整数的各指标列构建索引，省去逐行解析"""
+        index = cls()
+        index._order = {user_id: order for order, user_id in enumerate(user_ids)}
+        index._next_order = len(user_ids)
+        for metric in METRICS:
+            keys = [(-value, order, user_id)
+                    for order, (user_id, value) in enumerate(zip(user_ids, columns[metric]))]
+            index._entries[metric] = dict(zip(user_ids, keys))
+            keys.sort()
+            index._keys[metric] = keys
+        return index
+
+    def _assign_order(self, user_id: str) -> int:
+        order = self._order.get(user_id)
+        if order is None:
+            order = self._next_order
+            self._order[user_id] = order
+            self._next_order += 1
+        return order
+
+    def update(self, user_id: str, fields: Dict[str, Any]):
+        """玩家数据变化后更新相关指标，fields 中不含排行字段时不做任何事"""
+        with self._lock:
+            for metric in METRICS:
+                if metric not in fields:
+                    continue
+                order = self._assign_order(user_id)
+                new_key = (-_to_int(fields[metric]), order, user_id)
+                keys = self._keys[metric]
+                old_key = self._entries[metric].get(user_id)
+                if old_key == new_key:
+                    continue
+                if old_key is not None:
+                    del keys[bisect_left(keys, old_key)]
+                insort(keys, new_key)
+                self._entries[metric][user_id] = new_key
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            for metric in METRICS:
+                self._keys[metric] = []
+                self._entries[metric] = {}
+            self._order = {}
+            self._next_order = 0
+
+    def top(self, metric: str, k: int = 10) -> List[Tuple[str, int]]:
+        """获取前k名
+
+        Returns:
+            List[Tuple[str, int]]: [(user_id, 数值), ...]
+        """
+        return [(user_id, -neg_value) for neg_value, _, user_id in self._keys[metric][:k]]
+
+    def rank(self, metric: str, user_id: str) -> Optional[int]:
+        """获取玩家排名（从1开始），玩家不存在时返回None"""
+        key = self._entries[metric].get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._keys[metric], key) + 1
+
+    def __len__(self) -> int:
+        return len(self._order)
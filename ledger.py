@@ -0,0 +1,317 @@
+"""筹码流水账本
+
+每一次筹码变动（下注、加倍、分牌、签到、结算等）追加一条记录，只追加不修改，
+可以用来审计，也可以在玩家数据文件损坏或丢失写回时重建筹码余额。
+
+也可以作为脚本运行，重放账本重建余额，并与玩家数据核对或写回:
+
+    python ledger.py data/bjchips.ledger [--verify data/bjplayers.csv] [--apply data/bjplayers.csv]
+
+玩家数据文件可以是CSV（.csv）、SQLite数据库（.db）、定长记录文件（.bjp），或分片存储的分片表（data/bjplayers/shards.json）。
+定长记录文件通过插件中的 mmap_store 读写，需要在机器人根目录下以模块方式运行:
+
+    python -m plugins.BlackJack.ledger plugins/BlackJack/data/bjchips.ledger --verify plugins/BlackJack/data/bjplayers.bjp
+"""
+import argparse
+import atexit
+import csv
+import json
+import logging
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 变动原因，记录中只存它在元组中的序号，只能在末尾追加
+REASONS = ('open', 'register', 'bet', 'refund', 'double', 'split', 'checkin', 'settle', 'reset', 'other')
+
+# 记录格式：原因、玩家ID长度、筹码增量、变动后余额、牌局ID、时间戳、玩家ID(UTF-8)、CRC32（覆盖前面所有字节）
+_RECORD_HEADER = struct.Struct('<BHqqQd')
+_RECORD_CRC = struct.Struct('<I')
+
+
+class LedgerEntry(NamedTuple):
+    """一条筹码流水"""
+    reason: str
+    user_id: str
+    delta: int
+    balance: int
+    round_id: int
+    timestamp: float
+
+
+class ChipLedger:
+    """追加式的筹码流水账本
+
+    记录以紧凑的二进制格式顺序追加，每条几十个字节，写入后立即 flush 到操作系统，
+    进程崩溃不会丢失；fsync 则批量进行：第一条未落盘的记录写入后最迟 sync_interval 秒
+    统一 fsync 一次，退出时也会 fsync。掉电时最多丢失这段时间内的记录。
+    """
+
+    DEFAULT_SYNC_INTERVAL = 1.0
+
+    def __init__(self, ledger_file: str, sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.ledger_file = ledger_file
+        self.sync_interval = sync_interval
+        self.is_new = not os.path.exists(ledger_file) or os.path.getsize(ledger_file) == 0
+        self._lock = threading.Lock()
+        if not self.is_new:
+            self._truncate_torn_tail()
+        self._file = open(ledger_file, 'ab')
+        self._unsynced = 0
+        self._sync_timer: Optional[threading.Timer] = None
+        atexit.register(self.close)
+
+    def _truncate_torn_tail(self):
+        """截掉上次进程中断时写了一半的记录，否则之后追加的记录在重放时会被一起忽略"""
+        valid = 0
+        for _, valid in _scan(self.ledger_file):
+            pass
+        if valid < os.path.getsize(self.ledger_file):
+            logger.warning(f"筹码账本末尾有不完整的记录，已截断到 {valid} 字节")
+            with open(self.ledger_file, 'r+b') as f:
+                f.truncate(valid)
+
+    @staticmethod
+    def _encode(reason: str, user_id: str, delta: int, balance: int, round_id: int) -> bytes:
+        raw_id = user_id.encode('utf-8')
+        body = _RECORD_HEADER.pack(
+            REASONS.index(reason if reason in REASONS else 'other'), len(raw_id),
+            delta, balance, round_id, time.time()
+        ) + raw_id
+        return body + _RECORD_CRC.pack(zlib.crc32(body))
+
+    def record(self, user_id: str, delta: int, balance: int, reason: str = 'other', round_id: int = 0):
+        """追加一条筹码变动
+
+        Args:
+            user_id: 玩家ID
+            delta: 筹码增量
+            balance: 变动后的余额
+            reason: 变动原因，见 REASONS
+            round_id: 所属牌局ID，与牌局无关时为 0
+        """
+        self._append(self._encode(reason, user_id, delta, balance, round_id))
+
+    def reset(self):
+        """记录全部玩家数据被清空"""
+        self._append(self._encode('reset', '', 0, 0, 0))
+
+    def open_balances(self, rows):
+        """记录已有玩家的期初余额（账本首次启用时调用）"""
+        records = []
+        for row in rows:
+            balance = int(row.get('chips') or 0)
+            records.append(self._encode('open', str(row['user_id']), balance, balance, 0))
+        if records:
+            self._append(b''.join(records), len(records))
+
+    def _append(self, data: bytes, count: int = 1):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(data)
+            self._file.flush()
+            self._unsynced += count
+            if self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.sync_interval, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def sync(self):
+        """把已写入的记录 fsync 到磁盘"""
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._file is None or not self._unsynced:
+                return
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """fsync 并关闭账本"""
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def replay(ledger_file: str) -> Iterator[LedgerEntry]:
+        """按写入顺序读取账本中的所有记录，末尾不完整或校验失败的记录及其之后的内容被忽略"""
+        for entry, _ in _scan(ledger_file):
+            yield entry
+
+
+def _scan(ledger_file: str) -> Iterator[Tuple[LedgerEntry, int]]:
+    """逐条解析账本，返回 (记录, 该记录结束的字节偏移)"""
+    with open(ledger_file, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        body_start = offset + _RECORD_HEADER.size
+        if body_start > len(data):
+            break
+        reason, id_len, delta, balance, round_id, timestamp = _RECORD_HEADER.unpack_from(data, offset)
+        crc_start = body_start + id_len
+        end = crc_start + _RECORD_CRC.size
+        if end > len(data) or zlib.crc32(data[offset:crc_start]) != _RECORD_CRC.unpack_from(data, crc_start)[0]:
+            logger.warning(f"筹码账本在第 {offset} 字节处不完整，已忽略之后的内容")
+            break
+        user_id = data[body_start:crc_start].decode('utf-8', errors='replace')
+        yield LedgerEntry(REASONS[reason] if reason < len(REASONS) else 'other',
+                          user_id, delta, balance, round_id, timestamp), end
+        offset = end
+
+
+def rebuild_balances(ledger_file: str) -> Dict[str, int]:
+    """重放账本，返回每名玩家的筹码余额"""
+    balances: Dict[str, int] = {}
+    for entry in ChipLedger.replay(ledger_file):
+        if entry.reason == 'reset':
+            balances = {}
+        elif entry.reason == 'open':
+            balances[entry.user_id] = entry.delta
+        else:
+            balances[entry.user_id] = balances.get(entry.user_id, 0) + entry.delta
+    return balances
+
+
+def reconcile_chips(store, ledger_file: str, user_ids: Iterable[str]) -> int:
+    """把这些玩家在玩家数据中的筹码改为重放账本得到的余额，返回修改的玩家数
+
+    账本记录在每次筹码变动时立即写入，玩家数据则可能还留在写回缓存中，进程崩溃后会落后于账本。
+    插件恢复进行中的牌局时用它修正牌局中玩家的余额，使快照中的下注与已扣除的筹码一致。
+    """
+    balances = rebuild_balances(ledger_file)
+    changed = 0
+    for user_id in user_ids:
+        row = store.get(user_id)
+        if row is None:
+            continue
+        chips = balances.get(row['user_id'])
+        if chips is not None and row.get('chips') != str(chips):
+            logger.warning(f"玩家 {row['user_id']} 的筹码 {row.get('chips')} 与账本余额 {chips} 不一致，已按账本修正")
+            # 直接写入余额，不经过 adjust，避免在账本中重复记录这笔变动
+            store.update(row['user_id'], {'chips': chips})
+            changed += 1
+    if changed:
+        store.flush()
+    return changed
+
+
+def _shard_files(shard_map_file: str):
+    """分片表中列出的各分片文件路径"""
+    with open(shard_map_file, 'r', encoding='utf-8') as f:
+        files = json.load(f)['files']
+    return [os.path.join(os.path.dirname(shard_map_file), name) for name in files]
+
+
+def _open_mmap_store(player_file: str):
+    """打开定长记录玩家文件（不存在时不创建）"""
+    try:
+        from .mmap_store import FIELDS, MmapPlayerStore
+    except ImportError:
+        raise SystemExit("定长记录玩家文件需要在机器人根目录下用 python -m plugins.BlackJack.ledger 运行")
+    if not os.path.exists(player_file):
+        raise FileNotFoundError(player_file)
+    return MmapPlayerStore(player_file, list(FIELDS))
+
+
+def _read_balances(player_file: str) -> Dict[str, int]:
+    if player_file.endswith('.json'):
+        balances = {}
+        for shard_file in _shard_files(player_file):
+            balances.update(_read_balances(shard_file))
+        return balances
+    if player_file.endswith('.db'):
+        with sqlite3.connect(player_file) as conn:
+            return {str(user_id): int(chips) for user_id, chips in conn.execute("SELECT user_id, chips FROM players")}
+    if player_file.endswith('.bjp'):
+        store = _open_mmap_store(player_file)
+        try:
+            return {row['user_id']: int(row['chips']) for row in store.rows()}
+        finally:
+            store.close()
+    with open(player_file, 'r', encoding='utf-8', newline='') as f:
+        return {row['user_id']: int(row.get('chips') or 0) for row in csv.DictReader(f)}
+
+
+def _write_balances(player_file: str, balances: Dict[str, int]) -> int:
+    """把重建的余额写回玩家数据，返回修改的玩家数（插件运行时不要执行）"""
+    if player_file.endswith('.json'):
+        return sum(_write_balances(shard_file, balances) for shard_file in _shard_files(player_file))
+    if player_file.endswith('.db'):
+        with sqlite3.connect(player_file) as conn:
+            cursor = conn.executemany("UPDATE players SET chips = ? WHERE user_id = ? AND chips != ?",
+                                      [(chips, user_id, chips) for user_id, chips in balances.items()])
+            return cursor.rowcount
+    if player_file.endswith('.bjp'):
+        store = _open_mmap_store(player_file)
+        changed = 0
+        try:
+            for row in store.rows():
+                chips = balances.get(row['user_id'])
+                if chips is not None and row['chips'] != str(chips):
+                    store.update(row['user_id'], {'chips': chips})
+                    changed += 1
+        finally:
+            store.close()
+        return changed
+
+    with open(player_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    changed = 0
+    for row in rows:
+        chips = balances.get(row['user_id'])
+        if chips is not None and row.get('chips') != str(chips):
+            row['chips'] = str(chips)
+            changed += 1
+    tmp_file = player_file + '.tmp'
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, player_file)
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="重放筹码账本，重建玩家筹码余额")
+    parser.add_argument('ledger_file')
+    parser.add_argument('--verify', metavar='PLAYER_FILE', help="与玩家数据核对余额")
+    parser.add_argument('--apply', metavar='PLAYER_FILE', help="把重建的余额写回玩家数据")
+    args = parser.parse_args(argv)
+
+    balances = rebuild_balances(args.ledger_file)
+    print(f"账本中共有 {len(balances)} 名玩家，筹码合计 {sum(balances.values())}")
+
+    if args.verify:
+        stored = _read_balances(args.verify)
+        mismatched = [(user_id, chips, stored.get(user_id)) for user_id, chips in balances.items()
+                      if stored.get(user_id) != chips]
+        for user_id, chips, actual in mismatched:
+            print(f"  {user_id}: 账本 {chips}，玩家数据 {actual}")
+        print(f"核对完成，{len(mismatched)} 名玩家的余额不一致")
+        if mismatched and not args.apply:
+            return 1
+
+    if args.apply:
+        changed = _write_balances(args.apply, balances)
+        print(f"已写回 {changed} 名玩家的余额")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
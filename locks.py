@@ -0,0 +1,55 @@
+import threading
+import weakref
+from contextlib import nullcontext
+from typing import Hashable
+
+
+class KeyedLocks:
+    """按键（群聊ID、玩家ID）分配的可重入锁
+
+    同一个键的操作互斥，不同键的操作可以并行。需要同时持有多把锁时，
+    统一按「群聊锁 -> 玩家锁」的顺序获取，避免死锁。
+
+    锁只以弱引用保存：持有或等待某把锁的调用方都引用着它，同一个键拿到的总是同一把锁；
+    没有任何调用方使用时锁被回收，下次使用时重新创建。锁的数量因此只与正在使用的键有关，
+    不会随见过的群聊和玩家无限增长。
+    """
+
+    def __init__(self):
+        self._locks: 'weakref.WeakValueDictionary[Hashable, threading.RLock]' = weakref.WeakValueDictionary()
+        self._guard = threading.Lock()
+
+    def get(self, key: Hashable):
+        """获取键对应的锁，键为空时返回不加锁的上下文（调用方在使用期间须保留返回的锁）"""
+        if not key:
+            return nullcontext()
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+        return lock
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class AsyncKeyedLocks:
+    """KeyedLocks 的 asyncio 版本，只能在事件循环所在的线程中使用
+
+    同一个键的协程依次执行，等待中的协程不占用线程池中的线程。与 KeyedLocks 一样只以弱引用保存锁。
+    """
+
+    def __init__(self):
+        self._locks: 'weakref.WeakValueDictionary[Hashable, asyncio.Lock]' = weakref.WeakValueDictionary()
+
+    def get(self, key: Hashable) -> 'asyncio.Lock':
+        """获取键对应的锁"""
+        lock = self._locks.get(key)
+        if lock is None:
+            # 只有异步入口会用到，延迟导入 asyncio
+            import asyncio
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,151 @@
+import bisect
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+# 延迟直方图的桶上界（秒），与 Prometheus 默认桶一致并补充了亚毫秒级的桶
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图
+
+    记录一次耗时只需一次二分查找和三次整数/浮点加法，不分配内存。
+    多线程同时记录时不加锁，极少数情况下可能丢失一次计数，对监控用途可以接受。
+    """
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        """记录一次耗时"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数，返回所在桶的上界（秒），超出最大桶时返回最大桶上界"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+
+class Metrics:
+    """插件内部的运行指标
+
+    - 计数器：存储读写次数、写回字节数等，记录时只做一次字典自增；
+    - 直方图：每条指令的处理耗时，按指令名分别统计；
+    - 仪表：进行中的牌局数等当前值，只在导出时调用注册的函数读取。
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1):
+        """计数器增加 value"""
+        counters = self.counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        """记录名为 name 的一次耗时"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def gauge(self, name: str, func: Callable[[], float]):
+        """注册仪表，导出时调用 func 获取当前值"""
+        self.gauges[name] = func
+
+    def reset(self):
+        """清空计数器和直方图（仪表保留）"""
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def _gauge_values(self) -> List[Tuple[str, float]]:
+        values = []
+        for name, func in sorted(self.gauges.items()):
+            try:
+                values.append((name, func()))
+            except Exception:
+                continue
+        return values
+
+    def summary_lines(self) -> List[str]:
+        """生成适合在聊天中展示的指标摘要"""
+        lines = [f"运行时长: {int(time.time() - self.started)}秒"]
+        for name, value in self._gauge_values():
+            lines.append(f"{name}: {value}")
+
+        counters = self.counters
+        if counters:
+            lines.append("\n存储:")
+            for name in sorted(counters):
+                lines.append(f"- {name}: {counters[name]}")
+            writes = counters.get('storage_writes', 0)
+            if writes:
+                per_write = counters.get('storage_bytes_written', 0) / writes
+                lines.append(f"- 平均每次写入重写字节: {per_write:.0f}")
+
+        if self.histograms:
+            lines.append("\n指令耗时 (次数 平均 p50 p99):")
+            items = sorted(self.histograms.items(), key=lambda item: -item[1].sum)
+            for name, histogram in items:
+                mean = histogram.sum / histogram.count * 1000
+                p50 = histogram.quantile(0.5) * 1000
+                p99 = histogram.quantile(0.99) * 1000
+                lines.append(f"- {name}: {histogram.count} {mean:.2f}ms ≤{p50:g}ms ≤{p99:g}ms")
+        return lines
+
+    def to_prometheus(self, prefix: str = 'blackjack') -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        for name, value in self._gauge_values():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        if self.histograms:
+            metric = f"{prefix}_command_duration_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(self.histograms.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{command="{label}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{command="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{command="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{command="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """把 Prometheus 文本原子地写入文件，供 node_exporter 的 textfile collector 读取"""
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, path)
+
+
+# 插件全局共享的指标实例
+metrics = Metrics()
@@ -1,202 +1,187 @@
 import json
-from typing import Dict, Any, Optional, List
-import csv
+from typing import Dict, Any, Optional, Tuple
 import logging
 import os
 import shutil
 from datetime import datetime
 
+from .leaderboard import _to_int
+from .player_store import CSVPlayerStore, PlayerStore
+
 logger = logging.getLogger(__name__)
 
+# 玩家字段及其类型，顺序与 CSV 的 STANDARD_FIELDS 一致
+INT_FIELDS = ('chips', 'level', 'exp', 'total_wins', 'total_losses', 'total_draws',
+              'blackjack_count', 'current_bet')
+FIELDS = ('user_id', 'session_id', 'nickname', 'chips', 'level', 'exp',
+          'total_wins', 'total_losses', 'total_draws', 'last_checkin',
+          'blackjack_count', 'ready_status', 'current_bet', 'cards')
+_INT_FIELDS = frozenset(INT_FIELDS)
+_KNOWN_FIELDS = frozenset(FIELDS)
+# 新玩家的默认值（create_new 之外缺少字段时也使用）
+_DEFAULTS = {
+    'user_id': '', 'session_id': '', 'nickname': '未知玩家', 'chips': 0, 'level': 1, 'exp': 0,
+    'total_wins': 0, 'total_losses': 0, 'total_draws': 0, 'last_checkin': '',
+    'blackjack_count': 0, 'ready_status': False, 'current_bet': 0, 'cards': (),
+}
+
+
+def _parse_cards(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    if not value or value == '[]':
+        return ()
+    try:
+        return tuple(json.loads(value))
+    except (TypeError, ValueError):
+        return ()
+
+
+def _parse_int(field: str, value: Any) -> int:
+    """校验并转换写入的整数字段，兼容浮点字符串"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid player data: {field}={value!r}")
+
+
+def _serialize(field: str, value: Any) -> str:
+    """把字段值转换为存储使用的字符串"""
+    if field == 'cards':
+        return json.dumps(list(value))
+    return str(value)
+
+
 class BJPlayer:
-    """21点游戏玩家类，用于管理玩家属性和状态"""
-    def __init__(self, data: Dict[str, Any], player_file: str = None, standard_fields: list = None):
+    """21点游戏玩家类，用于管理玩家属性和状态
+
+    玩家数据在从存储加载时解析一次，保存为带类型的 __slots__ 属性（整数字段为 int，
+    ready_status 为 bool，cards 为元组），读取属性不再做字符串转换；
+    只有写回存储时才序列化为字符串，写入的值在 update_data 中校验一次。
+    data / to_dict() 返回与存储一致的「字段名 -> 字符串」字典，兼容原有用法。
+    """
+
+    __slots__ = FIELDS + ('_extra', 'player_file', 'standard_fields', 'store')
+
+    def __init__(self, data: Dict[str, Any], player_file: str = None, standard_fields: list = None,
+                 store: PlayerStore = None):
         if not isinstance(data, dict):
             raise TypeError("data must be a dictionary")
-        self.data = data
+        self._load(data)
         self.player_file = player_file
         self.standard_fields = standard_fields
-        
-    @property
-    def user_id(self) -> str:
-        """获取玩家的用户ID"""
-        return self.data.get('user_id', '')
-        
-    @property
-    def session_id(self) -> str:
-        """获取玩家的会话ID"""
-        return self.data.get('session_id', '')
-        
-    @property
-    def nickname(self) -> str:
-        """获取玩家昵称"""
-        return self.data.get('nickname', '未知玩家')
-        
-    @property
-    def chips(self) -> int:
-        """获取玩家筹码"""
-        # 修复类型转换问题，先转为浮点数再转为整数
-        chip_value = self.data.get('chips', 0)
-        try:
-            # 先尝试直接转为整数
-            return int(chip_value)
-        except ValueError:
-            # 如果失败，说明可能是浮点数字符串，先转为浮点数再转为整数
-            try:
-                return int(float(chip_value))
-            except (ValueError, TypeError):
-                # 如果再次失败，返回默认值0
-                return 0
-        
-    @chips.setter
-    def chips(self, value: int):
-        """设置玩家筹码"""
-        self.data['chips'] = str(int(value))
-        
-    @property
-    def level(self) -> int:
-        """获取玩家等级"""
-        return int(self.data.get('level', 1))
-        
-    @level.setter
-    def level(self, value: int):
-        """设置玩家等级"""
-        self.data['level'] = str(value)
-        
-    @property
-    def exp(self) -> int:
-        """获取玩家经验值"""
-        return int(self.data.get('exp', 0))
-        
-    @exp.setter
-    def exp(self, value: int):
-        """设置经验值，确保存储为整数字符串"""
+        self.store = store
+
+    def _load(self, row: Dict[str, Any]):
+        """从存储的行字典解析全部字段，无法解析的整数按默认值或 0 处理"""
+        get = row.get
+        self.user_id = str(get('user_id', ''))
+        self.session_id = str(get('session_id', ''))
+        self.nickname = get('nickname', '未知玩家')
         try:
-            self.data['exp'] = str(int(value))
-        except (ValueError, TypeError):
-            self.data['exp'] = '0'
-        
-    @property
-    def total_wins(self) -> int:
-        """获取玩家总胜场"""
-        return int(self.data.get('total_wins', 0))
-        
-    @total_wins.setter
-    def total_wins(self, value: int):
-        """设置总胜场"""
-        self.data['total_wins'] = str(value)
-        
-    @property
-    def total_losses(self) -> int:
-        """获取玩家总败场"""
-        return int(self.data.get('total_losses', 0))
-        
-    @total_losses.setter
-    def total_losses(self, value: int):
-        """设置总败场"""
-        self.data['total_losses'] = str(value)
-        
-    @property
-    def total_draws(self) -> int:
-        """获取玩家总平局"""
-        return int(self.data.get('total_draws', 0))
-        
-    @total_draws.setter
-    def total_draws(self, value: int):
-        """设置总平局数"""
-        self.data['total_draws'] = str(value)
-        
-    @property
-    def last_checkin(self) -> str:
-        """获取玩家上次签到时间"""
-        return self.data.get('last_checkin', '')
-        
-    @last_checkin.setter
-    def last_checkin(self, value: str):
-        """设置上次签到时间"""
-        self.data['last_checkin'] = value
-        
-    @property
-    def blackjack_count(self) -> int:
-        """获取玩家BlackJack次数"""
-        return int(self.data.get('blackjack_count', 0))
-        
-    @blackjack_count.setter
-    def blackjack_count(self, value: int):
-        """设置BlackJack次数"""
-        self.data['blackjack_count'] = str(value)
-        
-    @property
-    def ready_status(self) -> bool:
-        """获取玩家准备状态"""
-        status = self.data.get('ready_status', 'False')
-        return status.lower() == 'true'
-        
-    @ready_status.setter
-    def ready_status(self, value: bool):
-        """设置玩家准备状态"""
-        self.data['ready_status'] = str(value)
-        
-    @property
-    def current_bet(self) -> int:
-        """获取当前下注金额"""
-        return int(self.data.get('current_bet', 0))
-        
-    @current_bet.setter
-    def current_bet(self, value: int):
-        """设置当前下注金额"""
-        self.data['current_bet'] = str(value)
-        
+            # 常见情况：所有整数字段都存在且是整数字符串
+            self.chips = int(row['chips'])
+            self.level = int(row['level'])
+            self.exp = int(row['exp'])
+            self.total_wins = int(row['total_wins'])
+            self.total_losses = int(row['total_losses'])
+            self.total_draws = int(row['total_draws'])
+            self.blackjack_count = int(row['blackjack_count'])
+            self.current_bet = int(row['current_bet'])
+        except (KeyError, TypeError, ValueError):
+            for field in INT_FIELDS:
+                value = get(field)
+                setattr(self, field, _DEFAULTS[field] if value is None or value == '' else _to_int(value))
+        self.last_checkin = get('last_checkin') or ''
+        ready = get('ready_status')
+        self.ready_status = ready == 'True' or (ready is not None and str(ready).lower() == 'true')
+        cards = get('cards')
+        self.cards = () if cards == '[]' else _parse_cards(cards)
+        self._extra = None
+        if not _KNOWN_FIELDS.issuperset(row):
+            self._extra = {field: value for field, value in row.items() if field not in _KNOWN_FIELDS}
+
     @property
-    def cards(self) -> List[str]:
-        """获取当前手牌"""
-        try:
-            return json.loads(self.data.get('cards', '[]'))
-        except:
-            return []
-        
-    @cards.setter
-    def cards(self, value: List[str]):
-        """设置当前手牌"""
-        self.data['cards'] = json.dumps(value)
-        
+    def data(self) -> Dict[str, str]:
+        """与存储格式一致的字段字典（副本，修改它不会改变玩家数据）"""
+        return self.to_dict()
+
     def update_data(self, updates: Dict[str, Any]) -> None:
-        """更新玩家数据并保存到文件"""
-        if not self.player_file or not self.standard_fields:
-            raise ValueError("player_file and standard_fields must be set")
-            
-        # 更新内存中的数据
-        self.data.update(updates)
-        
-        # 验证数据
-        if not self.validate_data():
-            raise ValueError("Invalid player data after update")
-            
+        """校验并更新玩家数据，保存到存储后端"""
+        if self.store is None and (not self.player_file or not self.standard_fields):
+            raise ValueError("store or player_file and standard_fields must be set")
+
+        # 先全部校验转换，任何字段无效时不做修改
+        parsed = {}
+        for field, value in updates.items():
+            if field in _INT_FIELDS:
+                parsed[field] = _parse_int(field, value)
+            elif field == 'ready_status':
+                parsed[field] = value if isinstance(value, bool) else str(value).lower() == 'true'
+            elif field == 'cards':
+                parsed[field] = _parse_cards(value)
+            elif field in _KNOWN_FIELDS:
+                if field == 'user_id' or value is None:
+                    raise ValueError(f"Invalid player data: {field}={value!r}")
+                parsed[field] = str(value)
+            else:
+                parsed[field] = value
+
+        for field, value in parsed.items():
+            if field in _KNOWN_FIELDS:
+                setattr(self, field, value)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[field] = str(value)
+
         try:
-            # 读取所有玩家数据
-            players_data = []
-            with open(self.player_file, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] != self.user_id:
-                        players_data.append(row)
-            
-            # 添加更新后的玩家数据
-            players_data.append(self.data)
-            
-            # 写回文件
-            with open(self.player_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.standard_fields, quoting=csv.QUOTE_ALL)
-                writer.writeheader()
-                writer.writerows(players_data)
-                
+            # 只把变更的字段交给存储后端
+            store = self.store
+            if store is None:
+                store = CSVPlayerStore.for_file(self.player_file, self.standard_fields)
+            store.update(self.user_id, {field: _serialize(field, value) for field, value in parsed.items()})
         except Exception as e:
             logger.error(f"更新玩家数据出错: {e}")
             raise
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        return self.data
+    def adjust_data(self, deltas: Dict[str, int], reason: str = 'other', round_id: int = 0) -> bool:
+        """原子地增减整数字段（筹码、战绩等）并同步内存中的数据
+        
+        Args:
+            deltas: 字段名 -> 增量，例如 {'chips': -100}
+            reason: 筹码变动原因，存储后端设置了账本时记入账本
+            round_id: 所属牌局ID
+            
+        Returns:
+            bool: 是否成功，被减少的字段不足（例如筹码不够）时返回 False
+        """
+        if self.store is None and not self.player_file:
+            raise ValueError("store or player_file must be set")
+            
+        store = self.store
+        if store is None:
+            store = CSVPlayerStore.for_file(self.player_file, self.standard_fields)
+        row = store.adjust(self.user_id, deltas, reason, round_id)
+        if row is None:
+            return False
+        # 只解析发生变化的字段
+        for field in deltas:
+            if field in _INT_FIELDS:
+                setattr(self, field, _to_int(row.get(field)))
+        return True
+
+    def to_dict(self) -> Dict[str, str]:
+        """序列化为与存储格式一致的「字段名 -> 字符串」字典"""
+        row = {field: _serialize(field, getattr(self, field)) for field in FIELDS}
+        if self._extra:
+            row.update(self._extra)
+        return row
         
     @classmethod
     def create_new(cls, user_id: str, nickname: str, session_id: str = None) -> 'BJPlayer':
@@ -213,65 +198,34 @@ class BJPlayer:
         if session_id is None:
             session_id = user_id
             
-        # 基本初始玩家数据
-        player_data = {
-            'user_id': str(user_id),
-            'session_id': str(session_id),
-            'nickname': nickname,
-            'chips': '1000',  # 初始1000筹码
-            'level': '1',  # 初始等级1
-            'exp': '0',  # 初始经验值
-            'total_wins': '0',  # 总胜场
-            'total_losses': '0',  # 总败场
-            'total_draws': '0',  # 总平局
-            'last_checkin': '',  # 上次签到时间
-            'blackjack_count': '0',  # BlackJack次数
-            'ready_status': 'False',  # 准备状态
-            'current_bet': '0',  # 当前下注金额
-            'cards': '[]',  # 当前手牌
-        }
-        return cls(player_data)
+        # 初始1000筹码、等级1，其余战绩为0
+        player = cls.__new__(cls)
+        for field, value in _DEFAULTS.items():
+            setattr(player, field, value)
+        player.user_id = str(user_id)
+        player.session_id = str(session_id)
+        player.nickname = nickname
+        player.chips = 1000
+        player._extra = None
+        player.player_file = None
+        player.standard_fields = None
+        player.store = None
+        return player
 
     def validate_data(self) -> bool:
-        """验证玩家数据的完整性"""
-        required_fields = {
-            'user_id': str,
-            'nickname': str,
-            'chips': (str, int),
-            'level': (str, int),
-            'exp': (str, int),
-            'total_wins': (str, int),
-            'total_losses': (str, int),
-            'total_draws': (str, int)
-        }
-        
-        # 如果session_id字段存在，也验证它
-        if 'session_id' in self.data:
-            required_fields['session_id'] = str
-        
-        try:
-            for field, types in required_fields.items():
-                if field not in self.data:
-                    logger.error(f"Missing required field: {field}")
-                    return False
-                
-                value = self.data[field]
-                if isinstance(types, tuple):
-                    if not isinstance(value, types):
-                        try:
-                            # 尝试转换为字符串
-                            self.data[field] = str(value)
-                        except:
-                            logger.error(f"Invalid type for field {field}: {type(value)}")
-                            return False
-                else:
-                    if not isinstance(value, types):
-                        logger.error(f"Invalid type for field {field}: {type(value)}")
-                        return False
-            return True
-        except Exception as e:
-            logger.error(f"Data validation error: {e}")
+        """验证玩家数据的完整性（字段类型由加载和 update_data 保证，这里只做检查）"""
+        if not self.user_id:
+            logger.error("Missing required field: user_id")
+            return False
+        if not isinstance(self.nickname, str):
+            logger.error(f"Invalid type for field nickname: {type(self.nickname)}")
             return False
+        for field in INT_FIELDS:
+            value = getattr(self, field)
+            if not isinstance(value, int) or isinstance(value, bool):
+                logger.error(f"Invalid type for field {field}: {type(value)}")
+                return False
+        return True
 
     def _backup_data(self):
         """创建数据文件的备份"""
@@ -309,23 +263,25 @@ class BJPlayer:
         return "\n".join(status)
 
     @classmethod
-    def get_player(cls, user_id: str, player_file: str) -> Optional['BJPlayer']:
-        """从文件中获取玩家数据
+    def get_player(cls, user_id: str, player_file: str = None,
+                   store: PlayerStore = None) -> Optional['BJPlayer']:
+        """从存储后端获取玩家数据
         
         Args:
             user_id: 用户ID或会话ID
-            player_file: 玩家数据文件路径
+            player_file: 玩家数据文件路径，未提供 store 时使用
+            store: 玩家数据存储后端
             
         Returns:
             Optional[BJPlayer]: 玩家实例,如果未找到则返回 None
         """
         try:
-            with open(player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] == str(user_id) or ('session_id' in row and row['session_id'] == str(user_id)):
-                        logger.info(f"找到ID为 {user_id} 的21点玩家数据")
-                        return cls(row)
+            if store is None:
+                store = CSVPlayerStore.for_file(player_file)
+            row = store.get(user_id)
+            if row is not None:
+                logger.info(f"找到ID为 {user_id} 的21点玩家数据")
+                return cls(row, store=store)
             logger.warning(f"未找到ID为 {user_id} 的21点玩家数据")
             return None
         except FileNotFoundError:
@@ -336,23 +292,25 @@ class BJPlayer:
             return None
 
     @classmethod
-    def get_player_by_nickname(cls, nickname: str, player_file: str) -> Optional['BJPlayer']:
+    def get_player_by_nickname(cls, nickname: str, player_file: str = None,
+                               store: PlayerStore = None) -> Optional['BJPlayer']:
         """根据昵称查找玩家
         
         Args:
             nickname: 玩家昵称
-            player_file: 玩家数据文件路径
+            player_file: 玩家数据文件路径，未提供 store 时使用
+            store: 玩家数据存储后端
             
         Returns:
             Optional[BJPlayer]: 玩家实例,如果未找到则返回 None
         """
         try:
-            with open(player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['nickname'] == nickname:
-                        logger.info(f"找到昵称为 {nickname} 的21点玩家数据")
-                        return cls(row)
+            if store is None:
+                store = CSVPlayerStore.for_file(player_file)
+            row = store.get_by_nickname(nickname)
+            if row is not None:
+                logger.info(f"找到昵称为 {nickname} 的21点玩家数据")
+                return cls(row, store=store)
             logger.warning(f"未找到昵称为 {nickname} 的21点玩家数据")
             return None
         except FileNotFoundError:
@@ -0,0 +1,442 @@
+import atexit
+import csv
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from .leaderboard import LeaderboardIndex, _to_int
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerStore:
+    """玩家数据存储后端接口
+
+    所有后端都以「字段名 -> 字符串」的行字典交换数据，与 CSV 的 STANDARD_FIELDS 格式一致。
+    后端在新增、更新、清空数据后调用 _track / _untrack_all，保持排行榜索引同步。
+    """
+
+    _leaderboard: Optional[LeaderboardIndex] = None
+    ledger = None  # 可选的筹码流水账本（ledger.ChipLedger），设置后记录每一次筹码变动
+
+    @property
+    def leaderboard(self) -> LeaderboardIndex:
+        """排行榜索引，首次访问时从全部数据构建，之后增量维护"""
+        if self._leaderboard is None:
+            self._leaderboard = LeaderboardIndex.build(self.rows())
+        return self._leaderboard
+
+    def _track(self, user_id: str, fields: Dict[str, Any]):
+        """把字段变化同步到排行榜索引"""
+        if self._leaderboard is not None:
+            self._leaderboard.update(user_id, fields)
+
+    def _untrack_all(self):
+        """清空排行榜索引"""
+        if self._leaderboard is not None:
+            self._leaderboard.clear()
+
+    def _record_chips(self, rows: Dict[str, Dict[str, str]], batch: Dict[str, Dict[str, int]],
+                      reason: str, round_id: int):
+        """把 adjust_many 中的筹码变动追加到账本（调用方持有锁，保证与余额的顺序一致）"""
+        if self.ledger is None:
+            return
+        for user_id, row in rows.items():
+            delta = batch[user_id].get('chips')
+            if delta:
+                self.ledger.record(row['user_id'], delta, _to_int(row.get('chips')), reason, round_id)
+
+    def _record_opening(self, row: Dict[str, Any]):
+        """把新玩家的初始筹码记入账本"""
+        chips = _to_int(row.get('chips'))
+        if self.ledger is not None and chips:
+            self.ledger.record(str(row['user_id']), chips, chips, 'register')
+
+    def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        """根据用户ID或会话ID获取玩家数据的副本"""
+        raise NotImplementedError
+
+    def get_by_nickname(self, nickname: str) -> Optional[Dict[str, str]]:
+        """根据昵称获取玩家数据的副本"""
+        raise NotImplementedError
+
+    def add(self, row: Dict[str, str]) -> bool:
+        """新增玩家
+
+        Returns:
+            bool: 是否新增成功，user_id 已存在时不修改原有数据并返回 False
+        """
+        raise NotImplementedError
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> bool:
+        """更新玩家的部分字段
+
+        Args:
+            user_id: 用户ID或会话ID（与 get、adjust 相同）
+
+        Returns:
+            bool: 是否找到玩家；玩家不存在时不做修改，记录警告并返回 False
+        """
+        raise NotImplementedError
+
+    def adjust(self, user_id: str, deltas: Dict[str, int], reason: str = 'other',
+               round_id: int = 0) -> Optional[Dict[str, str]]:
+        """原子地增减玩家的整数字段（筹码、战绩等）
+
+        读取、计算和写入在同一把锁内完成，并发的增减不会互相覆盖。
+        任何被减少的字段结果为负数时（例如筹码不足）不做修改。
+
+        Args:
+            user_id: 用户ID或会话ID
+            deltas: 字段名 -> 增量
+            reason: 筹码变动原因，记入账本
+            round_id: 所属牌局ID，记入账本
+
+        Returns:
+            Optional[Dict[str, str]]: 修改后的玩家数据副本，玩家不存在或余额不足时返回 None
+        """
+        rows = self.adjust_many({user_id: deltas}, reason, round_id)
+        return rows.get(user_id) if rows else None
+
+    def adjust_many(self, batch: Dict[str, Dict[str, int]], reason: str = 'other',
+                    round_id: int = 0) -> Optional[Dict[str, Dict[str, str]]]:
+        """在一次批量操作中原子地增减多名玩家的整数字段（例如一局的结算）
+
+        Args:
+            batch: 用户ID或会话ID -> {字段名: 增量}
+            reason: 筹码变动原因，记入账本
+            round_id: 所属牌局ID，记入账本
+
+        Returns:
+            Optional[Dict]: 传入的ID -> 修改后的玩家数据副本（不存在的玩家不包含在内）；
+                任何玩家被减少的字段结果为负数时整批都不修改，返回 None
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """清空全部玩家数据"""
+        raise NotImplementedError
+
+    def flush(self):
+        """把尚未持久化的数据写入存储"""
+
+    def backup(self, backup_dir: str) -> str:
+        """备份当前数据，返回备份文件路径"""
+        raise NotImplementedError
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """遍历所有玩家数据（只读）"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+def open_player_store(config: Dict[str, Any], data_dir: str, standard_fields: List[str]) -> PlayerStore:
+    """根据配置创建玩家数据存储后端
+
+    Args:
+        config: 配置中的 storage 部分，例如 {"backend": "sqlite", "shards": 8}
+        data_dir: 数据目录
+        standard_fields: 玩家数据字段列表
+
+    Returns:
+        PlayerStore: 存储后端实例，默认使用CSV；配置了分片数或已有分片表时使用分片存储
+    """
+    config = config or {}
+    backend = config.get('backend', 'csv').lower()
+    csv_file = os.path.join(data_dir, 'bjplayers.csv')
+
+    if backend in ('csv', 'sqlite'):
+        from .sharded_store import open_sharded_store
+        store = open_sharded_store(data_dir, standard_fields, backend if 'backend' in config else None,
+                                   int(config.get('shards', 0)))
+        if store is not None:
+            return store
+
+    if backend == 'sqlite':
+        from .sqlite_store import SQLitePlayerStore
+        db_file = os.path.join(data_dir, 'bjplayers.db')
+        store = SQLitePlayerStore(db_file, standard_fields)
+        # 首次启用时从原有CSV文件迁移数据
+        if len(store) == 0 and os.path.exists(csv_file):
+            store.migrate_from_csv(csv_file)
+        return store
+
+    if backend == 'mmap':
+        from .mmap_store import MmapPlayerStore
+        store = MmapPlayerStore(os.path.join(data_dir, 'bjplayers.bjp'), standard_fields)
+        # 首次启用时从原有CSV文件导入数据
+        if len(store) == 0 and os.path.exists(csv_file):
+            store.import_csv(csv_file)
+        return store
+
+    if backend != 'csv':
+        logger.warning(f"未知的21点存储后端 {backend}，使用CSV存储")
+    return CSVPlayerStore.for_file(csv_file, standard_fields)
+
+
+class CSVPlayerStore(PlayerStore):
+    """基于CSV文件的玩家数据仓库
+
+    插件运行期间只在首次使用时读取一次玩家文件，之后所有查询都走内存中的
+    user_id / session_id / nickname 字典索引，查找复杂度为 O(1)。
+    同一个文件路径只会对应一个仓库实例，插件运行时由仓库独占该文件。
+
+    更新采用写回（write-behind）策略：update 只修改内存并把玩家标记为脏，
+    由 flush 一次性原子写回文件。调用方可以在每局结束时显式 flush，
+    否则脏数据最迟在 flush_interval 秒后由后台定时器写回，进程退出时也会写回。
+    """
+
+    # 默认的自动写回间隔（秒）
+    DEFAULT_FLUSH_INTERVAL = 5.0
+
+    # 文件路径 -> 仓库实例
+    _instances: Dict[str, 'CSVPlayerStore'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, player_file: str, standard_fields: List[str],
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.player_file = player_file
+        self.standard_fields = list(standard_fields)
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()  # 尚未写回文件的玩家ID
+        self._flush_timer: Optional[threading.Timer] = None
+        self.last_flush = time.time()
+        self._rows: Dict[str, Dict[str, str]] = {}  # user_id -> 行数据（保持文件顺序）
+        self._by_session: Dict[str, str] = {}  # session_id -> user_id
+        self._by_nickname: Dict[str, str] = {}  # nickname -> user_id
+        self.load()
+
+    @classmethod
+    def for_file(cls, player_file: str, standard_fields: Optional[List[str]] = None) -> 'CSVPlayerStore':
+        """获取指定文件对应的仓库实例（不存在则创建）
+
+        Args:
+            player_file: 玩家数据文件路径
+            standard_fields: 字段列表，未提供时使用文件表头
+
+        Returns:
+            CSVPlayerStore: 仓库实例
+        """
+        key = os.path.abspath(player_file)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                if standard_fields is None:
+                    standard_fields = cls._read_header(player_file)
+                store = cls(player_file, standard_fields)
+                cls._instances[key] = store
+                atexit.register(store.flush)
+            return store
+
+    @staticmethod
+    def _read_header(player_file: str) -> List[str]:
+        """读取CSV表头"""
+        try:
+            with open(player_file, 'r', encoding='utf-8', newline='') as f:
+                return next(csv.reader(f), [])
+        except FileNotFoundError:
+            return []
+
+    def load(self):
+        """从文件加载全部玩家数据并重建索引"""
+        with self._lock:
+            self._rows = {}
+            self._by_session = {}
+            self._by_nickname = {}
+
+            if not os.path.exists(self.player_file):
+                self._write_all()
+                return
+
+            with open(self.player_file, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    user_id = row.get('user_id')
+                    # 与逐行扫描的语义保持一致：重复ID时以文件中第一条为准
+                    if not user_id or user_id in self._rows:
+                        continue
+                    self._rows[user_id] = row
+                    self._index(row)
+
+            logger.info(f"已加载 {len(self._rows)} 条21点玩家数据")
+
+    def _index(self, row: Dict[str, str]):
+        """把一行数据加入辅助索引"""
+        user_id = row['user_id']
+        session_id = row.get('session_id')
+        if session_id:
+            self._by_session.setdefault(session_id, user_id)
+        nickname = row.get('nickname')
+        if nickname:
+            self._by_nickname.setdefault(nickname, user_id)
+
+    def _unindex(self, row: Dict[str, str]):
+        """从辅助索引中移除一行数据"""
+        user_id = row['user_id']
+        if self._by_session.get(row.get('session_id')) == user_id:
+            del self._by_session[row['session_id']]
+        if self._by_nickname.get(row.get('nickname')) == user_id:
+            del self._by_nickname[row['nickname']]
+
+    def _find(self, user_id: str) -> Optional[Dict[str, str]]:
+        """根据用户ID或会话ID查找行数据（不复制）"""
+        user_id = str(user_id)
+        row = self._rows.get(user_id)
+        if row is None:
+            real_id = self._by_session.get(user_id)
+            if real_id is not None:
+                row = self._rows.get(real_id)
+        return row
+
+    def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        """根据用户ID或会话ID获取玩家数据的副本"""
+        metrics.inc('storage_reads')
+        row = self._find(user_id)
+        return dict(row) if row is not None else None
+
+    def get_by_nickname(self, nickname: str) -> Optional[Dict[str, str]]:
+        """根据昵称获取玩家数据的副本"""
+        metrics.inc('storage_reads')
+        real_id = self._by_nickname.get(nickname)
+        if real_id is None:
+            return None
+        row = self._rows.get(real_id)
+        return dict(row) if row is not None else None
+
+    def add(self, row: Dict[str, str]) -> bool:
+        """新增玩家并追加写入文件，ID已存在时不做修改并返回 False"""
+        with self._lock:
+            row = {field: row.get(field, '') for field in self.standard_fields}
+            # 文件中已有该玩家的一行，再追加会产生重复行，重新加载时以哪一行为准取决于文件顺序
+            if row['user_id'] in self._rows:
+                return False
+            self._rows[row['user_id']] = row
+            self._index(row)
+            self._track(row['user_id'], row)
+            self._record_opening(row)
+            with open(self.player_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=self.standard_fields)
+                metrics.inc('storage_writes')
+                metrics.inc('storage_bytes_written', writer.writerow(row))
+            return True
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> bool:
+        """更新玩家的部分字段，并标记为待写回"""
+        with self._lock:
+            row = self._find(user_id)
+            if row is None:
+                logger.warning(f"更新的21点玩家不存在: {user_id}")
+                return False
+            user_id = row['user_id']
+            self._unindex(row)
+            row.update({field: str(value) for field, value in updates.items() if field != 'user_id'})
+            self._index(row)
+            self._track(user_id, updates)
+            self._mark_dirty(user_id)
+            metrics.inc('storage_writes')
+            return True
+
+    def adjust_many(self, batch: Dict[str, Dict[str, int]], reason: str = 'other',
+                    round_id: int = 0) -> Optional[Dict[str, Dict[str, str]]]:
+        """在同一把锁内先校验再修改多名玩家的整数字段，并标记为待写回"""
+        with self._lock:
+            pending = []
+            for user_id, deltas in batch.items():
+                row = self._find(user_id)
+                if row is None:
+                    continue
+                updates = {}
+                for field, delta in deltas.items():
+                    value = _to_int(row.get(field)) + delta
+                    if delta < 0 and value < 0:
+                        return None
+                    updates[field] = str(value)
+                pending.append((user_id, row, updates))
+
+            result = {}
+            for user_id, row, updates in pending:
+                row.update(updates)
+                self._track(row['user_id'], updates)
+                self._mark_dirty(row['user_id'])
+                result[user_id] = dict(row)
+            metrics.inc('storage_writes', len(pending))
+            self._record_chips(result, batch, reason, round_id)
+            return result
+
+    def clear(self):
+        """清空全部玩家数据"""
+        with self._lock:
+            self._rows = {}
+            self._by_session = {}
+            self._by_nickname = {}
+            self._dirty.clear()
+            self._untrack_all()
+            if self.ledger is not None:
+                self.ledger.reset()
+            self._write_all()
+
+    def _mark_dirty(self, user_id: str):
+        """标记玩家数据待写回，必要时启动定时写回"""
+        self._dirty.add(user_id)
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    @property
+    def dirty_count(self) -> int:
+        """待写回的玩家数量"""
+        return len(self._dirty)
+
+    def flush(self):
+        """把所有脏数据一次性写回文件"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._write_all()
+            self._dirty.clear()
+
+    def backup(self, backup_dir: str) -> str:
+        """把当前数据写回后复制一份备份"""
+        self.flush()
+        backup_file = os.path.join(backup_dir, f"bjplayers_backup_{int(time.time())}.csv")
+        shutil.copyfile(self.player_file, backup_file)
+        return backup_file
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """遍历所有玩家数据（只读）"""
+        return iter(list(self._rows.values()))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _write_all(self):
+        """把内存中的全部数据原子地写回文件
+
+        先写入临时文件并落盘，再用 os.replace 替换原文件，
+        写入过程中崩溃也不会留下半截的玩家文件。
+        """
+        tmp_file = self.player_file + '.tmp'
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.standard_fields, quoting=csv.QUOTE_ALL,
+                                    extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self._rows.values())
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_file, self.player_file)
+        self.last_flush = time.time()
+        # 写回会重写整个文件，按文件大小计入写入字节数
+        metrics.inc('storage_flushes')
+        metrics.inc('storage_bytes_written', size)
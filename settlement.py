@@ -0,0 +1,43 @@
+from collections import Counter
+from typing import Dict
+
+from .blackjack_game import BJGame
+
+# 每手牌的结算结果 -> 计入的战绩字段
+RESULT_FIELDS = {
+    'win': 'total_wins',
+    'blackjack': 'total_wins',
+    'lose': 'total_losses',
+    'push': 'total_draws',
+}
+
+
+def settle_round(game: BJGame) -> Dict[str, Dict[str, int]]:
+    """一次遍历计算整局的结算增量
+
+    胜负和赔付完全以 BJGame._determine_winners 的结果为准（庄家尚未行动时先完成庄家回合）。
+    下注在下注、加倍、分牌时已经从筹码中扣除，结算时返还「本金 + 输赢」；
+    每手牌计一次胜/负/平，首两张牌21点的手牌计一次BlackJack。
+
+    Args:
+        game: 玩家已全部行动完毕的牌局
+
+    Returns:
+        Dict: 玩家ID -> {字段: 增量}，只包含非零的字段，可直接交给 PlayerStore.adjust_many
+    """
+    if game.game_status != "finished":
+        game._dealer_turn()
+
+    deltas = {}
+    for player_id, hand_results in game.results.items():
+        player_deltas = Counter()
+        hands = game.player_hands[player_id]
+        bets = game.player_bets[player_id]
+        for result in hand_results:
+            hand_idx = result['hand_idx']
+            player_deltas['chips'] += bets[hand_idx] + result['win_amount']
+            player_deltas[RESULT_FIELDS[result['result']]] += 1
+            if hands[hand_idx].is_blackjack:
+                player_deltas['blackjack_count'] += 1
+        deltas[player_id] = {field: value for field, value in player_deltas.items() if value}
+    return deltas
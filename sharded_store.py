@@ -0,0 +1,485 @@
+"""按 user_id 哈希分片的玩家数据存储
+
+玩家数据分散在 data/bjplayers/ 下的 N 个分片文件（CSV 或 SQLite）中，玩家所在的分片为
+crc32(user_id) % N。分片表 shards.json 记录后端、分片文件列表和代数，重新分片时先写入
+新一代的分片文件，再原子地替换分片表，最后删除旧文件，中途中断不会丢失数据。
+
+也可以作为重新分片工具运行（在机器人根目录下执行，先停止机器人）:
+
+    python -m plugins.BlackJack.sharded_store plugins/BlackJack/data --shards 8 [--backend sqlite]
+
+分片表不存在时从 data/bjplayers.csv（或 --source 指定的 .csv / .db 文件）迁移数据。
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .leaderboard import _to_int
+from .player_store import CSVPlayerStore, PlayerStore
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIR = 'bjplayers'
+SHARD_MAP = 'shards.json'
+SHARD_MAP_VERSION = 1
+# 后端 -> 分片文件扩展名
+BACKENDS = {'csv': '.csv', 'sqlite': '.db'}
+
+
+def shard_of(user_id: str, num_shards: int) -> int:
+    """玩家所在的分片序号"""
+    return zlib.crc32(str(user_id).encode('utf-8')) % num_shards
+
+
+def read_shard_map(shard_dir: str) -> Optional[Dict[str, Any]]:
+    """读取分片表，不存在时返回 None"""
+    path = os.path.join(shard_dir, SHARD_MAP)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_shard_map(shard_dir: str, shard_map: Dict[str, Any]):
+    """原子地写入分片表"""
+    path = os.path.join(shard_dir, SHARD_MAP)
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(shard_map, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def _remove_file(path: str):
+    """删除数据文件，SQLite 的 WAL 文件一并删除"""
+    for suffix in ('', '-wal', '-shm'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + suffix)
+
+
+def read_player_rows(player_file: str) -> List[Dict[str, str]]:
+    """读取单文件的玩家数据（.csv 或 .db），重复ID时保留第一条"""
+    if player_file.endswith('.db'):
+        with contextlib.closing(sqlite3.connect(player_file)) as conn:
+            conn.row_factory = sqlite3.Row
+            records = conn.execute("SELECT * FROM players ORDER BY rowid").fetchall()
+        return [{key: str(record[key]) for key in record.keys()} for record in records]
+
+    rows: Dict[str, Dict[str, str]] = {}
+    with open(player_file, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            user_id = row.get('user_id')
+            if user_id and user_id not in rows:
+                rows[user_id] = row
+    return list(rows.values())
+
+
+def _write_shards(shard_dir: str, standard_fields: List[str], backend: str, generation: int,
+                  num_shards: int, rows: Iterable[Dict[str, str]]) -> List[str]:
+    """把玩家数据按分片写入新一代的分片文件，返回分片文件名列表"""
+    parts: List[List[Dict[str, str]]] = [[] for _ in range(num_shards)]
+    for row in rows:
+        parts[shard_of(row['user_id'], num_shards)].append(row)
+
+    names = [f"g{generation}-{idx:03d}{BACKENDS[backend]}" for idx in range(num_shards)]
+    for name, part in zip(names, parts):
+        path = os.path.join(shard_dir, name)
+        # 上次中断的重新分片可能留下同名文件
+        _remove_file(path)
+        if backend == 'sqlite':
+            from .sqlite_store import SQLitePlayerStore
+            store = SQLitePlayerStore(path, standard_fields)
+            try:
+                store.import_rows(part)
+            finally:
+                store.close()
+            continue
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=standard_fields, quoting=csv.QUOTE_ALL,
+                                    extrasaction='ignore', restval='')
+            writer.writeheader()
+            writer.writerows(part)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    return names
+
+
+# 分片布局：(分片存储列表, 会话ID -> 分片序号)
+Layout = Tuple[List[PlayerStore], Dict[str, int]]
+
+
+class ShardedPlayerStore(PlayerStore):
+    """按 user_id 哈希分片的玩家数据存储
+
+    每个分片是一个独立的 CSVPlayerStore 或 SQLitePlayerStore，有自己的锁和写回定时器。
+    不同分片的玩家互不争用：CSV 后端写回时只重写有脏数据的分片，多个分片并行写回。
+
+    会话ID与 user_id 不同的玩家额外记录「会话ID -> 分片」的索引，按会话ID查找时不需要逐个分片查询；
+    按昵称查找则依次查询各分片。
+
+    涉及多个分片的 adjust_many 按分片序号依次加锁，校验全部通过后才修改，保持整批原子。
+    重新分片时持有全部分片的锁，切换后等待中的操作会在新的分片上重试。
+    """
+
+    MAX_FLUSH_WORKERS = 8
+
+    def __init__(self, shard_dir: str, standard_fields: List[str]):
+        self.shard_dir = shard_dir
+        self.standard_fields = list(standard_fields)
+        shard_map = read_shard_map(shard_dir)
+        if shard_map is None:
+            raise FileNotFoundError(f"分片表 {os.path.join(shard_dir, SHARD_MAP)} 不存在")
+        if shard_map.get('backend') not in BACKENDS or shard_map.get('hash') != 'crc32':
+            raise ValueError(f"无法识别的分片表: {shard_map}")
+        self._shard_map = shard_map
+        self._ledger = None
+        shards = self._open_shards(shard_map)
+        self._layout: Layout = (shards, self._index_sessions(shards))
+
+    @classmethod
+    def create(cls, shard_dir: str, standard_fields: List[str], num_shards: int, backend: str = 'csv',
+               rows: Iterable[Dict[str, str]] = ()) -> 'ShardedPlayerStore':
+        """新建分片存储并写入初始数据
+
+        Args:
+            shard_dir: 分片目录
+            standard_fields: 玩家数据字段列表
+            num_shards: 分片数
+            backend: 分片文件的后端，csv 或 sqlite
+            rows: 初始玩家数据，例如从单文件存储迁移的数据
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的21点存储后端 {backend}")
+        os.makedirs(shard_dir, exist_ok=True)
+        files = _write_shards(shard_dir, standard_fields, backend, 1, num_shards, rows)
+        _write_shard_map(shard_dir, {
+            'version': SHARD_MAP_VERSION, 'hash': 'crc32', 'backend': backend,
+            'generation': 1, 'files': files,
+        })
+        return cls(shard_dir, standard_fields)
+
+    def _open_shards(self, shard_map: Dict[str, Any]) -> List[PlayerStore]:
+        paths = [os.path.join(self.shard_dir, name) for name in shard_map['files']]
+        if shard_map['backend'] == 'sqlite':
+            from .sqlite_store import SQLitePlayerStore
+            shards = [SQLitePlayerStore(path, self.standard_fields) for path in paths]
+        else:
+            shards = [CSVPlayerStore.for_file(path, self.standard_fields) for path in paths]
+        for shard in shards:
+            shard.ledger = self._ledger
+        return shards
+
+    @staticmethod
+    def _index_sessions(shards: List[PlayerStore]) -> Dict[str, int]:
+        sessions: Dict[str, int] = {}
+        for idx, shard in enumerate(shards):
+            for row in shard.rows():
+                session_id = row.get('session_id')
+                if session_id and session_id != row['user_id']:
+                    sessions.setdefault(session_id, idx)
+        return sessions
+
+    @staticmethod
+    def _locate(user_id: str, layout: Layout) -> int:
+        shards, sessions = layout
+        idx = sessions.get(user_id)
+        return idx if idx is not None else shard_of(user_id, len(shards))
+
+    @contextlib.contextmanager
+    def _locked(self, user_ids: Optional[Iterable[str]] = None) -> Iterator[Layout]:
+        """按分片序号依次锁住这些玩家所在的分片（不指定时锁住全部分片），期间分片布局不会变化"""
+        user_ids = None if user_ids is None else [str(user_id) for user_id in user_ids]
+        while True:
+            layout = self._layout
+            shards = layout[0]
+            if user_ids is None:
+                indexes = range(len(shards))
+            else:
+                indexes = sorted({self._locate(user_id, layout) for user_id in user_ids})
+            with contextlib.ExitStack() as stack:
+                for idx in indexes:
+                    stack.enter_context(shards[idx]._lock)
+                # 等锁期间发生了重新分片，按新的布局重试
+                if self._layout is layout:
+                    yield layout
+                    return
+
+    @property
+    def ledger(self):
+        return self._ledger
+
+    @ledger.setter
+    def ledger(self, ledger):
+        """账本挂到每个分片上，由分片在持锁时记录筹码变动"""
+        self._ledger = ledger
+        for shard in self._layout[0]:
+            shard.ledger = ledger
+
+    @property
+    def num_shards(self) -> int:
+        """分片数"""
+        return len(self._layout[0])
+
+    @property
+    def backend(self) -> str:
+        """分片文件的后端"""
+        return self._shard_map['backend']
+
+    @property
+    def dirty_count(self) -> int:
+        """各分片待写回的玩家数量之和"""
+        return sum(getattr(shard, 'dirty_count', 0) for shard in self._layout[0])
+
+    def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        """根据用户ID或会话ID获取玩家数据的副本"""
+        user_id = str(user_id)
+        layout = self._layout
+        return layout[0][self._locate(user_id, layout)].get(user_id)
+
+    def get_by_nickname(self, nickname: str) -> Optional[Dict[str, str]]:
+        """根据昵称获取玩家数据的副本（依次查询各分片）"""
+        for shard in self._layout[0]:
+            row = shard.get_by_nickname(nickname)
+            if row is not None:
+                return row
+        return None
+
+    def add(self, row: Dict[str, str]) -> bool:
+        """新增玩家，写入其所在的分片，ID已存在时返回 False"""
+        user_id = str(row['user_id'])
+        with self._locked([user_id]) as (shards, sessions):
+            idx = shard_of(user_id, len(shards))
+            if not shards[idx].add(row):
+                return False
+            session_id = row.get('session_id')
+            if session_id and session_id != user_id:
+                sessions.setdefault(session_id, idx)
+            self._track(user_id, row)
+            return True
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> bool:
+        """更新玩家的部分字段"""
+        user_id = str(user_id)
+        with self._locked([user_id]) as layout:
+            shards, sessions = layout
+            idx = self._locate(user_id, layout)
+            row = shards[idx].get(user_id)
+            if row is None:
+                logger.warning(f"更新的21点玩家不存在: {user_id}")
+                return False
+            user_id = row['user_id']
+            shards[idx].update(user_id, updates)
+            session_id = updates.get('session_id')
+            if session_id and session_id != user_id:
+                sessions[str(session_id)] = idx
+            self._track(user_id, updates)
+            return True
+
+    def adjust_many(self, batch: Dict[str, Dict[str, int]], reason: str = 'other',
+                    round_id: int = 0) -> Optional[Dict[str, Dict[str, str]]]:
+        """增减多名玩家的整数字段，涉及多个分片时先在持锁的情况下校验全部玩家"""
+        with self._locked(batch) as layout:
+            shards = layout[0]
+            parts: Dict[int, Dict[str, Dict[str, int]]] = {}
+            for user_id, deltas in batch.items():
+                parts.setdefault(self._locate(str(user_id), layout), {})[user_id] = deltas
+
+            if len(parts) > 1:
+                for idx, part in parts.items():
+                    for user_id, deltas in part.items():
+                        row = shards[idx].get(str(user_id))
+                        if row is None:
+                            continue
+                        for field, delta in deltas.items():
+                            if delta < 0 and _to_int(row.get(field)) + delta < 0:
+                                return None
+
+            result = {}
+            for idx, part in parts.items():
+                rows = shards[idx].adjust_many(part, reason, round_id)
+                if rows is None:
+                    return None
+                result.update(rows)
+            for user_id, row in result.items():
+                self._track(row['user_id'], {field: row[field] for field in batch[user_id]})
+            return result
+
+    def clear(self):
+        """清空全部分片"""
+        with self._locked() as (shards, sessions):
+            for shard in shards:
+                # 账本只记录一次清空
+                shard.ledger = None
+                shard.clear()
+                shard.ledger = self._ledger
+            sessions.clear()
+            self._untrack_all()
+            if self._ledger is not None:
+                self._ledger.reset()
+
+    def flush(self):
+        """并行写回所有有脏数据的分片"""
+        dirty = [shard for shard in self._layout[0] if getattr(shard, 'dirty_count', 0)]
+        if len(dirty) == 1:
+            dirty[0].flush()
+        elif dirty:
+            with ThreadPoolExecutor(max_workers=min(len(dirty), self.MAX_FLUSH_WORKERS),
+                                    thread_name_prefix="BlackJack-flush") as pool:
+                for future in [pool.submit(shard.flush) for shard in dirty]:
+                    future.result()
+
+    def backup(self, backup_dir: str) -> str:
+        """把全部分片和分片表备份到一个目录，返回该目录"""
+        target = os.path.join(backup_dir, f"bjplayers_backup_{int(time.time())}")
+        os.makedirs(target, exist_ok=True)
+        with self._locked() as (shards, _):
+            for name, shard in zip(self._shard_map['files'], shards):
+                os.replace(shard.backup(target), os.path.join(target, name))
+            shutil.copyfile(os.path.join(self.shard_dir, SHARD_MAP), os.path.join(target, SHARD_MAP))
+        return target
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """依次遍历各分片的玩家数据（只读）"""
+        return itertools.chain.from_iterable(shard.rows() for shard in self._layout[0])
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._layout[0])
+
+    def reshard(self, num_shards: int, backend: Optional[str] = None):
+        """在线重新分片
+
+        持有全部分片的锁，写回脏数据后把所有玩家写入新一代的分片文件，再切换分片表，
+        期间其他玩家操作等待，完成后在新的分片上继续。
+
+        Args:
+            num_shards: 新的分片数
+            backend: 新的分片后端，不指定时保持不变
+        """
+        backend = backend or self.backend
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的21点存储后端 {backend}")
+        if num_shards < 1:
+            raise ValueError("分片数至少为1")
+        start = time.perf_counter()
+        with self._locked() as (shards, _):
+            for shard in shards:
+                shard.flush()
+            rows = list(itertools.chain.from_iterable(shard.rows() for shard in shards))
+            old_map = self._shard_map
+            shard_map = {
+                'version': SHARD_MAP_VERSION, 'hash': 'crc32', 'backend': backend,
+                'generation': old_map['generation'] + 1,
+                'files': _write_shards(self.shard_dir, self.standard_fields, backend,
+                                       old_map['generation'] + 1, num_shards, rows),
+            }
+            _write_shard_map(self.shard_dir, shard_map)
+            self._shard_map = shard_map
+            new_shards = self._open_shards(shard_map)
+            self._layout = (new_shards, self._index_sessions(new_shards))
+            self._release(shards, old_map['files'])
+        logger.info(f"21点玩家数据已重新分片: {len(shards)} -> {num_shards} 个{backend}分片，"
+                    f"{len(rows)} 名玩家，耗时 {time.perf_counter() - start:.2f} 秒")
+
+    def _release(self, shards: List[PlayerStore], files: List[str]):
+        """关闭并删除旧一代的分片（调用方持有这些分片的锁）"""
+        for name, shard in zip(files, shards):
+            path = os.path.join(self.shard_dir, name)
+            if isinstance(shard, CSVPlayerStore):
+                with CSVPlayerStore._instances_lock:
+                    CSVPlayerStore._instances.pop(os.path.abspath(path), None)
+            else:
+                shard.close()
+            _remove_file(path)
+
+
+def open_sharded_store(data_dir: str, standard_fields: List[str], backend: Optional[str] = None,
+                       num_shards: int = 0) -> Optional[ShardedPlayerStore]:
+    """按配置打开分片存储
+
+    没有分片表时，配置的分片数大于1则从单文件存储迁移数据，否则返回 None（继续使用单文件存储）。
+    已有分片表时，配置的分片数或后端与分片表不一致则在启动时重新分片。
+
+    Args:
+        data_dir: 数据目录
+        standard_fields: 玩家数据字段列表
+        backend: 配置的存储后端，未配置时为 None
+        num_shards: 配置的分片数，未配置时为 0
+    """
+    shard_dir = os.path.join(data_dir, SHARD_DIR)
+    if read_shard_map(shard_dir) is None:
+        if num_shards <= 1:
+            return None
+        backend = backend or 'csv'
+        source = os.path.join(data_dir, 'bjplayers.db' if backend == 'sqlite' else 'bjplayers.csv')
+        if not os.path.exists(source):
+            source = os.path.join(data_dir, 'bjplayers.csv')
+        rows = read_player_rows(source) if os.path.exists(source) else []
+        store = ShardedPlayerStore.create(shard_dir, standard_fields, num_shards, backend, rows)
+        logger.info(f"已把 {source} 中的 {len(rows)} 条21点玩家数据迁移到 {num_shards} 个分片")
+        return store
+
+    store = ShardedPlayerStore(shard_dir, standard_fields)
+    if (num_shards and num_shards != store.num_shards) or (backend and backend != store.backend):
+        store.reshard(num_shards or store.num_shards, backend)
+    return store
+
+
+def _read_fields(player_file: str) -> List[str]:
+    """读取玩家数据文件的字段列表"""
+    if player_file.endswith('.db'):
+        with contextlib.closing(sqlite3.connect(player_file)) as conn:
+            return [column[1] for column in conn.execute("PRAGMA table_info(players)")]
+    return CSVPlayerStore._read_header(player_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把玩家数据按 user_id 重新分片，或把单文件玩家数据迁移为分片存储")
+    parser.add_argument('data_dir', help="插件的 data 目录")
+    parser.add_argument('--shards', type=int, required=True, help="分片数")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), help="分片文件的后端，默认保持不变（迁移时为csv）")
+    parser.add_argument('--source', help="没有分片表时迁移的单文件玩家数据，默认 data/bjplayers.csv")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("分片数至少为1")
+
+    shard_dir = os.path.join(args.data_dir, SHARD_DIR)
+    shard_map = read_shard_map(shard_dir)
+    if shard_map is None:
+        source = args.source or os.path.join(args.data_dir, 'bjplayers.csv')
+        if not os.path.exists(source):
+            print(f"玩家数据文件 {source} 不存在")
+            return 1
+        rows = read_player_rows(source)
+        store = ShardedPlayerStore.create(shard_dir, _read_fields(source), args.shards,
+                                          args.backend or 'csv', rows)
+        print(f"已把 {source} 中的 {len(rows)} 名玩家迁移到 {store.num_shards} 个{store.backend}分片")
+    else:
+        fields = _read_fields(os.path.join(shard_dir, shard_map['files'][0]))
+        store = ShardedPlayerStore(shard_dir, fields)
+        old_shards, old_backend = store.num_shards, store.backend
+        store.reshard(args.shards, args.backend)
+        print(f"已重新分片: {old_shards} 个{old_backend}分片 -> {store.num_shards} 个{store.backend}分片，"
+              f"共 {len(store)} 名玩家")
+
+    sizes = [len(shard) for shard in store._layout[0]]
+    print(f"每个分片的玩家数: 最少 {min(sizes)}，最多 {max(sizes)}")
+    print(f"在配置中设置 \"storage\": {{\"backend\": \"{store.backend}\", \"shards\": {store.num_shards}}} 后启动机器人")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""21点蒙特卡洛模拟器
+
+不经过聊天层，直接用 BJGame 的规则（_dealer_turn、_determine_winners、split、double_down）
+跑大量牌局，统计庄家优势、方差以及各操作的期望收益，用于调整赔率、庄家停牌点等规则。
+多进程并行运行，每个进程使用由总种子派生的固定种子，结果可复现。
+"""
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .blackjack_game import BJGame, Card, Deck, Hand
+
+# 玩家策略：(当前手牌, 庄家明牌, 能否加倍, 能否分牌) -> "hit" / "stand" / "double" / "split"
+Strategy = Callable[[Hand, Card, bool, bool], str]
+
+ACTIONS = ("hit", "stand", "double", "split")
+
+# 默认规则，与 BJGame 的默认值保持一致
+DEFAULT_RULES = {
+    "num_decks": 6,
+    "penetration": Deck.DEFAULT_PENETRATION,
+    "blackjack_payout": BJGame.BLACKJACK_PAYOUT,
+    "dealer_stand_value": BJGame.DEALER_STAND_VALUE,
+}
+
+
+def dealer_mimic_strategy(hand: Hand, dealer_up: Card, can_double: bool, can_split: bool) -> str:
+    """模仿庄家：不到17点就要牌"""
+    return "hit" if hand.value < 17 else "stand"
+
+
+def basic_strategy(hand: Hand, dealer_up: Card, can_double: bool, can_split: bool) -> str:
+    """多副牌、庄家软17停牌的常用基本策略"""
+    up = dealer_up.value  # 2-11，A为11
+    value = hand.value
+
+    if can_split:
+        pair = hand[0].value
+        if pair == 11 or pair == 8:
+            return "split"
+        if pair == 9 and up not in (7, 10, 11):
+            return "split"
+        if pair in (2, 3, 7) and up <= 7:
+            return "split"
+        if pair == 6 and up <= 6:
+            return "split"
+        if pair == 4 and up in (5, 6):
+            return "split"
+
+    if hand.is_soft:
+        if value >= 19:
+            return "stand"
+        if value == 18:
+            if can_double and 3 <= up <= 6:
+                return "double"
+            return "stand" if up <= 8 else "hit"
+        if can_double and ((value == 17 and 3 <= up <= 6) or
+                           (value in (15, 16) and 4 <= up <= 6) or
+                           (value in (13, 14) and 5 <= up <= 6)):
+            return "double"
+        return "hit"
+
+    if value >= 17:
+        return "stand"
+    if value >= 13:
+        return "stand" if up <= 6 else "hit"
+    if value == 12:
+        return "stand" if 4 <= up <= 6 else "hit"
+    if can_double and ((value == 11 and up <= 10) or
+                       (value == 10 and up <= 9) or
+                       (value == 9 and 3 <= up <= 6)):
+        return "double"
+    return "hit"
+
+
+class SimulationStats:
+    """模拟统计结果，可在进程间合并"""
+
+    def __init__(self):
+        self.rounds = 0
+        self.hands = 0  # 初始手牌数（每名玩家每局一手）
+        self.total_bet = 0  # 初始下注总额
+        self.net = 0.0  # 玩家净收益
+        self.net_sq = 0.0  # 每手初始牌净收益的平方和
+        self.action_count = {action: 0 for action in ACTIONS}
+        self.action_net = {action: 0.0 for action in ACTIONS}
+
+    def merge(self, other: 'SimulationStats'):
+        """合并另一份统计"""
+        self.rounds += other.rounds
+        self.hands += other.hands
+        self.total_bet += other.total_bet
+        self.net += other.net
+        self.net_sq += other.net_sq
+        for action in ACTIONS:
+            self.action_count[action] += other.action_count[action]
+            self.action_net[action] += other.action_net[action]
+
+    @property
+    def house_edge(self) -> float:
+        """庄家优势（占初始下注的比例）"""
+        return -self.net / self.total_bet if self.total_bet else 0.0
+
+    @property
+    def variance(self) -> float:
+        """每手初始牌净收益的方差（以初始下注为单位）"""
+        if not self.hands:
+            return 0.0
+        mean = self.net / self.hands
+        return self.net_sq / self.hands - mean * mean
+
+    def action_ev(self) -> Dict[str, float]:
+        """按首个操作分组的每手期望收益"""
+        return {
+            action: self.action_net[action] / self.action_count[action]
+            for action in ACTIONS if self.action_count[action]
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为便于输出的字典"""
+        stderr = math.sqrt(self.variance / self.hands) if self.hands else 0.0
+        return {
+            "rounds": self.rounds,
+            "hands": self.hands,
+            "house_edge": self.house_edge,
+            "house_edge_stderr": stderr,
+            "variance": self.variance,
+            "action_ev": self.action_ev(),
+            "action_share": {
+                action: count / self.hands for action, count in self.action_count.items() if self.hands
+            },
+        }
+
+
+def new_game(rules: Dict[str, Any], rng: random.Random) -> BJGame:
+    """按规则创建一个无界面的牌局"""
+    game = BJGame(Deck(rules["num_decks"], rules["penetration"], rng=rng))
+    game.BLACKJACK_PAYOUT = rules["blackjack_payout"]
+    game.DEALER_STAND_VALUE = rules["dealer_stand_value"]
+    return game
+
+
+def play_round(game: BJGame, strategy: Strategy, player_ids: List[str], bet: int,
+               stats: SimulationStats):
+    """完整地进行一局，并把结果计入统计"""
+    game.start_new_game(player_ids)
+    for player_id in player_ids:
+        game.place_bet(player_id, bet)
+    game.deal_initial_cards()
+
+    dealer_up = game.dealer_hand[0]
+    # 每名玩家的首个操作，分牌后的所有手牌都记在首个操作下
+    first_action: Dict[str, str] = {}
+
+    while game.game_status == "playing":
+        player_id = game.get_current_player()
+        hand_idx = game.current_hand_idx[player_id]
+        if game.player_statuses[player_id][hand_idx] == "waiting":
+            hand = game.player_hands[player_id][hand_idx]
+            can_split = game.can_split(player_id)
+            action = strategy(hand, dealer_up, len(hand) == 2, can_split)
+            first_action.setdefault(player_id, action)
+
+            if action == "split" and can_split:
+                game.split(player_id)
+                continue
+            if action == "double" and len(hand) == 2:
+                game.double_down(player_id)
+            elif action == "hit":
+                game.hit(player_id)
+            else:
+                game.stand(player_id)
+
+        if game.player_statuses[player_id][hand_idx] != "waiting":
+            game._advance_to_next_player()
+
+    stats.rounds += 1
+    for player_id, hand_results in game.results.items():
+        net = sum(result["win_amount"] for result in hand_results) / bet
+        action = first_action.get(player_id, "stand")
+        stats.hands += 1
+        stats.total_bet += 1
+        stats.net += net
+        stats.net_sq += net * net
+        stats.action_count[action] += 1
+        stats.action_net[action] += net
+
+
+def _simulate_chunk(args) -> SimulationStats:
+    """进程池中执行的单个任务"""
+    rounds, seed, strategy, rules, num_players, bet = args
+    rng = random.Random(seed)
+    game = new_game(rules, rng)
+    player_ids = [f"sim{i}" for i in range(num_players)]
+    stats = SimulationStats()
+    for _ in range(rounds):
+        play_round(game, strategy, player_ids, bet, stats)
+    return stats
+
+
+def run_simulation(rounds: int, strategy: Strategy = basic_strategy, seed: int = 0,
+                   workers: Optional[int] = None, num_players: int = 1,
+                   rules: Optional[Dict[str, Any]] = None, bet: int = 100) -> SimulationStats:
+    """运行蒙特卡洛模拟
+
+    Args:
+        rounds: 总局数
+        strategy: 玩家策略，必须是模块级函数以便传给子进程
+        seed: 总种子，第 i 个任务使用 seed * 1000003 + i
+        workers: 进程数，默认使用全部CPU核心；为1时在当前进程运行
+        num_players: 每局的玩家数
+        rules: 覆盖 DEFAULT_RULES 中的规则
+        bet: 每手初始下注，用于复现 int() 取整后的BlackJack赔付
+
+    Returns:
+        SimulationStats: 合并后的统计结果
+    """
+    merged_rules = dict(DEFAULT_RULES)
+    merged_rules.update(rules or {})
+    workers = workers or os.cpu_count() or 1
+
+    # 任务数多于进程数，便于负载均衡；任务划分只取决于局数和进程数，结果可复现
+    chunks = workers * 4 if workers > 1 else 1
+    base, extra = divmod(rounds, chunks)
+    tasks = [
+        (base + (1 if i < extra else 0), seed * 1000003 + i, strategy, merged_rules, num_players, bet)
+        for i in range(chunks)
+    ]
+    tasks = [task for task in tasks if task[0] > 0]
+
+    total = SimulationStats()
+    if workers == 1:
+        for task in tasks:
+            total.merge(_simulate_chunk(task))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for stats in executor.map(_simulate_chunk, tasks):
+            total.merge(stats)
+    return total
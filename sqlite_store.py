@@ -0,0 +1,276 @@
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .metrics import metrics
+from .player_store import PlayerStore
+
+logger = logging.getLogger(__name__)
+
+# 以整数存储的字段，便于排序和原子增减
+INTEGER_FIELDS = {
+    'chips', 'level', 'exp', 'total_wins', 'total_losses', 'total_draws',
+    'blackjack_count', 'current_bet'
+}
+
+
+def _value_bytes(values: List[Any]) -> int:
+    """估算写入的字段值字节数（单行 UPDATE 只写变更的字段）"""
+    return sum(len(str(value).encode('utf-8')) for value in values)
+
+
+class SQLitePlayerStore(PlayerStore):
+    """基于SQLite的玩家数据存储
+
+    使用WAL日志模式，读写互不阻塞；user_id 为主键，session_id 和 nickname 建有索引。
+    每次更新只执行一条单行 UPDATE 语句，不再重写整个数据文件。
+    """
+
+    def __init__(self, db_file: str, standard_fields: List[str]):
+        self.db_file = db_file
+        self.standard_fields = list(standard_fields)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        columns = ", ".join(self.standard_fields)
+        placeholders = ", ".join("?" for _ in self.standard_fields)
+        # 预先拼好的语句，sqlite3 会缓存其编译结果
+        self._sql_insert = f"INSERT INTO players ({columns}) VALUES ({placeholders})"
+        self._sql_by_id = f"SELECT {columns} FROM players WHERE user_id = ?"
+        self._sql_by_session = f"SELECT {columns} FROM players WHERE session_id = ? LIMIT 1"
+        self._sql_by_nickname = f"SELECT {columns} FROM players WHERE nickname = ? LIMIT 1"
+        self._sql_all = f"SELECT {columns} FROM players ORDER BY rowid"
+
+    def _create_schema(self):
+        """创建数据表和索引"""
+        column_defs = []
+        for field in self.standard_fields:
+            if field == 'user_id':
+                column_defs.append("user_id TEXT PRIMARY KEY")
+            elif field in INTEGER_FIELDS:
+                column_defs.append(f"{field} INTEGER NOT NULL DEFAULT 0")
+            else:
+                column_defs.append(f"{field} TEXT NOT NULL DEFAULT ''")
+        with self._lock:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS players ({', '.join(column_defs)})")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_session ON players (session_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_nickname ON players (nickname)")
+
+    def _to_db(self, field: str, value: Any):
+        """把行字典中的字符串值转换为数据库值"""
+        if field in INTEGER_FIELDS:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                try:
+                    return int(float(value))
+                except (TypeError, ValueError):
+                    return 0
+        return '' if value is None else str(value)
+
+    @staticmethod
+    def _to_row(record: sqlite3.Row) -> Dict[str, str]:
+        """把数据库记录转换为字符串行字典"""
+        return {key: str(record[key]) for key in record.keys()}
+
+    def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        """根据用户ID或会话ID获取玩家数据"""
+        user_id = str(user_id)
+        metrics.inc('storage_reads')
+        with self._lock:
+            record = self._conn.execute(self._sql_by_id, (user_id,)).fetchone()
+            if record is None:
+                record = self._conn.execute(self._sql_by_session, (user_id,)).fetchone()
+        return self._to_row(record) if record is not None else None
+
+    def get_by_nickname(self, nickname: str) -> Optional[Dict[str, str]]:
+        """根据昵称获取玩家数据"""
+        metrics.inc('storage_reads')
+        with self._lock:
+            record = self._conn.execute(self._sql_by_nickname, (nickname,)).fetchone()
+        return self._to_row(record) if record is not None else None
+
+    def add(self, row: Dict[str, str]) -> bool:
+        """新增玩家，ID已存在时不做修改并返回 False"""
+        values = [self._to_db(field, row.get(field, '')) for field in self.standard_fields]
+        with self._lock:
+            try:
+                self._conn.execute(self._sql_insert, values)
+            except sqlite3.IntegrityError:
+                return False
+            self._track(str(row['user_id']), row)
+            self._record_opening(row)
+        metrics.inc('storage_writes')
+        metrics.inc('storage_bytes_written', _value_bytes(values))
+        return True
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> bool:
+        """以单行 UPDATE 更新玩家的部分字段，按用户ID找不到时再按会话ID查找"""
+        user_id = str(user_id)
+        fields = [field for field in updates if field in self.standard_fields and field != 'user_id']
+        values = [self._to_db(field, updates[field]) for field in fields]
+        sql = f"UPDATE players SET {', '.join(f'{field} = ?' for field in fields)} WHERE user_id = ?"
+        with self._lock:
+            # 先按用户ID直接更新，没有命中时可能传入的是会话ID
+            if not (fields and self._conn.execute(sql, values + [user_id]).rowcount):
+                record = self._conn.execute(self._sql_by_id, (user_id,)).fetchone()
+                if record is None:
+                    record = self._conn.execute(self._sql_by_session, (user_id,)).fetchone()
+                    if record is None:
+                        logger.warning(f"更新的21点玩家不存在: {user_id}")
+                        return False
+                user_id = record['user_id']
+                if fields:
+                    self._conn.execute(sql, values + [user_id])
+            self._track(user_id, updates)
+        if fields:
+            metrics.inc('storage_writes')
+            metrics.inc('storage_bytes_written', _value_bytes(values))
+        return True
+
+    def _apply_deltas(self, user_id: str, deltas: Dict[str, int]):
+        """用一条带条件的 UPDATE 增减玩家的整数字段（调用方持有锁）
+
+        Returns:
+            修改后的行字典；玩家不存在时返回 None，被减少的字段不足时返回 False
+        """
+        fields = [field for field in deltas if field in INTEGER_FIELDS]
+        if len(fields) != len(deltas):
+            raise ValueError(f"只能增减整数字段: {sorted(set(deltas) - INTEGER_FIELDS)}")
+        record = self._conn.execute(self._sql_by_id, (user_id,)).fetchone()
+        if record is None:
+            record = self._conn.execute(self._sql_by_session, (user_id,)).fetchone()
+            if record is None:
+                return None
+        user_id = record['user_id']
+        if not fields:
+            return self._to_row(record)
+
+        assignments = ", ".join(f"{field} = {field} + ?" for field in fields)
+        # 被减少的字段不能减为负数
+        conditions = "".join(f" AND {field} + ? >= 0" for field in fields if deltas[field] < 0)
+        values = [int(deltas[field]) for field in fields]
+        values.append(user_id)
+        values.extend(int(deltas[field]) for field in fields if deltas[field] < 0)
+        cursor = self._conn.execute(f"UPDATE players SET {assignments} WHERE user_id = ?{conditions}", values)
+        if cursor.rowcount == 0:
+            return False
+        metrics.inc('storage_writes')
+        metrics.inc('storage_bytes_written', _value_bytes(values[:len(fields)]))
+        return self._to_row(self._conn.execute(self._sql_by_id, (user_id,)).fetchone())
+
+    def adjust(self, user_id: str, deltas: Dict[str, int], reason: str = 'other',
+               round_id: int = 0) -> Optional[Dict[str, str]]:
+        """原子地增减玩家的整数字段（单条 UPDATE，无需显式事务）"""
+        with self._lock:
+            row = self._apply_deltas(str(user_id), deltas)
+            if not row:
+                return None
+            self._track(row['user_id'], {field: row[field] for field in deltas})
+            self._record_chips({user_id: row}, {user_id: deltas}, reason, round_id)
+        return row
+
+    def adjust_many(self, batch: Dict[str, Dict[str, int]], reason: str = 'other',
+                    round_id: int = 0) -> Optional[Dict[str, Dict[str, str]]]:
+        """在一个事务中增减多名玩家的整数字段，任何一名玩家失败时整批回滚"""
+        result = {}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for user_id, deltas in batch.items():
+                    row = self._apply_deltas(str(user_id), deltas)
+                    if row is False:
+                        self._conn.execute("ROLLBACK")
+                        return None
+                    if row is not None:
+                        result[user_id] = row
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for user_id, row in result.items():
+                self._track(row['user_id'], {field: row[field] for field in batch[user_id]})
+            self._record_chips(result, batch, reason, round_id)
+        return result
+
+    def clear(self):
+        """清空全部玩家数据"""
+        with self._lock:
+            self._conn.execute("DELETE FROM players")
+            self._untrack_all()
+            if self.ledger is not None:
+                self.ledger.reset()
+
+    def backup(self, backup_dir: str) -> str:
+        """使用SQLite在线备份接口备份数据库"""
+        backup_file = os.path.join(backup_dir, f"bjplayers_backup_{int(time.time())}.db")
+        with self._lock:
+            target = sqlite3.connect(backup_file)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+        return backup_file
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """遍历所有玩家数据"""
+        with self._lock:
+            records = self._conn.execute(self._sql_all).fetchall()
+        return (self._to_row(record) for record in records)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def migrate_from_csv(self, csv_file: str) -> int:
+        """从CSV玩家文件一次性导入数据
+
+        Args:
+            csv_file: 原有的 bjplayers.csv 路径
+
+        Returns:
+            int: 导入的玩家数量
+        """
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            count = self.import_rows(csv.DictReader(f))
+        logger.info(f"已从 {csv_file} 迁移 {count} 条21点玩家数据到SQLite")
+        return count
+
+    def import_rows(self, rows: Iterable[Dict[str, str]]) -> int:
+        """在一个事务中批量导入玩家数据，已存在的ID保持不变
+
+        Returns:
+            int: 读取的玩家数量（不含没有ID的行）
+        """
+        count = 0
+        sql = self._sql_insert.replace("INSERT", "INSERT OR IGNORE", 1)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    if not row.get('user_id'):
+                        continue
+                    values = [self._to_db(field, row.get(field, '')) for field in self.standard_fields]
+                    # 与CSV查询语义一致：重复ID时保留第一条
+                    self._conn.execute(sql, values)
+                    count += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            # 排行榜索引在下次访问时重新构建
+            self._leaderboard = None
+        return count
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
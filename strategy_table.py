@@ -0,0 +1,280 @@
+"""精确的庄家概率与基本策略表
+
+按 BJGame 实际使用的规则计算：
+- 庄家不到 DEALER_STAND_VALUE 就要牌（软17停牌），庄家不偷看底牌，
+  庄家BlackJack时玩家所有非BlackJack手牌（包括加倍后的）全输；
+- 任意两张牌都可以加倍；两张牌值相同即可分牌，分牌后两张牌21点同样按BlackJack赔付。
+
+庄家最终点数分布通过对剩余牌构成做带记忆的递归精确求出（庄家抽牌不放回）；
+玩家各操作的期望收益按「扣除庄家明牌后的牌靴构成」计算（按总点数决策，分牌后不再分牌）。
+结果序列化为 data 目录下的缓存文件，运行时查表为 O(1)。
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .blackjack_game import BJGame, Card, Hand
+from .dealer_batch import ACE_SLOT, VALUE_SLOTS, full_shoe_composition
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = "bjstrategy.json"
+CACHE_VERSION = 1
+
+# 每个牌值下标加到硬点数上的值（A按1点）
+_SLOT_HARD = (2, 3, 4, 5, 6, 7, 8, 9, 10, 1)
+
+# 表中的操作代码
+ACTION_NAMES = {
+    'H': "hit",
+    'S': "stand",
+    'D': "double",
+    'P': "split",
+}
+
+HARD_TOTALS = range(4, 22)
+SOFT_TOTALS = range(12, 22)
+
+
+def _total(hard: int, has_ace: bool) -> int:
+    return hard + 10 if has_ace and hard + 10 <= 21 else hard
+
+
+class _Calculator:
+    """针对一种明牌计算庄家分布和玩家期望"""
+
+    def __init__(self, up_slot: int, composition: List[int], payout: float, stand_value: int):
+        self.up_slot = up_slot
+        self.payout = payout
+        self.stand_value = stand_value
+        comp = list(composition)
+        comp[up_slot] -= 1
+        self.comp = tuple(comp)
+        total_cards = sum(comp)
+        self.probs = [count / total_cards for count in comp]
+        self._dealer_memo: Dict[Tuple, Dict[Any, float]] = {}
+        self._stand_memo: Dict[int, float] = {}
+        self._hit_memo: Dict[Tuple[int, bool], float] = {}
+        self.dealer = self._dealer(_SLOT_HARD[up_slot], up_slot == ACE_SLOT, 1, self.comp)
+        self.dealer_blackjack = self.dealer.get("blackjack", 0.0)
+
+    def _dealer(self, hard: int, has_ace: bool, num_cards: int, comp: Tuple[int, ...]) -> Dict[Any, float]:
+        """庄家从当前状态开始的最终结果分布（不放回抽牌）"""
+        total = _total(hard, has_ace)
+        if total >= self.stand_value:
+            if total > 21:
+                return {"bust": 1.0}
+            if num_cards == 2 and total == 21:
+                return {"blackjack": 1.0}
+            return {total: 1.0}
+
+        key = (hard, has_ace, num_cards, comp)
+        cached = self._dealer_memo.get(key)
+        if cached is not None:
+            return cached
+
+        result: Dict[Any, float] = {}
+        remaining = sum(comp)
+        for slot, count in enumerate(comp):
+            if not count:
+                continue
+            p = count / remaining
+            next_comp = comp[:slot] + (count - 1,) + comp[slot + 1:]
+            sub = self._dealer(hard + _SLOT_HARD[slot], has_ace or slot == ACE_SLOT,
+                               min(num_cards + 1, 3), next_comp)
+            for outcome, q in sub.items():
+                result[outcome] = result.get(outcome, 0.0) + p * q
+        self._dealer_memo[key] = result
+        return result
+
+    def stand(self, total: int) -> float:
+        """以 total 点停牌的期望收益（非BlackJack手牌）"""
+        if total > 21:
+            return -1.0
+        cached = self._stand_memo.get(total)
+        if cached is not None:
+            return cached
+        ev = 0.0
+        for outcome, p in self.dealer.items():
+            if outcome == "bust":
+                ev += p
+            elif outcome == "blackjack":
+                ev -= p
+            elif total > outcome:
+                ev += p
+            elif total < outcome:
+                ev -= p
+        self._stand_memo[total] = ev
+        return ev
+
+    def hit(self, hard: int, has_ace: bool) -> float:
+        """要一张牌之后按最优方式（要牌/停牌）继续的期望收益"""
+        key = (hard, has_ace)
+        cached = self._hit_memo.get(key)
+        if cached is not None:
+            return cached
+        ev = 0.0
+        for slot, p in enumerate(self.probs):
+            if not p:
+                continue
+            new_hard = hard + _SLOT_HARD[slot]
+            if new_hard > 21:
+                ev -= p
+                continue
+            new_ace = has_ace or slot == ACE_SLOT
+            ev += p * max(self.stand(_total(new_hard, new_ace)), self.hit(new_hard, new_ace))
+        self._hit_memo[key] = ev
+        return ev
+
+    def double(self, hard: int, has_ace: bool) -> float:
+        """加倍（只再要一张牌，下注翻倍）的期望收益"""
+        ev = 0.0
+        for slot, p in enumerate(self.probs):
+            if not p:
+                continue
+            new_hard = hard + _SLOT_HARD[slot]
+            ev += p * 2 * self.stand(_total(new_hard, has_ace or slot == ACE_SLOT))
+        return ev
+
+    def two_card_options(self, hard: int, has_ace: bool) -> Dict[str, float]:
+        """两张牌时各操作的期望收益"""
+        return {
+            'S': self.stand(_total(hard, has_ace)),
+            'H': self.hit(hard, has_ace),
+            'D': self.double(hard, has_ace),
+        }
+
+    def split(self, pair_slot: int) -> float:
+        """分牌的期望收益（两手牌之和，分牌后不再分牌）"""
+        ev = 0.0
+        for slot, p in enumerate(self.probs):
+            if not p:
+                continue
+            hard = _SLOT_HARD[pair_slot] + _SLOT_HARD[slot]
+            has_ace = pair_slot == ACE_SLOT or slot == ACE_SLOT
+            if _total(hard, has_ace) == 21:
+                # 两张牌21点按BlackJack赔付，与庄家BlackJack则平局
+                ev += p * self.payout * (1 - self.dealer_blackjack)
+            else:
+                ev += p * max(self.two_card_options(hard, has_ace).values())
+        return 2 * ev
+
+    def best_code(self, hard: int, has_ace: bool, pair_slot: Optional[int] = None) -> str:
+        """两张牌时的最优操作代码"""
+        options = self.two_card_options(hard, has_ace)
+        if pair_slot is not None:
+            options['P'] = self.split(pair_slot)
+        return max(options, key=options.get)
+
+    def best_multi_card_code(self, hard: int, has_ace: bool) -> str:
+        """多于两张牌时的最优操作代码（只能要牌或停牌）"""
+        return 'H' if self.hit(hard, has_ace) > self.stand(_total(hard, has_ace)) else 'S'
+
+
+class StrategyTable:
+    """基本策略表
+
+    hard / soft 以「明牌牌值 -> 各点数的操作代码串」保存，pairs 以「明牌 -> 各对子的代码串」保存，
+    另外保存多于两张牌时的要牌/停牌表，查表为 O(1)。
+    实例可以直接作为 simulator 的策略函数使用。
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.rules = data["rules"]
+        self._hard = {int(up): row for up, row in data["hard"].items()}
+        self._soft = {int(up): row for up, row in data["soft"].items()}
+        self._hard_multi = {int(up): row for up, row in data["hard_multi"].items()}
+        self._soft_multi = {int(up): row for up, row in data["soft_multi"].items()}
+        self._pairs = {int(up): row for up, row in data["pairs"].items()}
+
+    @staticmethod
+    def default_rules() -> Dict[str, Any]:
+        return {
+            "num_decks": 6,
+            "blackjack_payout": BJGame.BLACKJACK_PAYOUT,
+            "dealer_stand_value": BJGame.DEALER_STAND_VALUE,
+        }
+
+    @classmethod
+    def build(cls, rules: Optional[Dict[str, Any]] = None) -> 'StrategyTable':
+        """按规则精确计算策略表"""
+        merged = cls.default_rules()
+        merged.update(rules or {})
+        composition = full_shoe_composition(merged["num_decks"])
+
+        data: Dict[str, Any] = {
+            "version": CACHE_VERSION,
+            "rules": merged,
+            "dealer": {},
+            "hard": {},
+            "soft": {},
+            "hard_multi": {},
+            "soft_multi": {},
+            "pairs": {},
+        }
+        for up_slot, up_value in enumerate(VALUE_SLOTS):
+            calc = _Calculator(up_slot, composition, merged["blackjack_payout"], merged["dealer_stand_value"])
+            key = str(up_value)
+            data["dealer"][key] = {str(outcome): round(p, 6) for outcome, p in calc.dealer.items()}
+            data["hard"][key] = "".join(calc.best_code(total, False) for total in HARD_TOTALS)
+            # 软点数 total 对应硬点数 total - 10
+            data["soft"][key] = "".join(calc.best_code(total - 10, True) for total in SOFT_TOTALS)
+            data["hard_multi"][key] = "".join(calc.best_multi_card_code(total, False) for total in HARD_TOTALS)
+            data["soft_multi"][key] = "".join(calc.best_multi_card_code(total - 10, True) for total in SOFT_TOTALS)
+            data["pairs"][key] = "".join(
+                calc.best_code(_SLOT_HARD[slot] * 2, slot == ACE_SLOT, pair_slot=slot)
+                for slot in range(len(VALUE_SLOTS))
+            )
+        return cls(data)
+
+    @classmethod
+    def load_or_build(cls, data_dir: str, rules: Optional[Dict[str, Any]] = None) -> 'StrategyTable':
+        """从缓存文件加载策略表，缓存不存在或规则不一致时重新计算并写入缓存"""
+        merged = cls.default_rules()
+        merged.update(rules or {})
+        cache_file = os.path.join(data_dir, CACHE_FILE_NAME)
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("rules") == merged:
+                return cls(data)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"读取21点策略缓存出错，将重新计算: {e}")
+
+        table = cls.build(merged)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(table.data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+        logger.info(f"已生成21点策略缓存: {cache_file}")
+        return table
+
+    def dealer_probabilities(self, up_value: int) -> Dict[str, float]:
+        """庄家明牌为 up_value（A为11）时的最终结果概率"""
+        return self.data["dealer"][str(up_value)]
+
+    def lookup(self, hand: Hand, up_value: int, can_double: bool, can_split: bool) -> str:
+        """查表获取建议操作
+
+        Returns:
+            str: "hit" / "stand" / "double" / "split"
+        """
+        if can_split:
+            code = self._pairs[up_value][hand[0].value - 2]
+            if code == 'P':
+                return "split"
+        value = hand.value
+        if hand.is_soft:
+            row = self._soft[up_value] if can_double else self._soft_multi[up_value]
+            code = row[value - SOFT_TOTALS.start]
+        else:
+            row = self._hard[up_value] if can_double else self._hard_multi[up_value]
+            code = row[min(value, 21) - HARD_TOTALS.start]
+        return ACTION_NAMES[code]
+
+    def __call__(self, hand: Hand, dealer_up: Card, can_double: bool, can_split: bool) -> str:
+        return self.lookup(hand, dealer_up.value, can_double, can_split)
@@ -0,0 +1,166 @@
+import logging
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict, List, Optional, Set
+
+from .blackjack_game import BJGame, Card, Deck
+from .game_journal import GameJournal
+
+logger = logging.getLogger(__name__)
+
+# 仍有下注或手牌在桌上的牌局状态，闲置时挂起而不是直接丢弃
+LIVE_STATUSES = ("betting", "playing", "dealer_turn")
+
+
+def estimate_bytes(obj, _seen: Optional[Set[int]] = None) -> int:
+    """递归估算对象占用的内存（字节）
+
+    共享的扑克牌享元对象、模块和类型不计入，得到的是单张牌桌独占的内存。
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or isinstance(obj, (Card, ModuleType, type)):
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_bytes(k, _seen) + estimate_bytes(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_bytes(item, _seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += estimate_bytes(vars(obj), _seen)
+    return size
+
+
+class TableManager:
+    """群聊牌桌管理
+
+    插件的 game_instances、shoes、ready_players 三个字典由这里统一维护：
+    - 牌靴池：闲置牌桌释放的牌靴放回池中，新牌桌优先取用（重新洗牌），不再为每个群新建牌靴；
+    - 活跃时间：每条指令刷新所在群聊的最后活跃时间；
+    - 闲置回收：超过 idle_ttl 秒没有指令的牌桌，有进行中牌局的挂起（只保留牌局日志中的快照，
+      下次有指令时恢复），否则直接释放。
+
+    除 clear 外的方法都要求调用方持有对应群聊的锁。
+    """
+
+    DEFAULT_IDLE_TTL = 1800  # 牌桌闲置多久（秒）后回收
+    DEFAULT_MAX_POOLED_SHOES = 32  # 牌靴池最多保留的牌靴数
+
+    def __init__(self, games: Dict[str, BJGame], shoes: Dict[str, Deck], ready_players: Dict[str, List[str]],
+                 journal: GameJournal, num_decks: int = 6, penetration: float = Deck.DEFAULT_PENETRATION,
+                 idle_ttl: float = DEFAULT_IDLE_TTL, max_pooled_shoes: int = DEFAULT_MAX_POOLED_SHOES):
+        self.games = games
+        self.shoes = shoes
+        self.ready_players = ready_players
+        self.journal = journal
+        self.num_decks = num_decks
+        # 切牌比例来自配置，超出范围时使用默认值，避免牌靴被发空
+        if not isinstance(penetration, (int, float)) or not 0 < penetration <= Deck.MAX_PENETRATION:
+            logger.warning(f"21点切牌比例 {penetration!r} 超出范围 (0, {Deck.MAX_PENETRATION}]，"
+                           f"使用默认值 {Deck.DEFAULT_PENETRATION}")
+            penetration = Deck.DEFAULT_PENETRATION
+        self.penetration = penetration
+        self.idle_ttl = idle_ttl
+        self.max_pooled_shoes = max_pooled_shoes
+        self.last_active: Dict[str, float] = {}  # 群聊ID -> 最后活跃时间（time.monotonic）
+        self.parked: Set[str] = set()  # 已挂起、只保留快照的群聊
+        self._pool: List[Deck] = []
+        self._pool_lock = threading.Lock()
+
+    def activate(self, group_id: str):
+        """处理群聊指令前调用：刷新活跃时间，恢复已挂起的牌局"""
+        self.last_active[group_id] = time.monotonic()
+        if group_id not in self.parked:
+            return
+        self.parked.discard(group_id)
+        snapshot = self.journal.latest(group_id)
+        if snapshot is None:
+            return
+        try:
+            game = BJGame.restore(snapshot)
+        except ValueError as e:
+            logger.error(f"恢复群聊 {group_id} 挂起的21点牌局出错: {e}")
+            self.journal.end(group_id)
+            return
+        self.games[group_id] = game
+        self.shoes[group_id] = game.deck
+
+    def get_shoe(self, group_id: str) -> Deck:
+        """获取群聊的牌靴，没有时优先从牌靴池取用"""
+        shoe = self.shoes.get(group_id)
+        if shoe is None:
+            with self._pool_lock:
+                shoe = self._pool.pop() if self._pool else None
+            if shoe is None:
+                shoe = Deck(num_decks=self.num_decks, penetration=self.penetration)
+            else:
+                shoe.shuffle()
+            self.shoes[group_id] = shoe
+        return shoe
+
+    def idle_groups(self, now: Optional[float] = None) -> List[str]:
+        """超过 idle_ttl 秒没有指令的群聊"""
+        cutoff = (now if now is not None else time.monotonic()) - self.idle_ttl
+        return [group_id for group_id, active in list(self.last_active.items()) if active < cutoff]
+
+    def is_idle(self, group_id: str, now: Optional[float] = None) -> bool:
+        """群聊是否超过 idle_ttl 秒没有指令，只检查这一个群聊"""
+        active = self.last_active.get(group_id)
+        return active is not None and active < (now if now is not None else time.monotonic()) - self.idle_ttl
+
+    def evict(self, group_id: str) -> List[str]:
+        """回收闲置牌桌
+
+        有进行中牌局的挂起：确保日志中是最新快照后从内存中移除，准备列表保留；
+        否则释放牌桌，牌靴放回池中。
+
+        Returns:
+            List[str]: 被取消准备的玩家ID，调用方负责重置他们的准备状态
+        """
+        self.last_active.pop(group_id, None)
+        game = self.games.get(group_id)
+        if game is not None and game.game_status in LIVE_STATUSES:
+            self.journal.record(group_id, game.snapshot())
+            del self.games[group_id]
+            self.shoes.pop(group_id, None)
+            self.parked.add(group_id)
+            return []
+
+        self.games.pop(group_id, None)
+        self.journal.end(group_id)
+        shoe = self.shoes.pop(group_id, None)
+        if shoe is not None and shoe.num_decks == self.num_decks:
+            with self._pool_lock:
+                if len(self._pool) < self.max_pooled_shoes:
+                    self._pool.append(shoe)
+        return self.ready_players.pop(group_id, None) or []
+
+    def clear(self):
+        """清空所有牌桌（包括挂起的牌局）"""
+        for group_id in set(self.games) | self.parked:
+            self.journal.end(group_id)
+        self.games.clear()
+        self.shoes.clear()
+        self.ready_players.clear()
+        self.last_active.clear()
+        self.parked.clear()
+
+    def table_bytes(self, sample: int = 20) -> int:
+        """抽样估算每张活跃牌桌（牌局及其牌靴）占用的平均内存（字节）"""
+        games = list(self.games.values())[:sample]
+        if not games:
+            return 0
+        return sum(estimate_bytes(game) for game in games) // len(games)
+
+    def stats(self) -> Dict[str, int]:
+        """牌桌数量统计"""
+        return {
+            'tables': len(self.games),
+            'parked_tables': len(self.parked),
+            'shoes': len(self.shoes),
+            'pooled_shoes': len(self._pool),
+            'tracked_groups': len(self.last_active),
+        }
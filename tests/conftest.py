@@ -0,0 +1,45 @@
+"""测试公共配置
+
+插件包的 ``__init__`` 依赖宿主框架（plugins、bridge 等），与 benchmarks/_common.py 一样，
+这里把插件目录注册为不执行 ``__init__`` 的命名空间包 ``bjcore``，测试直接导入
+``bjcore.player_store``、``bjcore.blackjack_game`` 等不依赖框架的模块。
+"""
+import os
+import sys
+import types
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'bjcore' not in sys.modules:
+    _pkg = types.ModuleType('bjcore')
+    _pkg.__path__ = [PLUGIN_DIR]
+    sys.modules['bjcore'] = _pkg
+
+STANDARD_FIELDS = [
+    'user_id', 'session_id', 'nickname', 'chips', 'level', 'exp',
+    'total_wins', 'total_losses', 'total_draws', 'last_checkin',
+    'blackjack_count', 'ready_status', 'current_bet', 'cards'
+]
+
+
+@pytest.fixture
+def fields():
+    return list(STANDARD_FIELDS)
+
+
+@pytest.fixture
+def new_row():
+    """生成一名新玩家的数据行，可用关键字参数覆盖字段"""
+    def make(user_id, **overrides):
+        row = {field: '' for field in STANDARD_FIELDS}
+        row.update({
+            'user_id': user_id, 'session_id': user_id, 'nickname': user_id,
+            'chips': '1000', 'level': '1', 'exp': '0',
+            'total_wins': '0', 'total_losses': '0', 'total_draws': '0',
+            'blackjack_count': '0', 'ready_status': 'False', 'current_bet': '0', 'cards': '[]',
+        })
+        row.update({field: str(value) for field, value in overrides.items()})
+        return row
+    return make
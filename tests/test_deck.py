@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from bjcore.blackjack_game import BJGame, Deck
+from bjcore.game_journal import GameJournal
+from bjcore.table_manager import TableManager
+
+
+@pytest.mark.parametrize('penetration', [0, -0.5, 0.95, 1.0, 1.5])
+def test_deck_rejects_out_of_range_penetration(penetration):
+    with pytest.raises(ValueError):
+        Deck(1, penetration)
+
+
+def test_cut_card_leaves_cards_behind():
+    deck = Deck(1, Deck.MAX_PENETRATION)
+    assert deck.cut_card == deck.size() - Deck.MIN_CARDS_BEHIND_CUT
+    assert Deck(6, 0.5).cut_card == 156
+
+
+def test_deal_reshuffles_when_shoe_runs_out():
+    deck = Deck(1, 0.9, rng=random.Random(1))
+    cards = [deck.deal() for _ in range(deck.size() + 5)]
+    assert all(card is not None for card in cards)
+    assert deck.dealt() == 5
+    assert sum(deck.rank_counts()) == deck.size() - 5
+
+
+def test_round_survives_deep_penetration():
+    game = BJGame(Deck(1, 0.9, rng=random.Random(2)))
+    players = [f'p{i}' for i in range(7)]
+    for _ in range(50):
+        game.start_new_game(players)
+        for player_id in players:
+            game.place_bet(player_id, 10)
+        game.deal_initial_cards()
+        while game.game_status == "playing":
+            player_id = game.get_current_player()
+            hand_idx = game.get_current_hand_idx(player_id)
+            if game.player_statuses[player_id][hand_idx] == "waiting":
+                if game.get_player_hand_value(player_id, hand_idx) < 19:
+                    game.hit(player_id)
+                    continue
+                game.stand(player_id)
+            game._advance_to_next_player()
+        assert game.game_status == "finished"
+        assert all(len(hand) >= 2 for hands in game.player_hands.values() for hand in hands)
+
+
+def test_table_manager_falls_back_on_invalid_penetration(tmp_path):
+    tables = TableManager({}, {}, {}, GameJournal(str(tmp_path / 'bjgames.journal')), num_decks=1, penetration=1.0)
+    assert tables.penetration == Deck.DEFAULT_PENETRATION
+    assert tables.get_shoe('g1').penetration == Deck.DEFAULT_PENETRATION
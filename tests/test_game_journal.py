@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from bjcore.blackjack_game import BJGame, Deck
+from bjcore.game_journal import GameJournal
+from bjcore.ledger import ChipLedger, reconcile_chips
+from bjcore.player_store import CSVPlayerStore
+from bjcore.settlement import settle_round
+
+
+def start_round(store, journal, seed):
+    """开局、扣除下注并发牌，每一步后像插件一样记录快照；返回牌局"""
+    game = BJGame(Deck(rng=random.Random(seed)))
+    game.start_new_game(['p1', 'p2'])
+    journal.record('g1', game.snapshot())
+    for player_id, bet in (('p1', 100), ('p2', 40)):
+        assert store.adjust(player_id, {'chips': -bet}, 'bet', game.round_id)
+        game.place_bet(player_id, bet)
+        journal.record('g1', game.snapshot())
+    game.deal_initial_cards()
+    journal.record('g1', game.snapshot())
+    return game
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_restored_round_settles_against_persisted_debits(tmp_path, fields, new_row, seed):
+    player_file = str(tmp_path / 'bjplayers.csv')
+    journal_file = str(tmp_path / 'bjgames.journal')
+    # 写回间隔足够长，下注扣除只留在写回缓存中，除非写入快照前先落盘
+    store = CSVPlayerStore(player_file, fields, flush_interval=3600)
+    store.add(new_row('p1'))
+    store.add(new_row('p2'))
+    journal = GameJournal(journal_file, before_record=store.flush)
+    journal.load()
+    start_round(store, journal, seed)
+
+    # 模拟进程崩溃：不再 flush，直接从磁盘重新打开存储和日志
+    store = CSVPlayerStore(player_file, fields)
+    snapshot = GameJournal(journal_file).load()['g1']
+    game = BJGame.restore(snapshot)
+    assert game.player_bets == {'p1': [100], 'p2': [40]}
+    assert store.get('p1')['chips'] == '900'
+    assert store.get('p2')['chips'] == '960'
+
+    deltas = settle_round(game)
+    rows = store.adjust_many(deltas, 'settle', game.round_id)
+    for player_id in ('p1', 'p2'):
+        win_amount = sum(result['win_amount'] for result in game.results[player_id])
+        assert int(rows[player_id]['chips']) == 1000 + win_amount
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_restored_round_reconciled_from_ledger(tmp_path, fields, new_row, seed):
+    player_file = str(tmp_path / 'bjplayers.csv')
+    journal_file = str(tmp_path / 'bjgames.journal')
+    ledger_file = str(tmp_path / 'bjchips.ledger')
+    # 不在写入快照前落盘：下注扣除只留在写回缓存中，但已写入账本
+    store = CSVPlayerStore(player_file, fields, flush_interval=3600)
+    store.ledger = ChipLedger(ledger_file)
+    store.add(new_row('p1'))
+    store.add(new_row('p2'))
+    store.flush()
+    journal = GameJournal(journal_file)
+    journal.load()
+    start_round(store, journal, seed)
+
+    # 模拟进程崩溃后重启：玩家数据中没有扣款，按账本修正恢复的牌局中的玩家
+    store = CSVPlayerStore(player_file, fields)
+    assert store.get('p1')['chips'] == '1000'
+    game = BJGame.restore(GameJournal(journal_file).load()['g1'])
+    assert reconcile_chips(store, ledger_file, game.players_order) == 2
+    assert CSVPlayerStore(player_file, fields).get('p1')['chips'] == '900'
+    assert store.get('p2')['chips'] == '960'
+
+    deltas = settle_round(game)
+    rows = store.adjust_many(deltas, 'settle', game.round_id)
+    for player_id in ('p1', 'p2'):
+        win_amount = sum(result['win_amount'] for result in game.results[player_id])
+        assert int(rows[player_id]['chips']) == 1000 + win_amount
+
+
+def test_before_record_runs_only_for_changed_snapshots(tmp_path):
+    calls = []
+    journal = GameJournal(str(tmp_path / 'bjgames.journal'), before_record=lambda: calls.append(1))
+    journal.load()
+    game = BJGame(Deck(rng=random.Random(1)))
+    game.start_new_game(['p1'])
+    journal.record('g1', game.snapshot())
+    journal.record('g1', game.snapshot())
+    game.place_bet('p1', 10)
+    journal.record('g1', game.snapshot())
+    assert len(calls) == 2
@@ -0,0 +1,28 @@
+from bjcore.ledger import ChipLedger, _read_balances, _write_balances, rebuild_balances
+from bjcore.mmap_store import MmapPlayerStore
+
+
+def test_verify_and_apply_against_mmap_file(tmp_path, fields, new_row):
+    player_file = str(tmp_path / 'bjplayers.bjp')
+    ledger_file = str(tmp_path / 'bjchips.ledger')
+    store = MmapPlayerStore(player_file, fields)
+    store.ledger = ChipLedger(ledger_file)
+    store.add(new_row('u1'))
+    store.add(new_row('u2'))
+    store.adjust('u1', {'chips': -300}, 'bet', 1)
+    store.adjust('u2', {'chips': 50}, 'checkin')
+    store.ledger.close()
+    store.ledger = None
+    # 模拟丢失的写入：玩家数据与账本不一致
+    store.update('u1', {'chips': 1000})
+    store.close()
+
+    balances = rebuild_balances(ledger_file)
+    assert balances == {'u1': 700, 'u2': 1050}
+    assert _read_balances(player_file) == {'u1': 1000, 'u2': 1050}
+
+    assert _write_balances(player_file, balances) == 1
+    assert _read_balances(player_file) == balances
+    reopened = MmapPlayerStore(player_file, fields)
+    assert reopened.get('u1')['chips'] == '700'
+    reopened.close()
@@ -0,0 +1,52 @@
+import asyncio
+import gc
+import threading
+
+from bjcore.locks import AsyncKeyedLocks, KeyedLocks
+
+
+def test_same_key_shares_lock_while_in_use():
+    locks = KeyedLocks()
+    held = locks.get('g1')
+    assert locks.get('g1') is held
+    assert locks.get('g2') is not held
+
+
+def test_unused_locks_are_dropped():
+    locks = KeyedLocks()
+    for i in range(1000):
+        with locks.get(f'g{i}'):
+            pass
+    gc.collect()
+    assert len(locks) == 0
+
+
+def test_lock_is_exclusive_across_threads():
+    locks = KeyedLocks()
+    counter = {'value': 0}
+
+    def worker():
+        for _ in range(2000):
+            with locks.get('g1'):
+                value = counter['value']
+                counter['value'] = value + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter['value'] == 16000
+
+
+def test_async_locks_are_dropped():
+    locks = AsyncKeyedLocks()
+
+    async def run():
+        for i in range(100):
+            async with locks.get(f'g{i}'):
+                pass
+
+    asyncio.run(run())
+    gc.collect()
+    assert len(locks) == 0
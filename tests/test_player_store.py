@@ -0,0 +1,110 @@
+import csv
+
+import pytest
+
+from bjcore.player_store import CSVPlayerStore
+
+
+def read_ids(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [row['user_id'] for row in csv.DictReader(f)]
+
+
+def test_csv_add_rejects_existing_user_id(tmp_path, fields, new_row):
+    path = str(tmp_path / 'bjplayers.csv')
+    store = CSVPlayerStore(path, fields)
+    assert store.add(new_row('u1', chips=1500))
+    store.adjust('u1', {'chips': -200})
+
+    assert not store.add(new_row('u1', session_id='other'))
+    assert store.get('u1')['chips'] == '1300'
+    assert store.get('other') is None
+
+    store.flush()
+    assert read_ids(path) == ['u1']
+    assert CSVPlayerStore(path, fields).get('u1')['chips'] == '1300'
+
+
+def open_store(backend, tmp_path, fields):
+    if backend == 'csv':
+        return CSVPlayerStore(str(tmp_path / 'bjplayers.csv'), fields)
+    if backend == 'sqlite':
+        from bjcore.sqlite_store import SQLitePlayerStore
+        return SQLitePlayerStore(str(tmp_path / 'bjplayers.db'), fields)
+    if backend == 'mmap':
+        from bjcore.mmap_store import MmapPlayerStore
+        return MmapPlayerStore(str(tmp_path / 'bjplayers.bjp'), fields)
+    from bjcore.sharded_store import ShardedPlayerStore
+    return ShardedPlayerStore.create(str(tmp_path / 'bjplayers'), fields, 4, backend.split('-')[1])
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite', 'mmap', 'sharded-csv', 'sharded-sqlite'])
+def test_add_keeps_existing_player(backend, tmp_path, fields, new_row):
+    store = open_store(backend, tmp_path, fields)
+    assert store.add(new_row('u1'))
+    store.adjust('u1', {'chips': 500, 'total_wins': 3})
+
+    assert not store.add(new_row('u1', session_id='s2', nickname='新昵称'))
+    row = store.get('u1')
+    assert (row['chips'], row['total_wins'], row['session_id']) == ('1500', '3', 'u1')
+    assert len(store) == 1
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite', 'mmap', 'sharded-csv', 'sharded-sqlite'])
+def test_update_moves_session_and_nickname_lookups(backend, tmp_path, fields, new_row):
+    store = open_store(backend, tmp_path, fields)
+    store.add(new_row('u1', session_id='s1', nickname='旧昵称'))
+    store.update('u1', {'session_id': 's2', 'nickname': '新昵称'})
+
+    assert store.get('s2')['user_id'] == 'u1'
+    assert store.get_by_nickname('新昵称')['user_id'] == 'u1'
+    assert store.get('s1') is None
+    assert store.get_by_nickname('旧昵称') is None
+
+
+def test_mmap_truncates_long_nickname_and_finds_it(tmp_path, fields, new_row):
+    from bjcore.mmap_store import MmapPlayerStore
+    nickname = '很长的昵称' * 5  # 75 字节，超过 64 字节的槽位
+    store = MmapPlayerStore(str(tmp_path / 'bjplayers.bjp'), fields)
+    assert store.add(new_row('u1', nickname=nickname))
+    assert store.get('u1')['nickname'] == nickname[:21]
+    assert store.get_by_nickname(nickname)['user_id'] == 'u1'
+
+    store.update('u1', {'nickname': '新' + nickname})
+    assert store.get_by_nickname('新' + nickname)['user_id'] == 'u1'
+    assert store.get_by_nickname(nickname) is None
+
+
+def test_mmap_import_skips_rows_that_do_not_fit(tmp_path, fields, new_row):
+    from bjcore.mmap_store import MmapPlayerStore
+    csv_file = str(tmp_path / 'bjplayers.csv')
+    csv_store = CSVPlayerStore(csv_file, fields)
+    csv_store.add(new_row('u1', nickname='很长的昵称' * 5))
+    csv_store.add(new_row('x' * 97))
+    csv_store.add(new_row('u3', chips=42))
+    csv_store.flush()
+
+    mmap_file = str(tmp_path / 'bjplayers.bjp')
+    store = MmapPlayerStore(mmap_file, fields)
+    assert store.import_csv(csv_file) == 2
+    store.close()
+
+    reopened = MmapPlayerStore(mmap_file, fields)
+    assert len(reopened) == 2
+    assert reopened.get_by_nickname('很长的昵称' * 5)['user_id'] == 'u1'
+    assert reopened.get('u3')['chips'] == '42'
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite', 'mmap', 'sharded-csv', 'sharded-sqlite'])
+def test_update_resolves_session_id_and_skips_unknown_players(backend, tmp_path, fields, new_row):
+    store = open_store(backend, tmp_path, fields)
+    store.add(new_row('u1', session_id='s1'))
+
+    assert store.update('s1', {'ready_status': 'True'})
+    assert store.get('u1')['ready_status'] == 'True'
+
+    assert not store.update('nobody', {'chips': 5})
+    assert store.get('nobody') is None
+    assert len(store) == 1
+    store.flush()
+    assert [row['user_id'] for row in store.rows()] == ['u1']
@@ -0,0 +1,110 @@
+import pytest
+
+from bjcore.blackjack_game import BJGame, Card, Deck, Hand
+from bjcore.settlement import settle_round
+
+
+def hand(*ranks):
+    return Hand([Card('♠', rank) for rank in ranks])
+
+
+def make_game(dealer, players, draws=()):
+    """按给定的牌摆好一局，等待庄家回合
+
+    Args:
+        dealer: 庄家的两张牌
+        players: 玩家ID -> [(手牌点数列表, 下注, 状态), ...]，下注是已从筹码中扣除的金额
+        draws: 庄家要牌时依次发出的牌
+    """
+    codes = bytes(Card('♥', rank).code for rank in draws) + bytes(range(52))
+    game = BJGame(Deck.from_codes(codes, 0, 1, Deck.DEFAULT_PENETRATION))
+    game.game_status = "playing"
+    game.dealer_hand = hand(*dealer)
+    for player_id, hands in players.items():
+        game.players_order.append(player_id)
+        game.player_hands[player_id] = [hand(*ranks) for ranks, _, _ in hands]
+        game.player_bets[player_id] = [bet for _, bet, _ in hands]
+        game.player_statuses[player_id] = [status for _, _, status in hands]
+        game.current_hand_idx[player_id] = len(hands) - 1
+    game.current_player_idx = len(players)
+    return game
+
+
+def settle_one(dealer, hands, draws=()):
+    game = make_game(dealer, {'p1': hands}, draws)
+    return settle_round(game)['p1'], game.results['p1']
+
+
+@pytest.mark.parametrize('dealer, hands, expected', [
+    # 赢：返还本金 + 等额奖金
+    (('10', '8'), [(('10', 'K'), 100, 'stand')], {'chips': 200, 'total_wins': 1}),
+    # 输：下注已扣除，筹码不变
+    (('10', '9'), [(('10', '7'), 100, 'stand')], {'total_losses': 1}),
+    # 平：退还本金
+    (('9', '9'), [(('10', '8'), 100, 'stand')], {'chips': 100, 'total_draws': 1}),
+    # BlackJack：赔率3:2，奖金向下取整
+    (('10', '8'), [(('A', 'K'), 100, 'stand')], {'chips': 250, 'total_wins': 1, 'blackjack_count': 1}),
+    (('10', '8'), [(('A', 'Q'), 15, 'stand')], {'chips': 37, 'total_wins': 1, 'blackjack_count': 1}),
+    # 庄家BlackJack：非BlackJack的21点也输
+    (('A', 'Q'), [(('10', 'K'), 100, 'stand')], {'total_losses': 1}),
+    (('A', 'Q'), [(('7', '4', 'K'), 100, 'stand')], {'total_losses': 1}),
+    # 双方都是BlackJack：平局，仍计一次BlackJack
+    (('A', 'Q'), [(('A', 'K'), 100, 'stand')], {'chips': 100, 'total_draws': 1, 'blackjack_count': 1}),
+    # 要牌爆牌：计一次负，即使庄家也爆牌
+    (('10', '6', 'K'), [(('10', '6', '9'), 100, 'bust')], {'total_losses': 1}),
+    # 庄家爆牌：未爆牌的手牌赢
+    (('10', '6', 'K'), [(('10', '2'), 50, 'stand')], {'chips': 100, 'total_wins': 1}),
+])
+def test_single_hand(dealer, hands, expected):
+    deltas, _ = settle_one(dealer, hands)
+    assert deltas == expected
+
+
+def test_dealer_draws_to_seventeen_before_settling():
+    deltas, results = settle_one(('10', '6'), [(('10', '9'), 100, 'stand')], draws=('5',))
+    assert deltas == {'total_losses': 1}
+    assert results[0]['message'] == '19点 < 庄家21点，输掉 100 筹码'
+
+
+def test_dealer_bust_message():
+    _, results = settle_one(('10', '6', 'K'), [(('10', '2'), 50, 'stand')])
+    # 与原先插件结算回复中的文案一致
+    assert results[0]['message'] == '庄家爆牌，赢得 50 筹码'
+
+
+def test_doubled_hand():
+    # 加倍后下注为200，三张牌21点不算BlackJack
+    deltas, _ = settle_one(('10', '8'), [(('5', '6', 'K'), 200, 'stand')])
+    assert deltas == {'chips': 400, 'total_wins': 1}
+    deltas, _ = settle_one(('10', '8'), [(('10', '2', 'K'), 200, 'bust')])
+    assert deltas == {'total_losses': 1}
+
+
+def test_split_hands():
+    # 分牌后每手牌独立结算：一手赢、一手平、一手爆牌
+    deltas, results = settle_one(('10', '7'), [
+        (('8', 'K'), 100, 'stand'),
+        (('8', '5', '4'), 100, 'stand'),
+        (('8', '4', 'Q'), 200, 'bust'),
+    ])
+    assert deltas == {'chips': 300, 'total_wins': 1, 'total_draws': 1, 'total_losses': 1}
+    assert [result['win_amount'] for result in results] == [100, 0, -200]
+
+
+def test_split_aces_to_twenty_one_pays_as_blackjack():
+    deltas, _ = settle_one(('10', '8'), [(('A', 'K'), 100, 'stand'), (('A', '7'), 100, 'stand')])
+    assert deltas == {'chips': 250 + 100, 'total_wins': 1, 'total_draws': 1, 'blackjack_count': 1}
+
+
+def test_all_players_settled_in_one_pass():
+    game = make_game(('10', '7'), {
+        'p1': [(('10', 'K'), 100, 'stand')],
+        'p2': [(('10', '5', 'K'), 40, 'bust')],
+        'p3': [(('10', '7'), 60, 'stand')],
+    })
+    assert settle_round(game) == {
+        'p1': {'chips': 200, 'total_wins': 1},
+        'p2': {'total_losses': 1},
+        'p3': {'chips': 60, 'total_draws': 1},
+    }
+    assert game.game_status == "finished"
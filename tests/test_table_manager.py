@@ -0,0 +1,24 @@
+from bjcore.game_journal import GameJournal
+from bjcore.table_manager import TableManager
+
+
+def make_tables(tmp_path, idle_ttl=60):
+    return TableManager({}, {}, {}, GameJournal(str(tmp_path / 'bjgames.journal')), idle_ttl=idle_ttl)
+
+
+def test_is_idle_checks_one_group(tmp_path):
+    tables = make_tables(tmp_path)
+    tables.last_active.update({'g1': 100.0, 'g2': 150.0})
+    assert tables.is_idle('g1', now=170.0)
+    assert not tables.is_idle('g2', now=170.0)
+    assert not tables.is_idle('unknown', now=170.0)
+    assert tables.idle_groups(now=170.0) == ['g1']
+
+
+def test_activity_after_listing_keeps_group(tmp_path):
+    tables = make_tables(tmp_path)
+    tables.last_active['g1'] = 100.0
+    assert tables.idle_groups(now=200.0) == ['g1']
+    # 列出闲置群聊之后又收到指令，拿到锁后的复查不再认为它闲置
+    tables.last_active['g1'] = 199.0
+    assert not tables.is_idle('g1', now=200.0)
@@ -0,0 +1,94 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """所有牌桌共用的哈希时间轮
+
+    时间被划分为 tick 秒一格，num_slots 个格子首尾相连成环，只有一个后台线程每格前进一步，
+    触发落在当前格子中且剩余圈数为 0 的定时器。添加和取消定时器都是 O(1)，
+    每一格只处理该格中的定时器，成千上万张牌桌同时计时也不需要每桌一个线程。
+
+    每个键（群聊ID）同时只有一个定时器，重新设置会替换旧的。
+    回调在时间轮线程中执行，应当尽快返回；精度为一个 tick。
+    """
+
+    DEFAULT_TICK = 1.0
+    DEFAULT_SLOTS = 512
+
+    def __init__(self, tick: float = DEFAULT_TICK, num_slots: int = DEFAULT_SLOTS):
+        self.tick = tick
+        self._slots: List[Dict[Hashable, list]] = [{} for _ in range(num_slots)]
+        self._where: Dict[Hashable, int] = {}  # 键 -> 所在格子
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], None]):
+        """delay 秒后调用 callback，替换该键已有的定时器"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        num_slots = len(self._slots)
+        with self._lock:
+            self._remove(key)
+            slot = (self._cursor + ticks) % num_slots
+            # 剩余圈数：每经过该格子一次减一，为 0 时触发
+            self._slots[slot][key] = [(ticks - 1) // num_slots, callback]
+            self._where[key] = slot
+            if self._thread is None:
+                self._start()
+
+    def cancel(self, key: Hashable):
+        """取消该键的定时器（不存在时忽略）"""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: Hashable):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="BlackJack-timer", daemon=True)
+        self._thread.start()
+
+    def _advance(self) -> List[Tuple[Hashable, Callable[[], None]]]:
+        """前进一格，取出到期的定时器"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            expired = []
+            for key, entry in list(slot.items()):
+                if entry[0] > 0:
+                    entry[0] -= 1
+                    continue
+                del slot[key]
+                del self._where[key]
+                expired.append((key, entry[1]))
+            return expired
+
+    def _run(self):
+        next_tick = time.monotonic() + self.tick
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            next_tick += self.tick
+            for key, callback in self._advance():
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"21点定时器 {key} 执行出错: {e}")
+
+    def stop(self):
+        """停止时间轮线程，未触发的定时器全部丢弃"""
+        self._stop.set()
+        with self._lock:
+            for slot in self._slots:
+                slot.clear()
+            self._where.clear()